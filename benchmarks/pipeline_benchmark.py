@@ -0,0 +1,332 @@
+"""
+End-to-end throughput benchmark for ParentWorkflow/ChildWorkflow.
+
+Runs a worker in this process against the local provider stand-ins
+(benchmarks/stubs/provider_server.py), so no OpenAI, Groq or AssemblyAI calls are
+made. Restack and Postgres are the real ones, so start a local engine and
+point POSTGRES_* at a scratch database first. Then run:
+
+    poetry run python -m benchmarks.pipeline_benchmark --files 32 --rounds 2
+
+The corpus is built from synthetic_audio, with each copy dithered slightly so
+every file has its own digest and nothing is a cache hit by accident. Caches
+and blobs go to a temporary directory, so round 1 runs with cold caches and
+later rounds re-submit the same files to measure the cached path.
+
+Every round reports files/min, p50/p95/p99 per step (from the step events),
+per-file latency, provider calls and the worker's resident memory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CORPUS_DIR = os.path.join(project_root, "synthetic_audio")
+# Amplitude of the noise that makes each corpus copy unique, about -80 dBFS
+DITHER_AMPLITUDE = 1e-4
+MEMORY_SAMPLE_SECONDS = 0.5
+EVENT_DRAIN_SECONDS = 2.0
+PERCENTILES = (50, 95, 99)
+
+
+def configure_environment(args, work_dir: str):
+    """
+    Point the pipeline at the provider stand-ins and a scratch cache. Must run
+    before anything under src is imported, since settings are read at import.
+    """
+    stub_url = f"http://127.0.0.1:{args.port}"
+    os.environ.update({
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "OPENBABYLON_API_URL": f"{stub_url}/v1",
+        "GROQ_BASE_URL": stub_url,
+        "ASSEMBLYAI_BASE_URL": stub_url,
+        "ASSEMBLYAI_POLLING_INTERVAL_SECONDS": str(args.assemblyai_polling_interval),
+        "CACHE_DIR": os.path.join(work_dir, "cache"),
+        "AUDIO_BLOB_DIR": os.path.join(work_dir, "blobs"),
+    })
+    for key in ("OPENAI_API_KEY", "GROQ_API_KEY", "ASSEMBLYAI_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ.setdefault("TRANSCRIPTION_BACKEND", "groq")
+    # A local Whisper fallback would measure model loading rather than the pipeline
+    os.environ.setdefault("TRANSCRIPTION_FALLBACK_BACKEND", "none")
+
+
+def start_provider_stub(args) -> subprocess.Popen:
+    env = {**os.environ, "PROVIDER_STUB_PORT": str(args.port), "PROVIDER_STUB_PROFILE": args.profile or "{}"}
+    process = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs.provider_server"], cwd=project_root, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Provider stub exited with code {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/stats").raise_for_status()
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Provider stub did not start within 30s")
+
+
+def build_corpus(corpus_dir: str, n_files: int, out_dir: str) -> list[str]:
+    """n_files distinct recordings, cycling through the corpus with per-copy dither."""
+    from src.audio.io import ANALYSIS_SAMPLE_RATE, decode_audio, encode_audio
+
+    sources = sorted(
+        os.path.join(corpus_dir, name) for name in os.listdir(corpus_dir)
+        if name.lower().endswith((".mp3", ".wav", ".flac", ".ogg", ".m4a"))
+    )
+    if not sources:
+        raise ValueError(f"No audio files in {corpus_dir}")
+    decoded = [decode_audio(path) for path in sources]
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for index in range(n_files):
+        source = sources[index % len(sources)]
+        rng = np.random.default_rng(index)
+        samples = decoded[index % len(sources)]
+        samples = samples + rng.uniform(-DITHER_AMPLITUDE, DITHER_AMPLITUDE, len(samples)).astype(np.float32)
+        name = f"{index:04d}-{os.path.splitext(os.path.basename(source))[0]}.flac"
+        path = os.path.join(out_dir, name)
+        encode_audio(samples, ANALYSIS_SAMPLE_RATE, path)
+        paths.append(path)
+    return paths
+
+
+def resident_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is the peak rather than the current size, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+async def sample_memory(samples: list[int]):
+    while True:
+        samples.append(resident_memory_bytes())
+        await asyncio.sleep(MEMORY_SAMPLE_SECONDS)
+
+
+async def collect_events(hub, events: list[dict]):
+    from src.utils.events import ALL_JOBS
+
+    async for event in hub.subscribe(ALL_JOBS, finished=lambda: False):
+        if event is not None:
+            events.append(event)
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    return {f"p{p}": round(float(np.percentile(values, p)), 3) for p in PERCENTILES}
+
+
+def summarize_round(job_id: str, events: list[dict]) -> dict:
+    durations = defaultdict(list)
+    failures = defaultdict(int)
+    file_spans: dict[str, list[float]] = {}
+    for event in events:
+        if event["job_id"] != job_id:
+            continue
+        if event["type"] == "step.completed":
+            durations[event["step"]].append(event["duration_seconds"])
+        elif event["type"] == "step.failed":
+            failures[event["step"]] += 1
+        if event["type"].startswith("step."):
+            span = file_spans.setdefault(event["workflow_id"], [event["ts"], event["ts"]])
+            span[0], span[1] = min(span[0], event["ts"]), max(span[1], event["ts"])
+
+    steps = {
+        step: {"count": len(durations[step]), "failed": failures[step], **percentiles(durations[step])}
+        for step in sorted(set(durations) | set(failures))
+    }
+    file_seconds = [end - start for start, end in file_spans.values()]
+    return {"steps": steps, "file_seconds": {"count": len(file_seconds), **percentiles(file_seconds)}}
+
+
+def provider_stats(port: int) -> dict:
+    return httpx.get(f"http://127.0.0.1:{port}/stats").json()
+
+
+def stats_delta(before: dict, after: dict) -> dict:
+    return {
+        kind: {provider: count - before[kind].get(provider, 0) for provider, count in after[kind].items()}
+        for kind in after
+    }
+
+
+async def run_round(args, round_index: int, file_refs, events: list[dict]) -> dict:
+    from src.client import client
+    from src.utils.util import check_option, ANALYSIS_MODES, DIARIZATION_ENGINES, TRANSLATION_MODES
+
+    job_id = f"{int(time.time() * 1000)}-parent_workflow"
+    stats_before = provider_stats(args.port)
+    memory: list[int] = [resident_memory_bytes()]
+    sampler = asyncio.create_task(sample_memory(memory))
+
+    started = time.perf_counter()
+    try:
+        run_id = await client.schedule_workflow(
+            workflow_name="ParentWorkflow",
+            workflow_id=job_id,
+            input={
+                "file_refs": file_refs,
+                "max_concurrent_children": args.max_concurrent_children,
+                "diarization_engine": check_option("diarization_engine", args.diarization_engine, DIARIZATION_ENGINES),
+                "translation_mode": check_option("translation_mode", args.translation_mode, TRANSLATION_MODES),
+                "analysis_mode": check_option("analysis_mode", args.analysis_mode, ANALYSIS_MODES),
+            },
+        )
+        results = await client.get_workflow_result(workflow_id=job_id, run_id=run_id)
+        elapsed = time.perf_counter() - started
+        # Let the last NOTIFYs reach the listener
+        await asyncio.sleep(EVENT_DRAIN_SECONDS)
+    finally:
+        sampler.cancel()
+
+    statuses = [result.get("status") for result in results or []]
+    return {
+        "round": round_index,
+        "job_id": job_id,
+        "files": len(file_refs),
+        "completed": statuses.count("completed"),
+        "failed": len(statuses) - statuses.count("completed"),
+        "elapsed_seconds": round(elapsed, 3),
+        "files_per_minute": round(len(file_refs) / elapsed * 60, 2),
+        "rss_start_mb": round(memory[0] / 2**20, 1),
+        "rss_peak_mb": round(max(memory) / 2**20, 1),
+        "provider_calls": stats_delta(stats_before, provider_stats(args.port)),
+        **summarize_round(job_id, events),
+    }
+
+
+def format_report(report: dict) -> str:
+    def seconds(value):
+        return "-" if value is None else f"{value:.3f}"
+
+    lines = []
+    for round_report in report["rounds"]:
+        lines.append(
+            f"Round {round_report['round']}: {round_report['files']} files in {round_report['elapsed_seconds']:.1f}s "
+            f"= {round_report['files_per_minute']:.1f} files/min "
+            f"({round_report['completed']} completed, {round_report['failed']} failed)"
+        )
+        lines.append(f"  RSS {round_report['rss_start_mb']:.0f} MB at start, {round_report['rss_peak_mb']:.0f} MB peak")
+        lines.append(f"  {'step':<28}{'count':>7}{'failed':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+        rows = [*round_report["steps"].items(), ("(whole file)", {"failed": 0, **round_report["file_seconds"]})]
+        for step, stats in rows:
+            lines.append(
+                f"  {step:<28}{stats['count']:>7}{stats['failed']:>8}"
+                f"{seconds(stats['p50']):>10}{seconds(stats['p95']):>10}{seconds(stats['p99']):>10}"
+            )
+        calls = round_report["provider_calls"]
+        lines.append("  provider calls: " + ", ".join(
+            f"{provider} {count} ({calls['errors'].get(provider, 0)} errors)"
+            for provider, count in sorted(calls["requests"].items())
+        ))
+        lines.append("")
+    return "\n".join(lines)
+
+
+async def benchmark(args, work_dir: str) -> dict:
+    from src.client import client
+    from src.functions.db_audio_analysis import audio_table_writer
+    from src.services import FUNCTIONS, WORKFLOWS
+    from src.utils.blob_store import blob_store
+    from src.utils.clients import clients
+    from src.utils.db import db
+    from src.utils.events import EventHub, publisher
+    from src.utils.migrations import apply_migrations
+
+    paths = await asyncio.to_thread(build_corpus, args.corpus, args.files, os.path.join(work_dir, "corpus"))
+    file_refs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            file_refs.append((os.path.basename(path), blob_store.put_bytes(f.read())))
+
+    await apply_migrations()
+
+    hub = EventHub()
+    hub.start()
+    events: list[dict] = []
+    collector = asyncio.create_task(collect_events(hub, events))
+    worker = asyncio.create_task(client.start_service(workflows=WORKFLOWS, functions=FUNCTIONS))
+    try:
+        rounds = []
+        for round_index in range(1, args.rounds + 1):
+            if worker.done():
+                worker.result()
+                raise RuntimeError("Benchmark worker stopped")
+            rounds.append(await run_round(args, round_index, file_refs, events))
+        return {
+            "config": {
+                key: getattr(args, key)
+                for key in ("files", "rounds", "max_concurrent_children", "diarization_engine",
+                            "translation_mode", "analysis_mode", "profile")
+            },
+            "rounds": rounds,
+        }
+    finally:
+        for task in (collector, worker):
+            task.cancel()
+        await asyncio.gather(collector, worker, return_exceptions=True)
+        await hub.aclose()
+        await publisher.aclose()
+        await clients.aclose()
+        await audio_table_writer.aclose()
+        await db.aclose()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=16, help="Files per round")
+    parser.add_argument("--rounds", type=int, default=2, help="Round 1 is cold, later rounds hit the caches")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--max-concurrent-children", type=int, default=4)
+    parser.add_argument("--diarization-engine", default="assemblyai")
+    parser.add_argument("--translation-mode", default="single")
+    parser.add_argument("--analysis-mode", default="separate")
+    parser.add_argument(
+        "--profile",
+        help='Provider latency/error profile as JSON, e.g. \'{"openai": {"median_seconds": 2, "error_rate": 0.05}}\'',
+    )
+    parser.add_argument("--port", type=int, default=8200, help="Port for the provider stand-ins")
+    parser.add_argument("--assemblyai-polling-interval", type=float, default=0.5)
+    parser.add_argument("--json", help="Also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def run_benchmark(argv=None):
+    args = parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix="pipeline-benchmark-")
+    configure_environment(args, work_dir)
+    stub = start_provider_stub(args)
+    try:
+        report = asyncio.run(benchmark(args, work_dir))
+    finally:
+        stub.terminate()
+        stub.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    run_benchmark()
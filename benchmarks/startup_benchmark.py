@@ -0,0 +1,111 @@
+"""
+Cold-import benchmark for the worker and API entry points.
+
+Imports each entry module in a fresh interpreter several times and reports
+the median wall time and the slowest imports (from python -X importtime).
+Exits non-zero when an entry point pulls in a provider SDK or ML library at
+import time, or when its median exceeds --budget-seconds, so it can guard CI:
+
+    poetry run python -m benchmarks.startup_benchmark --budget-seconds 1.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use only; importing any of them at startup is a regression
+LAZY_MODULES = ("openai", "groq", "assemblyai", "transformers", "torch", "psycopg", "psycopg_pool", "numpy")
+# Entry module -> the LAZY_MODULES it must not import. The worker registers the
+# audio functions, whose modules are built on numpy, so it may load numpy.
+ENTRY_MODULES = {
+    "src.services": tuple(name for name in LAZY_MODULES if name != "numpy"),
+    "src.app": LAZY_MODULES,
+}
+DEFAULT_RUNS = 5
+SLOWEST_IMPORTS = 10
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}}))
+"""
+
+
+def import_once(module: str) -> tuple[float, list[str], list[tuple[int, str]]]:
+    """(seconds, loaded top-level modules, [(cumulative_us, name)]) for one cold import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT.format(module=module)],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        timings.append((int(cumulative), name.strip()))
+    top_level = sorted({name.split(".")[0] for name in measured["modules"]})
+    return measured["seconds"], top_level, timings
+
+
+def measure(module: str, lazy_modules: tuple[str, ...], runs: int) -> dict:
+    seconds = []
+    for _ in range(runs):
+        elapsed, top_level, timings = import_once(module)
+        seconds.append(elapsed)
+    # Top-level imports only, so a package is not counted again through its submodules
+    slowest = sorted(((us, name) for us, name in timings if "." not in name), reverse=True)[:SLOWEST_IMPORTS]
+    return {
+        "module": module,
+        "median_seconds": round(statistics.median(seconds), 3),
+        "max_seconds": round(max(seconds), 3),
+        "eager_lazy_modules": [name for name in lazy_modules if name in top_level],
+        "slowest_imports": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in slowest],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--budget-seconds", type=float, help="Fail when a median import takes longer than this")
+    parser.add_argument("--json", help="Also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def run_startup_benchmark(argv=None):
+    args = parse_args(argv)
+    reports = [measure(module, lazy_modules, args.runs) for module, lazy_modules in ENTRY_MODULES.items()]
+
+    failures = []
+    for report in reports:
+        print(f"{report['module']}: median {report['median_seconds']:.3f}s, max {report['max_seconds']:.3f}s")
+        for entry in report["slowest_imports"]:
+            print(f"  {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+        if report["eager_lazy_modules"]:
+            failures.append(f"{report['module']} imports {', '.join(report['eager_lazy_modules'])} at startup")
+        if args.budget_seconds is not None and report["median_seconds"] > args.budget_seconds:
+            failures.append(
+                f"{report['module']} took {report['median_seconds']:.3f}s, over the {args.budget_seconds:.3f}s budget"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    run_startup_benchmark()
@@ -0,0 +1,168 @@
+"""
+Local stand-in for the parts of the OpenAI Files and Batch APIs used by
+bulk analysis, so BulkAnalysisWorkflow can be run offline:
+
+    poetry run python -m benchmarks.stubs.openai_batch_server
+    OPENAI_BATCH_BASE_URL=http://localhost:8100/v1 poetry run services
+
+Batches complete BATCH_STUB_DELAY_SECONDS after creation. Every request gets
+a schema-shaped placeholder analysis, except every BATCH_STUB_FAIL_EVERY-th
+one, which fails, to exercise the error path.
+"""
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+import uvicorn
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+BATCH_STUB_DELAY_SECONDS = float(os.getenv("BATCH_STUB_DELAY_SECONDS", 5))
+BATCH_STUB_FAIL_EVERY = int(os.getenv("BATCH_STUB_FAIL_EVERY", 0))
+BATCH_STUB_PORT = int(os.getenv("BATCH_STUB_PORT", 8100))
+
+app = FastAPI()
+
+files: dict[str, dict] = {}
+file_contents: dict[str, bytes] = {}
+batches: dict[str, dict] = {}
+
+
+class BatchCreate(BaseModel):
+    input_file_id: str
+    endpoint: str
+    completion_window: str
+    metadata: dict | None = None
+
+
+def store_file(content: bytes, filename: str, purpose: str) -> dict:
+    file_id = f"file-{uuid.uuid4().hex}"
+    files[file_id] = {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(content),
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "status": "processed",
+    }
+    file_contents[file_id] = content
+    return files[file_id]
+
+
+def placeholder(name: str, schema: dict):
+    if name == "analyzed_at":
+        return datetime.now(timezone.utc).isoformat()
+    if name == "priority_level":
+        return "Low"
+    if schema.get("type") == "array":
+        return [f"stub {name} {i}" for i in range(2)]
+    return f"stub {name}"
+
+
+def placeholder_object(schema: dict) -> dict:
+    """An object with every property of a json_schema filled in."""
+    return {name: placeholder(name, prop) for name, prop in schema["properties"].items()}
+
+
+def complete_request(index: int, line: dict) -> dict:
+    if BATCH_STUB_FAIL_EVERY and (index + 1) % BATCH_STUB_FAIL_EVERY == 0:
+        return {
+            "id": f"batch_req_{uuid.uuid4().hex}",
+            "custom_id": line["custom_id"],
+            "response": None,
+            "error": {"code": "stub_failure", "message": "Simulated failure"},
+        }
+    content = placeholder_object(line["body"]["response_format"]["json_schema"]["schema"])
+    return {
+        "id": f"batch_req_{uuid.uuid4().hex}",
+        "custom_id": line["custom_id"],
+        "response": {
+            "status_code": 200,
+            "request_id": uuid.uuid4().hex,
+            "body": {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": line["body"]["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(content)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            },
+        },
+        "error": None,
+    }
+
+
+def advance(batch: dict):
+    """Finish the batch once its delay has passed, writing the output and error files."""
+    if batch["status"] != "in_progress" or time.time() - batch["created_at"] < BATCH_STUB_DELAY_SECONDS:
+        return
+    lines = [json.loads(line) for line in file_contents[batch["input_file_id"]].decode().splitlines() if line.strip()]
+    results = [complete_request(index, line) for index, line in enumerate(lines)]
+    succeeded = [result for result in results if result["error"] is None]
+    failed = [result for result in results if result["error"] is not None]
+
+    def jsonl(rows):
+        return "\n".join(json.dumps(row) for row in rows).encode()
+
+    batch["output_file_id"] = store_file(jsonl(succeeded), "output.jsonl", "batch_output")["id"] if succeeded else None
+    batch["error_file_id"] = store_file(jsonl(failed), "errors.jsonl", "batch_output")["id"] if failed else None
+    batch["request_counts"] = {"total": len(results), "completed": len(succeeded), "failed": len(failed)}
+    batch["status"] = "completed"
+    batch["completed_at"] = int(time.time())
+
+
+@app.post("/v1/files")
+async def create_file(file: UploadFile = File(...), purpose: str = Form(...)):
+    return store_file(await file.read(), file.filename or "upload.jsonl", purpose)
+
+
+@app.get("/v1/files/{file_id}/content")
+async def get_file_content(file_id: str):
+    if file_id not in file_contents:
+        raise HTTPException(status_code=404, detail=f"No such file {file_id}")
+    return Response(file_contents[file_id], media_type="application/octet-stream")
+
+
+@app.post("/v1/batches")
+async def create_batch(request: BatchCreate):
+    if request.input_file_id not in file_contents:
+        raise HTTPException(status_code=404, detail=f"No such file {request.input_file_id}")
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    batches[batch_id] = {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": request.endpoint,
+        "input_file_id": request.input_file_id,
+        "completion_window": request.completion_window,
+        "status": "in_progress",
+        "created_at": int(time.time()),
+        "output_file_id": None,
+        "error_file_id": None,
+        "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        "metadata": request.metadata,
+    }
+    return batches[batch_id]
+
+
+@app.get("/v1/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    if batch_id not in batches:
+        raise HTTPException(status_code=404, detail=f"No such batch {batch_id}")
+    advance(batches[batch_id])
+    return batches[batch_id]
+
+
+def run_batch_stub():
+    uvicorn.run(app, host="127.0.0.1", port=BATCH_STUB_PORT)
+
+
+if __name__ == "__main__":
+    run_batch_stub()
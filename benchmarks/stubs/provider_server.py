@@ -0,0 +1,223 @@
+"""
+Local stand-ins for the OpenAI, Groq and AssemblyAI endpoints the pipeline
+calls, with configurable latency and error rates, so the whole pipeline can
+run (and be benchmarked) without any provider:
+
+    poetry run python -m benchmarks.stubs.provider_server
+    OPENAI_BASE_URL=http://localhost:8200/v1 \\
+    OPENBABYLON_API_URL=http://localhost:8200/v1 \\
+    GROQ_BASE_URL=http://localhost:8200 \\
+    ASSEMBLYAI_BASE_URL=http://localhost:8200 \\
+    poetry run services
+
+PROVIDER_STUB_PROFILE is a JSON object keyed by provider ("openai", "groq",
+"assemblyai") with any of median_seconds, sigma and error_rate. Latencies are
+log-normal around median_seconds; sigma 0 makes them fixed. GET /stats returns
+request and error counts per provider.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.stubs.openai_batch_server import placeholder_object
+
+PROVIDER_STUB_PORT = int(os.getenv("PROVIDER_STUB_PORT", 8200))
+# Utterances in every fake AssemblyAI transcript
+PROVIDER_STUB_UTTERANCES = int(os.getenv("PROVIDER_STUB_UTTERANCES", 12))
+# Share of a streamed completion's latency spent before the first token
+FIRST_TOKEN_SHARE = 0.3
+
+OPENAI = "openai"
+GROQ = "groq"
+ASSEMBLYAI = "assemblyai"
+
+
+@dataclass
+class LatencyProfile:
+    median_seconds: float
+    sigma: float = 0.4
+    error_rate: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        return self.median_seconds * rng.lognormvariate(0.0, self.sigma) if self.sigma else self.median_seconds
+
+    def fails(self, rng: random.Random) -> bool:
+        return rng.random() < self.error_rate
+
+
+DEFAULT_PROFILES = {
+    OPENAI: LatencyProfile(median_seconds=1.5),
+    GROQ: LatencyProfile(median_seconds=0.5),
+    ASSEMBLYAI: LatencyProfile(median_seconds=6.0),
+}
+
+
+def load_profiles(spec: str | None) -> dict[str, LatencyProfile]:
+    profiles = dict(DEFAULT_PROFILES)
+    for provider, overrides in json.loads(spec or "{}").items():
+        if provider not in profiles:
+            raise ValueError(f"Unknown provider {provider!r}; expected one of {', '.join(profiles)}")
+        profiles[provider] = LatencyProfile(**{**vars(profiles[provider]), **overrides})
+    return profiles
+
+
+profiles = load_profiles(os.getenv("PROVIDER_STUB_PROFILE"))
+rng = random.Random(int(os.getenv("PROVIDER_STUB_SEED", 0)))
+requests_served: Counter = Counter()
+errors_served: Counter = Counter()
+# AssemblyAI transcript id -> (ready_at, transcript)
+transcripts: dict[str, tuple[float, dict]] = {}
+
+app = FastAPI()
+
+
+def count(provider: str) -> tuple[float, bool]:
+    """Latency and failure for one request, recorded in the stats."""
+    profile = profiles[provider]
+    requests_served[provider] += 1
+    failed = profile.fails(rng)
+    if failed:
+        errors_served[provider] += 1
+    return profile.sample(rng), failed
+
+
+def server_error(message: str) -> JSONResponse:
+    return JSONResponse(status_code=500, content={"error": {"message": message, "type": "server_error"}})
+
+
+def fake_translation(prompt: str) -> str:
+    # One translated line per "Speaker X:" line, so output length follows the input
+    lines = re.findall(r"(Speaker \w+):", prompt)
+    return "\n".join(f"{speaker}: Translated line {index}." for index, speaker in enumerate(lines)) or "Translated."
+
+
+@app.get("/stats")
+async def stats():
+    return {"requests": dict(requests_served), "errors": dict(errors_served)}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    latency, failed = count(OPENAI)
+    if failed:
+        await asyncio.sleep(latency * FIRST_TOKEN_SHARE)
+        return server_error("Simulated failure")
+
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        content = json.dumps(placeholder_object(response_format["json_schema"]["schema"]))
+    else:
+        content = fake_translation(body["messages"][-1]["content"])
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    usage = {"prompt_tokens": len(json.dumps(body["messages"])) // 4, "completion_tokens": len(content) // 4}
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+    if not body.get("stream"):
+        await asyncio.sleep(latency)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    def chunk(choices: list, **extra) -> str:
+        return "data: " + json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": choices,
+            **extra,
+        }) + "\n\n"
+
+    async def stream():
+        tokens = re.findall(r"\S+\s*", content)
+        await asyncio.sleep(latency * FIRST_TOKEN_SHARE)
+        token_delay = latency * (1 - FIRST_TOKEN_SHARE) / max(len(tokens), 1)
+        for index, token in enumerate(tokens):
+            delta = {"role": "assistant", "content": token} if index == 0 else {"content": token}
+            yield chunk([{"index": 0, "delta": delta, "finish_reason": None}])
+            await asyncio.sleep(token_delay)
+        yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield chunk([], usage=usage)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.post("/openai/v1/audio/transcriptions")
+async def groq_transcriptions(request: Request):
+    await request.body()
+    latency, failed = count(GROQ)
+    await asyncio.sleep(latency)
+    if failed:
+        return server_error("Simulated failure")
+    return {"text": "Фраза для проверки распознавания речи."}
+
+
+@app.post("/v2/upload")
+async def assemblyai_upload(request: Request):
+    await request.body()
+    return {"upload_url": f"https://stub.invalid/uploads/{uuid.uuid4().hex}"}
+
+
+@app.post("/v2/transcript")
+async def assemblyai_create_transcript(request: Request):
+    body = await request.json()
+    latency, failed = count(ASSEMBLYAI)
+    transcript_id = uuid.uuid4().hex
+    transcript = {"id": transcript_id, "status": "completed", "audio_url": body["audio_url"]}
+    if failed:
+        transcript.update(status="error", error="Simulated failure")
+    else:
+        utterances = [
+            {
+                "speaker": "AB"[index % 2],
+                "text": f"Фраза номер {index}.",
+                "start": index * 3000,
+                "end": index * 3000 + 2500,
+                "confidence": 0.9,
+                "words": [],
+            }
+            for index in range(PROVIDER_STUB_UTTERANCES)
+        ]
+        transcript.update(utterances=utterances, text=" ".join(u["text"] for u in utterances))
+    transcripts[transcript_id] = (time.monotonic() + latency, transcript)
+    return {"id": transcript_id, "status": "queued", "audio_url": body["audio_url"]}
+
+
+@app.get("/v2/transcript/{transcript_id}")
+async def assemblyai_get_transcript(transcript_id: str):
+    if transcript_id not in transcripts:
+        return JSONResponse(status_code=404, content={"error": f"No such transcript {transcript_id}"})
+    ready_at, transcript = transcripts[transcript_id]
+    if time.monotonic() < ready_at:
+        return {"id": transcript_id, "status": "processing", "audio_url": transcript["audio_url"]}
+    return transcript
+
+
+def run_provider_stub():
+    uvicorn.run(app, host="127.0.0.1", port=PROVIDER_STUB_PORT, log_level="warning")
+
+
+if __name__ == "__main__":
+    run_provider_stub()
@@ -1,36 +1,95 @@
 import streamlit as st
+import json
 import requests
-import base64
+import time
+
+API_URL = "http://localhost:8000"
+JOB_POLL_INTERVAL_SECONDS = 2
 # Set page title and header
 st.title("Defense Tech: War Audio Interface")
 
 
 
 uploaded_files = st.file_uploader("Choose a files", accept_multiple_files=True)
-
-if uploaded_files:
-    file_data_list = []
-    for uploaded_file in uploaded_files:
-        audio_data = uploaded_file.read()
-        audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-        file_data_list.append((uploaded_file.name, audio_base64))
+diarization_engine = st.selectbox("Speaker diarization", ["assemblyai", "local"])
+translation_mode = st.selectbox("Translation", ["single", "chunked"])
+analysis_mode = st.selectbox("Analysis", ["separate", "combined"])
 
 if "response_history" not in st.session_state:
     st.session_state.response_history = []
 
 if st.button("Process Audio"):
-    if uploaded_file:
+    if uploaded_files:
         try:
-            with st.spinner('Processing audio...'):
-                response = requests.post(
-                    "http://localhost:8000/api/process_audio",
-                    json={"file_data": file_data_list}
-                )
+            # Send the raw files as multipart instead of base64 strings in a JSON body
+            response = requests.post(
+                f"{API_URL}/api/process_audio/upload",
+                files=[
+                    ("files", (uploaded_file.name, uploaded_file, uploaded_file.type))
+                    for uploaded_file in uploaded_files
+                ],
+                data={
+                    "diarization_engine": diarization_engine,
+                    "translation_mode": translation_mode,
+                    "analysis_mode": analysis_mode,
+                },
+            )
+
+            if response.status_code == 202:
+                job_id = response.json()["job_id"]
+                progress_bar = st.progress(0.0, text=f"Job {job_id} submitted")
+
+                def update_progress():
+                    job = requests.get(f"{API_URL}/api/jobs/{job_id}").json()
+                    done = job["files_completed"] + job["files_failed"]
+                    progress_bar.progress(
+                        done / max(job["files_total"], 1),
+                        text=f"Processed {done} of {job['files_total']} files",
+                    )
+
+                # Follow the job's event stream: translations appear as they are
+                # generated, and progress is refreshed between events
+                translations = {}
+                translation_views = {}
+                file_steps = {}
+                file_views = {}
+                last_poll = 0.0
+                with requests.get(f"{API_URL}/api/jobs/{job_id}/events", stream=True) as events:
+                    for line in events.iter_lines(decode_unicode=True):
+                        if line and line.startswith("data: "):
+                            event = json.loads(line[len("data: "):])
+                            if event.get("type", "").startswith("step."):
+                                steps = file_steps.setdefault(event["workflow_id"], {})
+                                status = event["type"].split(".", 1)[1]
+                                if "duration_seconds" in event:
+                                    status = f"{status} in {event['duration_seconds']:.1f}s"
+                                steps[event["step"]] = status
+                                if event["workflow_id"] not in file_views:
+                                    file_views[event["workflow_id"]] = st.empty()
+                                file_views[event["workflow_id"]].markdown(
+                                    f"**{event['workflow_id']}**  \n"
+                                    + "  \n".join(f"{step}: {status}" for step, status in steps.items())
+                                )
+                            elif event.get("type") == "translation.delta":
+                                chunks = translations.setdefault(event["workflow_id"], {})
+                                chunks[event["chunk_index"]] = chunks.get(event["chunk_index"], "") + event["text"]
+                                if event["workflow_id"] not in translation_views:
+                                    translation_views[event["workflow_id"]] = st.empty()
+                                translation_views[event["workflow_id"]].text_area(
+                                    event["workflow_id"],
+                                    "\n".join(chunks[index] for index in sorted(chunks)),
+                                    height=200,
+                                )
+                        if time.monotonic() - last_poll >= JOB_POLL_INTERVAL_SECONDS:
+                            update_progress()
+                            last_poll = time.monotonic()
+                update_progress()
 
-                if response.status_code == 200:
+                result_response = requests.get(f"{API_URL}/api/jobs/{job_id}/result")
+                if result_response.status_code == 200:
                     st.success("Processing audio was successful!")
 
-                    results = response.json()["result"]
+                    results = result_response.json()["result"]
                     for idx, uploaded_file in enumerate(uploaded_files):
                         st.session_state.response_history.append({
                             "file_name": uploaded_file.name,
@@ -39,7 +98,9 @@ if st.button("Process Audio"):
                             # "translation": results[idx]['translation']
                     })
                 else:
-                    st.error(f"Error: {response.status_code}")
+                    st.error(f"Error: {result_response.status_code} {result_response.json().get('detail')}")
+            else:
+                st.error(f"Error: {response.status_code}")
 
         except requests.exceptions.ConnectionError as e:
             st.error(f"Failed to connect to the server. Make sure the FastAPI server is running.")
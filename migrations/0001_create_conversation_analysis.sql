@@ -0,0 +1,18 @@
+-- Table written by write_to_audio_table. IF NOT EXISTS keeps this a no-op on
+-- databases where the table was created by hand before migrations existed.
+CREATE TABLE IF NOT EXISTS conversation_analysis (
+    id BIGSERIAL PRIMARY KEY,
+    priority_level TEXT,
+    risk_assessment TEXT,
+    key_insights TEXT,
+    critical_entities JSON,
+    locations_mentioned JSON,
+    sentiment_summary TEXT,
+    source_reliability TEXT,
+    information_credibility TEXT,
+    recommended_actions JSON,
+    entity_relationships TEXT,
+    speakers JSON,
+    conversation_duration TEXT,
+    analyzed_at TIMESTAMPTZ
+);
@@ -0,0 +1,26 @@
+-- Keyset pagination orders by (analyzed_at, id), so older hand-made tables need an id
+ALTER TABLE conversation_analysis ADD COLUMN IF NOT EXISTS id BIGSERIAL;
+
+-- A column added above is not unique, and analysis_entities (0003) references it
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_constraint
+        WHERE conrelid = 'conversation_analysis'::regclass
+          AND contype IN ('p', 'u')
+          AND conkey = ARRAY[(
+              SELECT attnum FROM pg_attribute
+              WHERE attrelid = 'conversation_analysis'::regclass AND attname = 'id'
+          )]
+    ) THEN
+        ALTER TABLE conversation_analysis ADD CONSTRAINT conversation_analysis_id_key UNIQUE (id);
+    END IF;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS conversation_analysis_analyzed_at_id_idx
+    ON conversation_analysis (analyzed_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS conversation_analysis_priority_analyzed_at_id_idx
+    ON conversation_analysis (priority_level, analyzed_at DESC, id DESC);
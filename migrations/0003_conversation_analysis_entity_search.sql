@@ -0,0 +1,58 @@
+-- Store the list columns as jsonb so the trigger below can expand them with jsonb_array_elements_text
+ALTER TABLE conversation_analysis
+    ALTER COLUMN critical_entities TYPE JSONB USING critical_entities::jsonb,
+    ALTER COLUMN locations_mentioned TYPE JSONB USING locations_mentioned::jsonb,
+    ALTER COLUMN recommended_actions TYPE JSONB USING recommended_actions::jsonb,
+    ALTER COLUMN speakers TYPE JSONB USING speakers::jsonb;
+
+-- One row per (kind, entity, analysis) so exact and prefix lookups are index scans
+-- on the normalized value instead of parsing JSON on every row.
+CREATE TABLE IF NOT EXISTS analysis_entities (
+    analysis_id BIGINT NOT NULL REFERENCES conversation_analysis (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    value_normalized TEXT NOT NULL,
+    PRIMARY KEY (kind, value_normalized, analysis_id)
+);
+
+CREATE INDEX IF NOT EXISTS analysis_entities_prefix_idx
+    ON analysis_entities (kind, value_normalized text_pattern_ops);
+CREATE INDEX IF NOT EXISTS analysis_entities_analysis_id_idx
+    ON analysis_entities (analysis_id);
+
+CREATE OR REPLACE FUNCTION index_analysis_entities() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM analysis_entities WHERE analysis_id = NEW.id;
+    INSERT INTO analysis_entities (analysis_id, kind, value, value_normalized)
+    SELECT NEW.id, entities.kind, entities.value, lower(btrim(entities.value))
+    FROM (
+        SELECT 'critical_entity' AS kind, value FROM jsonb_array_elements_text(COALESCE(NEW.critical_entities, '[]'::jsonb))
+        UNION ALL
+        SELECT 'location', value FROM jsonb_array_elements_text(COALESCE(NEW.locations_mentioned, '[]'::jsonb))
+        UNION ALL
+        SELECT 'speaker', value FROM jsonb_array_elements_text(COALESCE(NEW.speakers, '[]'::jsonb))
+    ) AS entities
+    WHERE btrim(entities.value) <> ''
+    ON CONFLICT DO NOTHING;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS conversation_analysis_index_entities ON conversation_analysis;
+CREATE TRIGGER conversation_analysis_index_entities
+    AFTER INSERT OR UPDATE OF critical_entities, locations_mentioned, speakers ON conversation_analysis
+    FOR EACH ROW EXECUTE FUNCTION index_analysis_entities();
+
+-- Backfill rows written before this migration
+INSERT INTO analysis_entities (analysis_id, kind, value, value_normalized)
+SELECT id, entities.kind, entities.value, lower(btrim(entities.value))
+FROM conversation_analysis,
+LATERAL (
+    SELECT 'critical_entity' AS kind, value FROM jsonb_array_elements_text(COALESCE(critical_entities, '[]'::jsonb))
+    UNION ALL
+    SELECT 'location', value FROM jsonb_array_elements_text(COALESCE(locations_mentioned, '[]'::jsonb))
+    UNION ALL
+    SELECT 'speaker', value FROM jsonb_array_elements_text(COALESCE(speakers, '[]'::jsonb))
+) AS entities
+WHERE btrim(entities.value) <> ''
+ON CONFLICT DO NOTHING;
@@ -1,16 +1,69 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, File, Form, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from prometheus_client import make_asgi_app
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from src.client import client
-import time
+from src.functions.db_audio_analysis import (
+    ENTITY_SEARCH_MAX_LIMIT, QUERY_DEFAULT_LIMIT, QUERY_MAX_LIMIT, QueryInputParams,
+    iter_audio_rows, query_audio_rows, search_entities,
+)
+from src.jobs import JobRegistry, JOB_RUNNING, JOB_FAILED
+from src.utils.blob_store import blob_store
+from src.utils.db import db
+from src.utils.events import ALL_JOBS, EventHub
+from src.utils.uploads import spool_upload
+from src.utils.util import ANALYSIS_MODES, DIARIZATION_ENGINES, TRANSLATION_MODES, check_modes, check_option
+import asyncio
+import base64
+import json
+import logging
+import os
 import uvicorn
 
 
+MAX_CONCURRENT_CHILD_WORKFLOWS = int(os.getenv("MAX_CONCURRENT_CHILD_WORKFLOWS", 4))
+DEFAULT_DIARIZATION_ENGINE = os.getenv("DIARIZATION_ENGINE", "assemblyai")
+DEFAULT_TRANSLATION_MODE = os.getenv("TRANSLATION_MODE", "single")
+DEFAULT_ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "separate")
+BULK_ANALYSIS_POLL_SECONDS = float(os.getenv("BULK_ANALYSIS_POLL_SECONDS", 60))
+BULK_ANALYSIS_MAX_POLL_SECONDS = float(os.getenv("BULK_ANALYSIS_MAX_POLL_SECONDS", 1800))
+BULK_ANALYSIS_MAX_BATCH_REQUESTS = int(os.getenv("BULK_ANALYSIS_MAX_BATCH_REQUESTS", 1000))
+
+logger = logging.getLogger(__name__)
+
 @dataclass
 class QueryRequest:
     file_data: list[tuple[str, str]]
+    diarization_engine: str = DEFAULT_DIARIZATION_ENGINE
+    translation_mode: str = DEFAULT_TRANSLATION_MODE
+    # "combined" makes one translate_and_extract_info call: no translation.delta
+    # events are streamed, and translation_mode must be "single"
+    analysis_mode: str = DEFAULT_ANALYSIS_MODE
+
+@dataclass
+class BackfillRequest:
+    # (filename, sha256 digest) pairs of audio already in the blob store
+    file_refs: list[tuple[str, str]]
+    diarization_engine: str = DEFAULT_DIARIZATION_ENGINE
+    poll_interval_seconds: float = BULK_ANALYSIS_POLL_SECONDS
+    max_poll_interval_seconds: float = BULK_ANALYSIS_MAX_POLL_SECONDS
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    events.start()
+    yield
+    await events.aclose()
+    await db.aclose()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+jobs = JobRegistry(client)
+events = EventHub()
+
+# Prometheus metrics for the API process; the worker serves its own on WORKER_METRICS_PORT
+app.mount("/metrics", make_asgi_app())
 
 # Add CORS middleware
 app.add_middleware(
@@ -21,35 +74,225 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def submit_job(file_refs, diarization_engine: str, translation_mode: str, analysis_mode: str):
+    check_modes(translation_mode, analysis_mode)
+    return await jobs.submit(
+        filenames=[filename for filename, _ in file_refs],
+        workflow_input={
+            "file_refs": file_refs,
+            "max_concurrent_children": MAX_CONCURRENT_CHILD_WORKFLOWS,
+            "diarization_engine": check_option("diarization_engine", diarization_engine, DIARIZATION_ENGINES),
+            "translation_mode": check_option("translation_mode", translation_mode, TRANSLATION_MODES),
+            "analysis_mode": check_option("analysis_mode", analysis_mode, ANALYSIS_MODES),
+        },
+    )
+
+def job_links(job):
+    return {
+        "job_id": job.job_id,
+        "workflow_id": job.job_id,
+        "run_id": job.run_id,
+        "status_url": f"/api/jobs/{job.job_id}",
+        "result_url": f"/api/jobs/{job.job_id}/result",
+        "events_url": f"/api/jobs/{job.job_id}/events",
+    }
+
+def store_base64_audio(base64_content: str) -> str:
+    return blob_store.put_bytes(base64.b64decode(base64_content))
+
 @app.get("/")
 async def home():
     return "Welcome to the Quickstart: War Audio Transcription & Translation example!"
 
-@app.post("/api/process_audio")
+@app.post("/api/process_audio", status_code=202)
 async def schedule_workflow(request: QueryRequest):
     try:
-        workflow_id = f"{int(time.time() * 1000)}-parent_workflow"
-        
-        runId = await client.schedule_workflow(
-            workflow_name="ParentWorkflow",
-            workflow_id=workflow_id,
-            input={"file_data": request.file_data}
+        # Store the audio once by content hash; the workflows only carry the digest.
+        # Decoding, hashing and writing run in a thread to keep the event loop free.
+        file_refs = [
+            (filename, await asyncio.to_thread(store_base64_audio, base64_content))
+            for filename, base64_content in request.file_data
+        ]
+
+        job = await submit_job(
+            file_refs, request.diarization_engine, request.translation_mode, request.analysis_mode,
         )
-        print("Scheduled workflow", runId)
-        
-        result = await client.get_workflow_result(
-            workflow_id=workflow_id,
-            run_id=runId
+        print("Scheduled workflow", job.run_id)
+
+        return job_links(job)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/process_audio/upload", status_code=202)
+async def schedule_workflow_upload(
+    files: list[UploadFile] = File(...),
+    diarization_engine: str = Form(DEFAULT_DIARIZATION_ENGINE),
+    translation_mode: str = Form(DEFAULT_TRANSLATION_MODE),
+    analysis_mode: str = Form(
+        DEFAULT_ANALYSIS_MODE,
+        description='"combined" streams no translation.delta events and needs translation_mode "single"',
+    ),
+):
+    # Starlette streams multipart parts into spooled temp files, and spool_upload
+    # copies them into the blob store chunk by chunk, so memory stays flat.
+    try:
+        file_refs = [await spool_upload(upload) for upload in files]
+
+        job = await submit_job(file_refs, diarization_engine, translation_mode, analysis_mode)
+        print("Scheduled workflow", job.run_id)
+
+        return job_links(job)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await jobs.find(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.summary()
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await jobs.find(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    if job.status == JOB_RUNNING:
+        return JSONResponse(status_code=202, content=job.summary())
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+
+    return {
+        "result": job.result,
+        "workflow_id": job.job_id,
+        "run_id": job.run_id
+    }
+
+async def sse_messages(subscription):
+    async for event in subscription:
+        if event is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def event_stream_response(messages):
+    return StreamingResponse(
+        messages,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    # Server-sent events relayed from the worker: step.started/completed/failed
+    # for every function and translation.delta tokens as they are generated.
+    # The stream ends once the job has finished.
+    job = await jobs.find(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+
+    async def stream():
+        async for message in sse_messages(events.subscribe(job_id, finished=lambda: job.status != JOB_RUNNING)):
+            yield message
+        yield f"event: job.finished\ndata: {json.dumps(job.summary())}\n\n"
+
+    return event_stream_response(stream())
+
+@app.get("/api/events")
+async def stream_all_events():
+    # Every job's events as they happen, for dashboards; this stream never ends
+    return event_stream_response(sse_messages(events.subscribe(ALL_JOBS, finished=lambda: False)))
+
+@app.post("/api/analyses/backfill", status_code=202)
+async def schedule_backfill(request: BackfillRequest):
+    # Re-analyses stored audio through the OpenAI Batch API: cheaper than the
+    # interactive path, but results arrive when the batch does (up to 24h).
+    missing = [filename for filename, digest in request.file_refs if not blob_store.exists(digest)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Audio not in the blob store: {', '.join(missing)}")
+    try:
+        job = await jobs.submit(
+            filenames=[filename for filename, _ in request.file_refs],
+            workflow_input={
+                "file_refs": request.file_refs,
+                "max_concurrent_files": MAX_CONCURRENT_CHILD_WORKFLOWS,
+                "diarization_engine": check_option("diarization_engine", request.diarization_engine, DIARIZATION_ENGINES),
+                "poll_interval_seconds": request.poll_interval_seconds,
+                "max_poll_interval_seconds": request.max_poll_interval_seconds,
+                "max_batch_requests": BULK_ANALYSIS_MAX_BATCH_REQUESTS,
+            },
+            workflow_name="BulkAnalysisWorkflow",
+            job_id_suffix="bulk_analysis_workflow",
+            watch_files=False,
         )
-        
-        return {
-            "result": result,
-            "workflow_id": workflow_id,
-            "run_id": runId
-        }
+        logger.info("Scheduled backfill %s", job.run_id)
+
+        return job_links(job)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def analysis_query_params(
+    priority_level: str | None = None,
+    analyzed_after: str | None = None,
+    analyzed_before: str | None = None,
+    columns: str | None = Query(None, description="Comma-separated column names"),
+    limit: int = Query(QUERY_DEFAULT_LIMIT, ge=1, le=QUERY_MAX_LIMIT),
+    cursor: str | None = None,
+    entity: str | None = None,
+    entity_kind: str | None = None,
+    entity_match: str = "exact",
+) -> QueryInputParams:
+    return QueryInputParams(
+        priority_level=priority_level,
+        analyzed_after=analyzed_after,
+        analyzed_before=analyzed_before,
+        columns=[column.strip() for column in columns.split(",") if column.strip()] if columns else None,
+        limit=limit,
+        cursor=cursor,
+        entity=entity,
+        entity_kind=entity_kind,
+        entity_match=entity_match,
+    )
+
+@app.get("/api/analyses")
+async def list_analyses(params: QueryInputParams = Depends(analysis_query_params)):
+    try:
+        return await query_audio_rows(params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/analyses/export")
+async def export_analyses(params: QueryInputParams = Depends(analysis_query_params)):
+    # Streams every matching row as NDJSON straight from a server-side cursor.
+    # limit and cursor are ignored here; the export covers the whole filter.
+    try:
+        params.cursor = None
+        query_rows = iter_audio_rows(params)
+        first_row = await anext(query_rows, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def ndjson():
+        if first_row is None:
+            return
+        yield json.dumps(first_row) + "\n"
+        async for row in query_rows:
+            yield json.dumps(row) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/api/entities/search")
+async def search_entity_mentions(
+    q: str = Query(..., min_length=1),
+    kind: str | None = None,
+    match: str = "prefix",
+    limit: int = Query(20, ge=1, le=ENTITY_SEARCH_MAX_LIMIT),
+):
+    try:
+        return {"entities": await search_entities(q, kind=kind, match=match, limit=limit)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Remove Flask-specific run code since FastAPI uses uvicorn
 def run_app():
     uvicorn.run("src.app:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,246 @@
+import numpy as np
+
+from src.audio.features import log_mel_frames
+from src.audio.segment import HOP_SECONDS
+from src.audio.stitch import speaker_label
+
+DIARIZATION_WINDOW_SECONDS = 1.5
+DIARIZATION_WINDOW_HOP_SECONDS = 0.75
+# Clusters are merged while their average cosine distance is below this. Embeddings
+# are mean-centred, so different speakers sit near or below zero similarity
+DIARIZATION_DISTANCE_THRESHOLD = 0.5
+# Clusters whose un-centred centroids are closer than this are one speaker. Centring
+# removes the scale, so a single voice's window-to-window noise looks as far apart as
+# two voices do; the un-centred distance keeps that scale
+DIARIZATION_MIN_SPEAKER_DISTANCE = 0.15
+# Clusters with fewer windows than this (e.g. a window straddling a speaker change)
+# are folded into the nearest real speaker
+DIARIZATION_MIN_SPEAKER_WINDOWS = 3
+
+
+def region_windows(regions: list[tuple[int, int]], n_frames: int,
+                   window_frames: int, hop_frames: int) -> list[tuple[int, int, int]]:
+    """
+    (region_index, start_frame, end_frame) analysis windows inside each speech
+    region. A region shorter than a window gets one window of its own length,
+    and the last window is aligned to the region end so no speech is skipped.
+    """
+    windows = []
+    for index, (start, end) in enumerate(regions):
+        end = min(end, n_frames)
+        if end - start <= window_frames:
+            windows.append((index, start, end))
+            continue
+        starts = list(range(start, end - window_frames + 1, hop_frames))
+        if starts[-1] + window_frames < end:
+            starts.append(end - window_frames)
+        windows.extend((index, s, s + window_frames) for s in starts)
+    return windows
+
+
+def window_embeddings(log_mel: np.ndarray, windows: list[tuple[int, int, int]]) -> np.ndarray:
+    """
+    embed_frames for every window at once: per-band mean and standard deviation
+    of the gain-normalised spectrum, from cumulative sums over frames. Quiet
+    frames (pauses, padding) are left out so they do not pull windows at the
+    edge of a region towards each other. The rows are L2-normalised but not
+    centred; see centre_embeddings.
+    """
+    loudness = log_mel.mean(axis=1)
+    voiced = (loudness > np.percentile(loudness, 50) - 10.0).astype(np.float64)[:, None]
+    shape = log_mel - loudness[:, None]
+
+    def cumulative(values):
+        return np.concatenate([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0, dtype=np.float64)])
+
+    total, total_sq, count = cumulative(shape * voiced), cumulative(shape ** 2 * voiced), cumulative(voiced)
+    starts = np.array([start for _, start, _ in windows])
+    ends = np.array([end for _, _, end in windows])
+    counts = np.maximum(count[ends] - count[starts], 1.0)
+    mean = (total[ends] - total[starts]) / counts
+    std = np.sqrt(np.maximum((total_sq[ends] - total_sq[starts]) / counts - mean ** 2, 0.0))
+
+    embeddings = np.concatenate([mean, std], axis=1)
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-10)
+
+
+def centre_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Subtract the mean embedding and re-normalise, so the channel (radio, codec)
+    shared by every speaker does not dominate the cosine distances.
+    """
+    centred = embeddings - embeddings.mean(axis=0, keepdims=True)
+    return centred / np.maximum(np.linalg.norm(centred, axis=1, keepdims=True), 1e-10)
+
+
+def agglomerative_cluster(embeddings: np.ndarray, distance_threshold: float,
+                          max_clusters: int | None = None) -> np.ndarray:
+    """
+    Average-linkage clustering on cosine distance. Each row's nearest cluster is
+    cached and only recomputed when a merge touches it, so a run costs about
+    O(n^2) rather than O(n^3). Labels are numbered by first appearance.
+    """
+    n = len(embeddings)
+    if n <= 1:
+        return np.zeros(n, dtype=int)
+
+    distance = 1.0 - embeddings @ embeddings.T
+    np.fill_diagonal(distance, np.inf)
+    sizes = np.ones(n)
+    active = np.ones(n, dtype=bool)
+    labels = np.arange(n)
+    nearest = np.argmin(distance, axis=1)
+    nearest_distance = distance[np.arange(n), nearest]
+
+    clusters = n
+    while clusters > 1:
+        i = int(np.argmin(nearest_distance))
+        if nearest_distance[i] > distance_threshold and (max_clusters is None or clusters <= max_clusters):
+            break
+        j = int(nearest[i])
+
+        # Lance-Williams update for average linkage, merging j into i
+        merged = (sizes[i] * distance[i] + sizes[j] * distance[j]) / (sizes[i] + sizes[j])
+        distance[i, :] = merged
+        distance[:, i] = merged
+        distance[i, i] = np.inf
+        distance[j, :] = np.inf
+        distance[:, j] = np.inf
+        sizes[i] += sizes[j]
+        active[j] = False
+        nearest_distance[j] = np.inf
+        labels[labels == j] = i
+        clusters -= 1
+
+        stale = active & ((nearest == i) | (nearest == j))
+        stale[i] = True
+        for k in np.flatnonzero(stale):
+            nearest[k] = np.argmin(distance[k])
+            nearest_distance[k] = distance[k, nearest[k]]
+        closer = active & (merged < nearest_distance)
+        closer[i] = False
+        nearest[closer] = i
+        nearest_distance[closer] = merged[closer]
+
+    return renumber_labels(labels)
+
+
+def renumber_labels(labels: np.ndarray) -> np.ndarray:
+    """Labels 0..k-1 numbered by first appearance, with no gaps left by emptied clusters."""
+    _, first_seen, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    return np.argsort(np.argsort(first_seen))[inverse]
+
+
+def cluster_centroids(embeddings: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    centroids = np.stack([embeddings[labels == label].mean(axis=0) for label in range(labels.max() + 1)])
+    return centroids / np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-10)
+
+
+def merge_close_clusters(embeddings: np.ndarray, labels: np.ndarray, min_distance: float) -> np.ndarray:
+    """Merge the closest pair of clusters while their centroids are less than min_distance apart."""
+    labels = labels.copy()
+    while labels.max() > 0:
+        centroids = cluster_centroids(embeddings, labels)
+        distance = 1.0 - centroids @ centroids.T
+        np.fill_diagonal(distance, np.inf)
+        i, j = np.unravel_index(np.argmin(distance), distance.shape)
+        if distance[i, j] >= min_distance:
+            break
+        i, j = min(i, j), max(i, j)
+        labels[labels == j] = i
+        labels[labels > j] -= 1
+    return renumber_labels(labels)
+
+
+def fold_small_clusters(embeddings: np.ndarray, labels: np.ndarray, min_windows: int) -> np.ndarray:
+    """Reassign windows of clusters smaller than min_windows to the most similar remaining cluster."""
+    counts = np.bincount(labels)
+    keep = np.flatnonzero(counts >= min_windows)
+    if len(keep) == 0 or len(keep) == len(counts):
+        return labels
+    centroids = cluster_centroids(embeddings, labels)[keep]
+    small = ~np.isin(labels, keep)
+    labels = labels.copy()
+    labels[small] = keep[np.argmax(embeddings[small] @ centroids.T, axis=1)]
+    return renumber_labels(labels)
+
+
+def diarize(
+    samples: np.ndarray,
+    sample_rate: int,
+    regions: list[tuple[int, int]],
+    distance_threshold: float = DIARIZATION_DISTANCE_THRESHOLD,
+    max_speakers: int | None = None,
+    min_speaker_distance: float = DIARIZATION_MIN_SPEAKER_DISTANCE,
+) -> list[dict]:
+    """
+    Speaker turns within the given speech regions (sample offsets), as dicts
+    with speaker, start and end (samples) and confidence, the turn's mean
+    similarity to its speaker's centroid.
+    """
+    if not regions:
+        return []
+    log_mel = log_mel_frames(samples, sample_rate)
+    hop = int(HOP_SECONDS * sample_rate)
+    frame_regions = [(start // hop, -(-end // hop)) for start, end in regions]
+    windows = region_windows(
+        frame_regions,
+        len(log_mel),
+        int(DIARIZATION_WINDOW_SECONDS / HOP_SECONDS),
+        int(DIARIZATION_WINDOW_HOP_SECONDS / HOP_SECONDS),
+    )
+    raw_embeddings = window_embeddings(log_mel, windows)
+    embeddings = centre_embeddings(raw_embeddings)
+    labels = agglomerative_cluster(embeddings, distance_threshold, max_speakers)
+
+    # A single window between two others of the region is either noise or straddles a
+    # speaker change; either way it belongs to whichever neighbour's speaker it is closer to
+    centroids = cluster_centroids(embeddings, labels)
+    for k in range(1, len(windows) - 1):
+        same_region = windows[k - 1][0] == windows[k][0] == windows[k + 1][0]
+        if same_region and labels[k] != labels[k - 1] and labels[k] != labels[k + 1]:
+            neighbours = [labels[k - 1], labels[k + 1]]
+            labels[k] = neighbours[int(np.argmax(centroids[neighbours] @ embeddings[k]))]
+    # Smoothing can empty a one-window cluster; later steps index centroids by label
+    labels = renumber_labels(labels)
+
+    labels = merge_close_clusters(raw_embeddings, labels, min_speaker_distance)
+    labels = fold_small_clusters(embeddings, labels, DIARIZATION_MIN_SPEAKER_WINDOWS)
+    centroids = cluster_centroids(embeddings, labels)
+    similarity = np.sum(embeddings * centroids[labels], axis=1)
+
+    turns = []
+    for k, (region_index, start, end) in enumerate(windows):
+        region_start, region_end = regions[region_index]
+        # Each window owns the span between the midpoints to its neighbours in the same region
+        if k > 0 and windows[k - 1][0] == region_index:
+            owned_start = (start + windows[k - 1][2]) // 2 * hop
+        else:
+            owned_start = region_start
+        if k + 1 < len(windows) and windows[k + 1][0] == region_index:
+            owned_end = (windows[k + 1][1] + end) // 2 * hop
+        else:
+            owned_end = region_end
+
+        previous = turns[-1] if turns else None
+        if previous and previous["region"] == region_index and previous["label"] == labels[k]:
+            previous["end"] = owned_end
+            previous["similarities"].append(similarity[k])
+        else:
+            turns.append({
+                "region": region_index,
+                "label": labels[k],
+                "start": owned_start,
+                "end": owned_end,
+                "similarities": [similarity[k]],
+            })
+
+    return [
+        {
+            "speaker": speaker_label(int(turn["label"])),
+            "start": int(turn["start"]),
+            "end": int(turn["end"]),
+            "confidence": round(float(np.clip(np.mean(turn["similarities"]), 0.0, 1.0)), 4),
+        }
+        for turn in turns
+    ]
@@ -0,0 +1,67 @@
+import functools
+
+import numpy as np
+
+from src.audio.segment import frame_signal
+
+N_FFT = 512
+N_MELS = 40
+# Frames per FFT batch; bounds the temporary spectrum to a few tens of MB for long recordings
+FEATURE_BLOCK_FRAMES = 8192
+
+
+@functools.lru_cache(maxsize=8)
+def mel_filterbank(sample_rate: int, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """(n_mels, n_fft // 2 + 1) triangular mel filters."""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    fft_bins = np.arange(n_fft // 2 + 1)[None, :]
+    left, center, right = bins[:-2, None], bins[1:-1, None], bins[2:, None]
+    rising = (fft_bins - left) / np.maximum(center - left, 1)
+    falling = (right - fft_bins) / np.maximum(right - center, 1)
+    return np.clip(np.minimum(rising, falling), 0.0, None)
+
+
+def log_mel_frames(samples: np.ndarray, sample_rate: int,
+                   frame_seconds: float = 0.025, hop_seconds: float = 0.010) -> np.ndarray:
+    """(n_frames, N_MELS) log mel energies, with one batched FFT per block of frames."""
+    frames = frame_signal(samples, int(frame_seconds * sample_rate), int(hop_seconds * sample_rate))
+    window = np.hanning(frames.shape[1]).astype(np.float32)
+    filterbank = mel_filterbank(sample_rate).T
+    log_mel = np.empty((len(frames), filterbank.shape[1]), dtype=np.float32)
+    for start in range(0, len(frames), FEATURE_BLOCK_FRAMES):
+        block = frames[start:start + FEATURE_BLOCK_FRAMES]
+        spectrum = np.abs(np.fft.rfft(block * window, n=N_FFT, axis=1)) ** 2
+        log_mel[start:start + len(block)] = np.log(spectrum @ filterbank + 1e-10)
+    return log_mel
+
+
+def embed_frames(log_mel: np.ndarray) -> np.ndarray:
+    """
+    Fixed-size voice signature from a block of log mel frames: per-band mean and
+    standard deviation after removing the loudness of each frame, L2-normalised.
+    """
+    if len(log_mel) == 0:
+        return np.zeros(2 * N_MELS)
+    # Subtracting the frame mean removes overall gain, leaving the spectral shape
+    shape = log_mel - log_mel.mean(axis=1, keepdims=True)
+    embedding = np.concatenate([shape.mean(axis=0), shape.std(axis=0)])
+    return embedding / max(np.linalg.norm(embedding), 1e-10)
+
+
+def speaker_embedding(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    return embed_frames(log_mel_frames(samples, sample_rate))
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarity between the rows of a and b."""
+    a = a / np.maximum(np.linalg.norm(a, axis=-1, keepdims=True), 1e-10)
+    b = b / np.maximum(np.linalg.norm(b, axis=-1, keepdims=True), 1e-10)
+    return a @ b.T
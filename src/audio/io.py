@@ -0,0 +1,45 @@
+import json
+import subprocess
+
+import numpy as np
+
+# Sample rate used for all local analysis (silence detection, speaker features)
+ANALYSIS_SAMPLE_RATE = 16000
+
+
+def probe_duration(path: str) -> float:
+    """Duration in seconds, read from the container header without decoding."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", path],
+        capture_output=True,
+        check=True,
+    )
+    return float(json.loads(result.stdout)["format"]["duration"])
+
+
+def decode_audio(path: str, sample_rate: int = ANALYSIS_SAMPLE_RATE) -> np.ndarray:
+    """Decode any ffmpeg-readable file to mono float32 samples in [-1, 1]."""
+    result = subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-v", "error", "-i", path,
+            "-f", "f32le", "-acodec", "pcm_f32le", "-ac", "1", "-ar", str(sample_rate), "-",
+        ],
+        capture_output=True,
+        check=True,
+    )
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def encode_audio(samples: np.ndarray, sample_rate: int, path: str, codec_args: list[str] | None = None):
+    """Encode mono float32 samples to path; the container is picked from the extension."""
+    codec_args = codec_args or []
+    subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-v", "error", "-y",
+            "-f", "f32le", "-ar", str(sample_rate), "-ac", "1", "-i", "-",
+            *codec_args, path,
+        ],
+        input=np.ascontiguousarray(samples, dtype=np.float32).tobytes(),
+        capture_output=True,
+        check=True,
+    )
@@ -0,0 +1,59 @@
+import numpy as np
+
+from src.audio.io import ANALYSIS_SAMPLE_RATE, decode_audio, encode_audio
+from src.audio.vad import compress_silence, detect_speech
+
+# Opus in an Ogg container is accepted by both AssemblyAI and Groq and stays
+# intelligible for speech well below mp3 bitrates
+NORMALIZED_EXTENSION = ".ogg"
+NORMALIZED_CODEC_ARGS = ["-c:a", "libopus", "-application", "voip"]
+
+RESAMPLE_FILTER_TAPS = 63
+
+
+def lowpass_filter(cutoff: float, taps: int = RESAMPLE_FILTER_TAPS) -> np.ndarray:
+    """Windowed-sinc FIR low-pass; cutoff is a fraction of the sample rate (0 < cutoff < 0.5)."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Resample mono samples already in memory (files are resampled by ffmpeg while
+    decoding). When downsampling, frequencies above the new Nyquist
+    are filtered out first so they do not alias into the speech band.
+    """
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    if target_rate < source_rate:
+        # Cut off slightly below the new Nyquist to leave room for the filter's transition band
+        samples = np.convolve(samples, lowpass_filter(0.45 * target_rate / source_rate), mode="same")
+    n_out = int(round(len(samples) * target_rate / source_rate))
+    positions = np.arange(n_out) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def normalize_file(source_path: str, target_path: str, bitrate: str,
+                   sample_rate: int = ANALYSIS_SAMPLE_RATE,
+                   kept_silence_seconds: float | None = None) -> dict:
+    """
+    Decode source_path to mono at sample_rate and re-encode it as speech-optimised Opus.
+    ffmpeg downmixes and resamples while decoding, so only the 16 kHz mono
+    samples are ever held in memory, never the file's native rate and channels.
+
+    With kept_silence_seconds set, non-speech is cut down to that much silence
+    between speech regions. Returns the speech ratio and the time map from the
+    trimmed audio back to the original (empty when nothing was trimmed).
+    """
+    mono = decode_audio(source_path, sample_rate)
+
+    regions = detect_speech(mono, sample_rate)
+    speech_ratio = sum(end - start for start, end in regions) / len(mono) if len(mono) else 0.0
+    time_map = []
+    # With no speech found there is nothing to keep, so the provider still gets the whole file
+    if kept_silence_seconds is not None and regions:
+        mono, time_map = compress_silence(mono, sample_rate, regions, kept_silence_seconds)
+
+    encode_audio(mono, sample_rate, target_path, [*NORMALIZED_CODEC_ARGS, "-b:a", bitrate])
+    return {"speech_ratio": round(speech_ratio, 4), "time_map": time_map}
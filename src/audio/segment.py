@@ -0,0 +1,91 @@
+import numpy as np
+
+# A whole number of hops, so frame_sums can work on hop-sized blocks
+FRAME_SECONDS = 0.020
+HOP_SECONDS = 0.010
+
+
+def frame_signal(samples: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """(n_frames, frame_length) strided view over samples; the tail is zero-padded."""
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    n_frames = 1 + (len(samples) - frame_length + hop_length - 1) // hop_length
+    padded_length = (n_frames - 1) * hop_length + frame_length
+    if padded_length > len(samples):
+        samples = np.pad(samples, (0, padded_length - len(samples)))
+    return np.lib.stride_tricks.as_strided(
+        samples,
+        shape=(n_frames, frame_length),
+        strides=(samples.strides[0] * hop_length, samples.strides[0]),
+        writeable=False,
+    )
+
+
+def frame_sums(values: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """
+    Sum of values over each frame without materialising the framed copy, in
+    O(n) rather than O(n * frame_length). The last frame is cut short at the
+    end of the signal.
+    """
+    n_frames = max(1, 1 + (len(values) - frame_length + hop_length - 1) // hop_length)
+
+    if frame_length % hop_length == 0:
+        # Sum each hop-sized block once with a reshape, then combine whole blocks into frames
+        n_full = len(values) // hop_length
+        block_sums = values[:n_full * hop_length].reshape(n_full, hop_length).sum(axis=1, dtype=np.float64)
+        if len(values) > n_full * hop_length:
+            block_sums = np.append(block_sums, values[n_full * hop_length:].sum(dtype=np.float64))
+        cumulative = np.concatenate([[0.0], np.cumsum(block_sums)])
+        starts = np.arange(n_frames)
+        return cumulative[np.minimum(starts + frame_length // hop_length, len(block_sums))] - cumulative[starts]
+
+    cumulative = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    starts = np.arange(n_frames) * hop_length
+    ends = np.minimum(starts + frame_length, len(values))
+    return cumulative[ends] - cumulative[starts]
+
+
+def frame_energy_db(samples: np.ndarray, sample_rate: int,
+                    frame_seconds: float = FRAME_SECONDS, hop_seconds: float = HOP_SECONDS) -> np.ndarray:
+    """Per-frame RMS energy in dBFS, one value per hop."""
+    frame_length = int(frame_seconds * sample_rate)
+    energy = frame_sums(np.square(samples), frame_length, int(hop_seconds * sample_rate))
+    rms = np.sqrt(np.maximum(energy, 0.0) / frame_length)
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def split_on_silence(
+    samples: np.ndarray,
+    sample_rate: int,
+    target_chunk_seconds: float,
+    search_window_seconds: float = 30.0,
+    min_pause_seconds: float = 0.3,
+) -> list[tuple[int, int]]:
+    """
+    Split samples into chunks of roughly target_chunk_seconds, cutting each one
+    at the quietest pause within search_window_seconds of the target boundary so
+    no utterance is cut in half. Returns (start, end) sample offsets.
+    """
+    total = len(samples)
+    target = int(target_chunk_seconds * sample_rate)
+    if total <= target:
+        return [(0, total)]
+
+    hop = int(HOP_SECONDS * sample_rate)
+    energy = frame_energy_db(samples, sample_rate)
+    # Averaging over a pause-length window favours sustained silence over a single quiet frame
+    pause_frames = max(1, int(min_pause_seconds / HOP_SECONDS))
+    smoothed = np.convolve(energy, np.ones(pause_frames) / pause_frames, mode="same")
+    window = int(search_window_seconds / HOP_SECONDS)
+
+    bounds = []
+    start = 0
+    while total - start > target + target // 2:
+        center = (start + target) // hop
+        low = max(start // hop + 1, center - window)
+        high = min(len(smoothed) - 1, center + window)
+        cut = (low + int(np.argmin(smoothed[low:high + 1]))) * hop if high > low else center * hop
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, total))
+    return bounds
@@ -0,0 +1,89 @@
+import string
+
+import numpy as np
+
+from src.audio.features import cosine_similarity, speaker_embedding
+
+# Minimum similarity for a chunk's speaker to be matched to an earlier speaker
+SPEAKER_MATCH_THRESHOLD = 0.85
+
+
+def speaker_label(index: int) -> str:
+    # A, B, ... Z, AA, AB, ... like AssemblyAI's labels
+    letters = string.ascii_uppercase
+    label = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        label = letters[remainder] + label
+    return label
+
+
+def stitch_chunk_utterances(
+    chunk_utterances: list[list[dict]],
+    chunk_offsets_ms: list[int],
+    samples: np.ndarray,
+    sample_rate: int,
+    match_threshold: float = SPEAKER_MATCH_THRESHOLD,
+) -> list[dict]:
+    """
+    Merge per-chunk utterances into one transcript on the original timeline.
+
+    Diarization labels are only consistent within a chunk, so each chunk's
+    speakers are matched to the speakers seen so far by comparing spectral
+    embeddings of their speech. Matches are one-to-one, best first; a speaker
+    with no match above match_threshold becomes a new global speaker.
+    """
+    centroids: list[np.ndarray] = []
+    weights: list[float] = []
+    stitched = []
+
+    for utterances, offset_ms in zip(chunk_utterances, chunk_offsets_ms):
+        local_speakers = list(dict.fromkeys(u["speaker"] for u in utterances))
+
+        local_embeddings = []
+        local_weights = []
+        for speaker in local_speakers:
+            spans = [
+                samples[int((offset_ms + u["start"]) * sample_rate / 1000):int((offset_ms + u["end"]) * sample_rate / 1000)]
+                for u in utterances if u["speaker"] == speaker
+            ]
+            speech = np.concatenate(spans) if spans else np.zeros(0, dtype=np.float32)
+            local_embeddings.append(speaker_embedding(speech, sample_rate))
+            local_weights.append(len(speech) / sample_rate)
+
+        mapping = {}
+        if centroids and local_speakers:
+            similarity = cosine_similarity(np.array(local_embeddings), np.array(centroids))
+            # Greedy one-to-one assignment, most similar pair first
+            for flat_index in np.argsort(similarity, axis=None)[::-1]:
+                local_index, global_index = np.unravel_index(flat_index, similarity.shape)
+                if similarity[local_index, global_index] < match_threshold:
+                    break
+                speaker = local_speakers[local_index]
+                if speaker in mapping or global_index in mapping.values():
+                    continue
+                mapping[speaker] = int(global_index)
+
+        for local_index, speaker in enumerate(local_speakers):
+            embedding, weight = local_embeddings[local_index], local_weights[local_index]
+            if speaker in mapping:
+                global_index = mapping[speaker]
+                total = weights[global_index] + weight
+                if total > 0:
+                    centroids[global_index] = (centroids[global_index] * weights[global_index] + embedding * weight) / total
+                weights[global_index] = total
+            else:
+                mapping[speaker] = len(centroids)
+                centroids.append(embedding)
+                weights.append(weight)
+
+        for utterance in utterances:
+            stitched.append({
+                **utterance,
+                "speaker": speaker_label(mapping[utterance["speaker"]]),
+                "start": utterance["start"] + offset_ms,
+                "end": utterance["end"] + offset_ms,
+            })
+
+    return stitched
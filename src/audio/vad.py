@@ -0,0 +1,127 @@
+import bisect
+
+import numpy as np
+
+from src.audio.segment import FRAME_SECONDS, HOP_SECONDS, frame_energy_db, frame_sums
+
+# A frame is speech when it is this far above the noise floor...
+VAD_ENERGY_MARGIN_DB = 10.0
+# ...and never when it is below this absolute level
+VAD_MIN_ENERGY_DB = -55.0
+# Static and hiss cross zero far more often than voiced speech does
+VAD_MAX_ZERO_CROSSING_RATE = 0.25
+# Loud frames count as speech whatever their zero-crossing rate (fricatives)
+VAD_LOUD_MARGIN_DB = 20.0
+
+VAD_PAD_SECONDS = 0.2
+VAD_MIN_SILENCE_SECONDS = 0.5
+VAD_MIN_SPEECH_SECONDS = 0.25
+
+
+def frame_zero_crossing_rate(samples: np.ndarray, sample_rate: int,
+                             frame_seconds: float = FRAME_SECONDS, hop_seconds: float = HOP_SECONDS) -> np.ndarray:
+    """Fraction of sample pairs in each frame whose sign differs, one value per hop."""
+    crossings = np.signbit(samples[1:]) != np.signbit(samples[:-1])
+    frame_length, hop_length = int(frame_seconds * sample_rate), int(hop_seconds * sample_rate)
+    return frame_sums(crossings, frame_length, hop_length) / frame_length
+
+
+def _fill_short_runs(mask: np.ndarray, value: bool, max_length: int) -> np.ndarray:
+    """Flip runs of `value` no longer than max_length frames, except at the edges."""
+    changes = np.flatnonzero(np.diff(mask.astype(np.int8))) + 1
+    starts = np.concatenate([[0], changes])
+    ends = np.concatenate([changes, [len(mask)]])
+    mask = mask.copy()
+    for start, end in zip(starts, ends):
+        if mask[start] == value and end - start <= max_length and start > 0 and end < len(mask):
+            mask[start:end] = not value
+    return mask
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sample_rate: int,
+    pad_seconds: float = VAD_PAD_SECONDS,
+    min_silence_seconds: float = VAD_MIN_SILENCE_SECONDS,
+    min_speech_seconds: float = VAD_MIN_SPEECH_SECONDS,
+) -> list[tuple[int, int]]:
+    """
+    Speech regions as (start, end) sample offsets, from per-frame energy and
+    zero-crossing rate against an adaptive noise floor. Regions are padded,
+    short pauses inside speech are bridged and isolated blips are dropped.
+    """
+    if len(samples) == 0:
+        return []
+    hop = int(HOP_SECONDS * sample_rate)
+    energy = frame_energy_db(samples, sample_rate)
+    zcr = frame_zero_crossing_rate(samples, sample_rate)
+    n = min(len(energy), len(zcr))
+    energy, zcr = energy[:n], zcr[:n]
+
+    noise_floor = np.percentile(energy, 10)
+    threshold = max(noise_floor + VAD_ENERGY_MARGIN_DB, VAD_MIN_ENERGY_DB)
+    speech = (energy > threshold) & (
+        (zcr < VAD_MAX_ZERO_CROSSING_RATE) | (energy > noise_floor + VAD_LOUD_MARGIN_DB)
+    )
+
+    speech = _fill_short_runs(speech, False, int(min_silence_seconds / HOP_SECONDS))
+    speech = _fill_short_runs(speech, True, int(min_speech_seconds / HOP_SECONDS))
+    pad = int(pad_seconds / HOP_SECONDS)
+    if pad:
+        speech = np.convolve(speech, np.ones(2 * pad + 1), mode="same") > 0
+
+    changes = np.flatnonzero(np.diff(np.concatenate([[0], speech.astype(np.int8), [0]])))
+    return [
+        (int(start) * hop, min(int(end) * hop, len(samples)))
+        for start, end in zip(changes[::2], changes[1::2])
+        if end - start >= int(min_speech_seconds / HOP_SECONDS)
+    ]
+
+
+def compress_silence(
+    samples: np.ndarray, sample_rate: int, regions: list[tuple[int, int]], kept_silence_seconds: float
+) -> tuple[np.ndarray, list[list[int]]]:
+    """
+    Join the speech regions with kept_silence_seconds of silence between them.
+    Returns the trimmed samples and a time map of [trimmed_ms, original_ms]
+    pairs, one per region, for translate_timestamp.
+    """
+    gap = np.zeros(int(kept_silence_seconds * sample_rate), dtype=samples.dtype)
+    pieces, time_map = [], []
+    position = 0
+    for index, (start, end) in enumerate(regions):
+        if index:
+            pieces.append(gap)
+            position += len(gap)
+        time_map.append([position * 1000 // sample_rate, start * 1000 // sample_rate])
+        pieces.append(samples[start:end])
+        position += end - start
+    trimmed = np.concatenate(pieces) if pieces else samples[:0]
+    return trimmed, time_map
+
+
+def translate_timestamp(ms: int, time_map: list[list[int]]) -> int:
+    """Map a millisecond offset in trimmed audio back to the original recording."""
+    if not time_map:
+        return ms
+    index = max(bisect.bisect_right([trimmed for trimmed, _ in time_map], ms) - 1, 0)
+    trimmed_start, original_start = time_map[index]
+    original = original_start + ms - trimmed_start
+    # Offsets inside an inserted gap are clamped to the start of the next region
+    if index + 1 < len(time_map):
+        original = min(original, time_map[index + 1][1])
+    return original
+
+
+def remap_utterances(utterances: list[dict], time_map: list[list[int]] | None) -> list[dict]:
+    if not time_map:
+        return utterances
+    return [
+        {
+            **utterance,
+            "start": translate_timestamp(utterance["start"], time_map),
+            "end": translate_timestamp(utterance["end"], time_map),
+        }
+        for utterance in utterances
+    ]
+
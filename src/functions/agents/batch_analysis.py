@@ -0,0 +1,173 @@
+from restack_ai.function import function, log
+from dataclasses import dataclass
+import asyncio
+import json
+from pydantic import ValidationError
+
+from .custom_types import ConversationAnalysis
+from .workflow import (
+    ANALYSIS_MODEL,
+    ANALYSIS_TEMPERATURE,
+    analysis_messages,
+    analysis_response_format,
+)
+from src.utils.blob_store import blob_store
+from src.utils.clients import clients
+from src.utils.events import step_events
+from src.utils.metrics import metered, provider_call, record_usage
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+# Batch statuses after which polling stops
+BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+# Per-request error messages are carried in workflow history, so keep them short
+BATCH_ERROR_MAX_CHARS = 500
+
+
+@dataclass
+class BatchRequest:
+    # Echoed back by the Batch API to match results to inputs
+    custom_id: str
+    user_prompt: str
+
+@dataclass
+class SubmitBatchInputParams:
+    # Blob digests of the JSONL lines written by store_analysis_request. Prompts
+    # and analyses stay in the blob store; workflow history only carries digests.
+    request_refs: list[str]
+
+@dataclass
+class BatchInputParams:
+    batch_id: str
+
+
+def batch_line(request: BatchRequest) -> dict:
+    """One JSONL line: the same messages and schema as the interactive extract_info call."""
+    return {
+        "custom_id": request.custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": ANALYSIS_MODEL,
+            "messages": analysis_messages(request.user_prompt),
+            "temperature": ANALYSIS_TEMPERATURE,
+            "response_format": analysis_response_format(ConversationAnalysis),
+        },
+    }
+
+
+def parse_batch_output(line: dict) -> dict:
+    """{"conversation_analysis": json} or {"error": message} for one output line."""
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        return {"error": json.dumps(line.get("error") or response.get("body"))}
+    try:
+        content = response["body"]["choices"][0]["message"]["content"]
+        analysis = ConversationAnalysis.model_validate_json(content)
+    except (KeyError, IndexError, ValidationError) as e:
+        return {"error": f"Unparseable batch output: {e}"}
+    return {"conversation_analysis": analysis.model_dump_json(indent=4)}
+
+
+def read_jsonl(request_refs: list[str]) -> bytes:
+    return b"\n".join(blob_store.read_bytes(digest) for digest in request_refs)
+
+
+@function.defn()
+@metered
+async def store_analysis_request(input: BatchRequest):
+    """Writes one JSONL line to the blob store and returns its digest."""
+    try:
+        line = json.dumps(batch_line(input)).encode("utf-8")
+        request_ref = await asyncio.to_thread(blob_store.put_bytes, line)
+        return {"custom_id": input.custom_id, "request_ref": request_ref}
+    except Exception as e:
+        log.error("store_analysis_request function failed", error=str(e))
+        raise
+
+
+@function.defn()
+@step_events
+@metered
+async def submit_analysis_batch(input: SubmitBatchInputParams):
+    try:
+        log.info("submit_analysis_batch function started", requests=len(input.request_refs))
+        client = clients.openai_batch()
+
+        jsonl = await asyncio.to_thread(read_jsonl, input.request_refs)
+        with provider_call("openai", "submit_analysis_batch"):
+            batch_file = await client.files.create(
+                file=("conversation_analysis.jsonl", jsonl),
+                purpose="batch",
+            )
+            batch = await client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=BATCH_COMPLETION_WINDOW,
+            )
+
+        log.info("submit_analysis_batch function completed", batch_id=batch.id)
+        return {"batch_id": batch.id, "input_file_id": batch_file.id}
+    except Exception as e:
+        log.error("submit_analysis_batch function failed", error=str(e))
+        raise
+
+
+@function.defn()
+@metered
+async def poll_analysis_batch(input: BatchInputParams):
+    try:
+        with provider_call("openai", "poll_analysis_batch"):
+            batch = await clients.openai_batch().batches.retrieve(input.batch_id)
+        log.info("poll_analysis_batch", batch_id=input.batch_id, status=batch.status)
+        return {
+            "status": batch.status,
+            "final": batch.status in BATCH_FINAL_STATUSES,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+            "request_counts": batch.request_counts.model_dump() if batch.request_counts else None,
+        }
+    except Exception as e:
+        log.error("poll_analysis_batch function failed", error=str(e))
+        raise
+
+
+async def store_batch_result(result: dict) -> dict:
+    if "error" in result:
+        return {"error": result["error"][:BATCH_ERROR_MAX_CHARS]}
+    analysis = result["conversation_analysis"].encode("utf-8")
+    return {"analysis_ref": await asyncio.to_thread(blob_store.put_bytes, analysis)}
+
+
+@function.defn()
+@step_events
+@metered
+async def collect_analysis_batch(input: BatchInputParams):
+    """
+    Results of a finished batch keyed by custom_id: {"analysis_ref": digest} of the
+    analysis JSON in the blob store, or {"error": message}. Requests missing from
+    the output are errors.
+    """
+    try:
+        client = clients.openai_batch()
+        with provider_call("openai", "collect_analysis_batch"):
+            batch = await client.batches.retrieve(input.batch_id)
+            contents = [
+                await client.files.content(file_id)
+                for file_id in (batch.output_file_id, batch.error_file_id)
+                if file_id
+            ]
+
+        results = {}
+        for content in contents:
+            for raw_line in content.text.splitlines():
+                if raw_line.strip():
+                    line = json.loads(raw_line)
+                    results[line["custom_id"]] = await store_batch_result(parse_batch_output(line))
+                    record_usage(ANALYSIS_MODEL, "batch_analysis", ((line.get("response") or {}).get("body") or {}).get("usage"))
+
+        log.info("collect_analysis_batch function completed", batch_id=input.batch_id, results=len(results))
+        return results
+    except Exception as e:
+        log.error("collect_analysis_batch function failed", error=str(e))
+        raise
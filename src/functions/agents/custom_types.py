@@ -19,6 +19,11 @@ class ConversationAnalysis(BaseModel):
     analyzed_at: str
 
 
+class TranslatedConversationAnalysis(ConversationAnalysis):
+    # Filled in by the combined translate-and-analyze call, one "Speaker X: ..." line per utterance
+    english_translation: str
+
+
 # # DO NOT USE THIS FOR NOW. Directly output each stuff as model_dump()
 # class User(BaseModel):
 #     personal_details: PersonalDetails
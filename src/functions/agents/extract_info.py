@@ -1,32 +1,27 @@
 from restack_ai.function import function, log
-from openai import OpenAI
 from dataclasses import dataclass
+import json
 import os
-import sys
 from typing import List, Type, TypeVar, Any
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 load_dotenv()
 
-current_file_path = os.path.abspath(__file__)
-parent_directory = os.path.dirname(os.path.dirname(current_file_path))
-sys.path.append(parent_directory)
-
 from .custom_types import ( 
   ConversationAnalysis
 )
 
 from .workflow import (
-    get_conversation_info
+    get_conversation_info,
+    get_conversation_info_with_translation,
 )
+from src.utils.events import step_events
+from src.utils.metrics import metered
 
 # Define a generic type variable
 T = TypeVar("T", bound=BaseModel)
 
-print("Inside extract_info.py")
-print("OpenAI API key:", os.getenv("OPENAI_API_KEY"))
-
 # client: OpenAI = OpenAI()
 # async_client: AsyncOpenAI = AsyncOpenAI()
 
@@ -36,6 +31,8 @@ class FunctionInputParams:
     user_prompt: str
 
 @function.defn()
+@step_events
+@metered
 async def extract_info(input: FunctionInputParams):
     try:
         log.info("extract_info function started", input=input)
@@ -63,3 +60,37 @@ async def extract_info(input: FunctionInputParams):
             api_url=os.environ.get("OPENBABYLON_API_URL"),
         )
         raise
+
+@function.defn()
+@step_events
+@metered
+async def translate_and_extract_info(input: FunctionInputParams):
+    """
+    Combined mode: one structured-output call returns both the English
+    translation and the conversation analysis. The analysis JSON has the same
+    shape as extract_info's, so the DB write is unchanged.
+    """
+    try:
+        log.info("translate_and_extract_info function started", input=input)
+
+        translated_analysis = await get_conversation_info_with_translation(input)
+        analysis = translated_analysis.model_dump()
+        translation = analysis.pop("english_translation")
+
+        log.info("translate_and_extract_info function completed")
+        return {
+            "translation": translation,
+            "conversation_analysis": json.dumps(analysis, indent=4),
+        }
+
+    except ValueError as ve:
+        log.error("Inside translate_and_extract_info: Configuration error", error=str(ve))
+        raise
+    except Exception as e:
+        log.error(
+            "translate_and_extract_info function failed",
+            error=str(e),
+            error_type=type(e).__name__,
+            api_url=os.environ.get("OPENBABYLON_API_URL"),
+        )
+        raise
@@ -2,26 +2,13 @@ from typing import List, Type, TypeVar, Any
 from pydantic import BaseModel
 import asyncio
 import os
-import sys
-from pathlib import Path
-import logging
 from dataclasses import dataclass
 from restack_ai.function import function, log
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Setup path resolution
-API_DIR = Path(__file__).parent
-ROOT_DIR = API_DIR.parent
-sys.path.append(str(API_DIR))
-
 current_file_path = os.path.abspath(__file__)
 parent_directory = os.path.dirname(os.path.dirname(current_file_path))
-sys.path.append(parent_directory)
 
-from custom_types import (
+from .custom_types import (
     ConversationAnalysis
 )
 
@@ -32,8 +19,13 @@ class FunctionInputParams:
 sample_json_db = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), "sample_json_db")
 conversation_analysis_file = os.path.join(sample_json_db, "conversation_analysis.json")
 
-from basic_agent import (
+from .basic_agent import (
+    ANALYSIS_MODEL,
+    ANALYSIS_TEMPERATURE,
+    analysis_messages,
+    analysis_response_format,
     parse_info_async,
+    parse_info_with_translation_async,
 )
 
 async def get_conversation_info(conversationInput: FunctionInputParams) -> Any:
@@ -111,3 +103,8 @@ async def get_conversation_info(conversationInput: FunctionInputParams) -> Any:
 
 
     return (conversation_analysis)
+
+
+async def get_conversation_info_with_translation(conversationInput: FunctionInputParams) -> Any:
+    log.info("Inside get_conversation_info_with_translation in workflow.py")
+    return await parse_info_with_translation_async(conversationInput)
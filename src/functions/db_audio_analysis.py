@@ -1,49 +1,225 @@
 from restack_ai.function import function, log
 from dataclasses import dataclass
-import os
-import base64
 from dotenv import load_dotenv
-import psycopg2
-from psycopg2 import Error
 from datetime import datetime
+from typing import TYPE_CHECKING
+import asyncio
+import base64
 import json
+import uuid
+from src.utils.blob_store import blob_store
+from src.utils.bulk_writer import BulkWriter
+from src.utils.db import db
+from src.utils.events import step_events
+from src.utils.metrics import metered
+
+# psycopg is imported where queries are built, so importing this module (the API does) stays cheap
+if TYPE_CHECKING:
+    from psycopg import sql
 
 load_dotenv()
 
 @dataclass
 class FunctionInputParams:
-    conversation_analysis: str
+    conversation_analysis: str = ""
+    # Blob digest of the analysis JSON, used instead of conversation_analysis by
+    # bulk analysis so the analysis itself stays out of workflow history
+    conversation_analysis_ref: str | None = None
+
+INSERT_COLUMNS = (
+    "priority_level", "risk_assessment", "key_insights",
+    "critical_entities", "locations_mentioned", "sentiment_summary",
+    "source_reliability", "information_credibility", "recommended_actions",
+    "entity_relationships", "speakers", "conversation_duration", "analyzed_at",
+)
+
+# Inserts from concurrent child workflows are batched into multi-row INSERTs
+audio_table_writer = BulkWriter(db, "conversation_analysis", INSERT_COLUMNS)
+
+QUERY_COLUMNS = ("id",) + INSERT_COLUMNS
+QUERY_DEFAULT_LIMIT = 50
+QUERY_MAX_LIMIT = 500
+# Rows fetched per round-trip from the server-side cursor
+QUERY_CURSOR_ITERSIZE = 200
+
+@dataclass
+class QueryInputParams:
+    priority_level: str | None = None
+    # ISO 8601 bounds on analyzed_at, inclusive lower and exclusive upper
+    analyzed_after: str | None = None
+    analyzed_before: str | None = None
+    # Subset of QUERY_COLUMNS to return; id and analyzed_at are always included
+    columns: list[str] | None = None
+    limit: int = QUERY_DEFAULT_LIMIT
+    # Opaque next_cursor from the previous page
+    cursor: str | None = None
+    # Only analyses mentioning this entity (see ENTITY_KINDS), matched exactly or by prefix
+    entity: str | None = None
+    entity_kind: str | None = None
+    entity_match: str = "exact"
+
+# Entity kinds indexed into analysis_entities by migrations/0003, per source column
+ENTITY_KINDS = {
+    "critical_entity": "critical_entities",
+    "location": "locations_mentioned",
+    "speaker": "speakers",
+}
+ENTITY_MATCH_MODES = ("exact", "prefix")
+ENTITY_SEARCH_MAX_LIMIT = 100
+
+def normalize_entity(value: str) -> str:
+    # Must match lower(btrim(value)) in the analysis_entities trigger
+    return value.strip().lower()
 
-postgres_host = os.getenv("POSTGRES_HOST")
-postgres_database = os.getenv("POSTGRES_DATABASE")
-postgres_user = os.getenv("POSTGRES_USER")
-postgres_password = os.getenv("POSTGRES_PASSWORD")
+def entity_condition(entity: str, kind: str | None, match: str) -> tuple["sql.Composed", list]:
+    """WHERE fragment on analysis_entities for an exact or prefix match on the normalized value."""
+    from psycopg import sql
 
-def connect_to_postgres():
+    if kind is not None and kind not in ENTITY_KINDS:
+        raise ValueError(f"Unknown entity kind: {kind}")
+    if match not in ENTITY_MATCH_MODES:
+        raise ValueError(f"Unknown entity match mode: {match}")
+
+    normalized = normalize_entity(entity)
+    if match == "prefix":
+        escaped = normalized.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions = [sql.SQL("value_normalized LIKE %s")]
+        args = [escaped + "%"]
+    else:
+        conditions = [sql.SQL("value_normalized = %s")]
+        args = [normalized]
+    # Always constrain kind, the leading column of both indexes, so a search across
+    # all kinds is one index range per kind rather than a full scan
+    conditions.insert(0, sql.SQL("kind = ANY(%s)"))
+    args.insert(0, [kind] if kind is not None else list(ENTITY_KINDS))
+    return sql.SQL(" AND ").join(conditions), args
+
+def encode_page_cursor(row: dict) -> str:
+    payload = json.dumps([row["analyzed_at"], row["id"]])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_page_cursor(cursor: str) -> tuple[datetime, int]:
     try:
-        connection = psycopg2.connect(
-            host=postgres_host,
-            database=postgres_database,
-            user=postgres_user,
-            password=postgres_password
+        analyzed_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(analyzed_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid page cursor: {cursor}") from e
+
+def build_audio_query(params: QueryInputParams, limit: int | None = None) -> tuple["sql.Composed", list]:
+    from psycopg import sql
+
+    columns = params.columns or list(QUERY_COLUMNS)
+    unknown = [column for column in columns if column not in QUERY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    # Keyset pagination needs the sort key of the last row on every page
+    select_columns = list(dict.fromkeys([*columns, "analyzed_at", "id"]))
+
+    conditions = []
+    args = []
+    if params.priority_level:
+        conditions.append(sql.SQL("priority_level = %s"))
+        args.append(params.priority_level)
+    if params.analyzed_after:
+        conditions.append(sql.SQL("analyzed_at >= %s"))
+        args.append(datetime.fromisoformat(params.analyzed_after.replace('Z', '+00:00')))
+    if params.analyzed_before:
+        conditions.append(sql.SQL("analyzed_at < %s"))
+        args.append(datetime.fromisoformat(params.analyzed_before.replace('Z', '+00:00')))
+    if params.cursor:
+        conditions.append(sql.SQL("(analyzed_at, id) < (%s, %s)"))
+        args.extend(decode_page_cursor(params.cursor))
+    if params.entity:
+        condition, condition_args = entity_condition(params.entity, params.entity_kind, params.entity_match)
+        conditions.append(
+            sql.SQL("id IN (SELECT analysis_id FROM analysis_entities WHERE {})").format(condition)
         )
-        log.info("Successfully connected to PostgreSQL database")
-        return connection
-    except (Exception, Error) as error:
-        print(f"Error connecting to PostgreSQL: {error}")
-        return None
+        args.extend(condition_args)
+
+    query = sql.SQL("SELECT {columns} FROM conversation_analysis{where} ORDER BY analyzed_at DESC, id DESC").format(
+        columns=sql.SQL(", ").join(sql.Identifier(column) for column in select_columns),
+        where=sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""),
+    )
+    if limit is not None:
+        query += sql.SQL(" LIMIT %s")
+        args.append(limit)
+    return query, args
+
+def format_audio_row(row: dict) -> dict:
+    return {
+        column: value.isoformat() if isinstance(value, datetime) else value
+        for column, value in row.items()
+    }
+
+async def iter_audio_rows(params: QueryInputParams, limit: int | None = None):
+    """
+    Stream matching rows through a server-side cursor, QUERY_CURSOR_ITERSIZE rows
+    at a time, so memory does not grow with the size of the table.
+    """
+    from psycopg.rows import dict_row
+
+    query, args = build_audio_query(params, limit=limit)
+    async with db.connection() as connection:
+        async with connection.cursor(name=f"conversation_analysis_{uuid.uuid4().hex}", row_factory=dict_row) as cursor:
+            cursor.itersize = QUERY_CURSOR_ITERSIZE
+            await cursor.execute(query, args)
+            async for row in cursor:
+                yield format_audio_row(row)
+
+async def query_audio_rows(params: QueryInputParams) -> dict:
+    limit = max(1, min(params.limit, QUERY_MAX_LIMIT))
+    # Fetch one extra row to know whether there is another page
+    rows = [row async for row in iter_audio_rows(params, limit=limit + 1)]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_page_cursor(rows[-1])
+
+    return {"rows": rows, "next_cursor": next_cursor}
+
+async def search_entities(
+    term: str,
+    kind: str | None = None,
+    match: str = "prefix",
+    limit: int = 20,
+) -> list[dict]:
+    """
+    Entities matching term, with the number of analyses mentioning each, most
+    mentioned first. Served from the analysis_entities index, not the JSON columns.
+    """
+    from psycopg import sql
+    from psycopg.rows import dict_row
+
+    condition, args = entity_condition(term, kind, match)
+    query = sql.SQL(
+        """
+        SELECT kind, min(value) AS value, value_normalized, count(*) AS analyses
+        FROM analysis_entities
+        WHERE {condition}
+        GROUP BY kind, value_normalized
+        ORDER BY analyses DESC, value_normalized
+        LIMIT %s
+        """
+    ).format(condition=condition)
+    args.append(max(1, min(limit, ENTITY_SEARCH_MAX_LIMIT)))
+
+    async with db.connection() as connection:
+        async with connection.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(query, args)
+            return await cursor.fetchall()
 
 @function.defn()
+@step_events
+@metered
 async def write_to_audio_table(conversation_analysis: FunctionInputParams):
     try:
         log.info("write_to_audio_table function started", input=conversation_analysis)
         
-        log.info("Before connecting to PostgreSQL database")
-        connection = connect_to_postgres()
-        cursor = connection.cursor()
-        log.info("After connecting to PostgreSQL database")
-        
-        data = json.loads(conversation_analysis.conversation_analysis)
+        analysis_json = conversation_analysis.conversation_analysis
+        if conversation_analysis.conversation_analysis_ref:
+            analysis_json = await asyncio.to_thread(blob_store.read_bytes, conversation_analysis.conversation_analysis_ref)
+        data = json.loads(analysis_json)
 
         # insert_query = """
         #     INSERT INTO conversation_analysis (
@@ -70,17 +246,8 @@ async def write_to_audio_table(conversation_analysis: FunctionInputParams):
         #     data['analyzed_at']
         # ))
 
-        insert_query = """
-            INSERT INTO conversation_analysis (
-                priority_level, risk_assessment, key_insights, 
-                critical_entities, locations_mentioned, sentiment_summary,
-                source_reliability, information_credibility, recommended_actions,
-                entity_relationships, speakers, conversation_duration, analyzed_at
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
         # Convert arrays to JSON strings for JSON type columns
-        cursor.execute(insert_query, (
+        params = (
             data['priority_level'],
             data['risk_assessment'],
             data['key_insights'],
@@ -94,62 +261,29 @@ async def write_to_audio_table(conversation_analysis: FunctionInputParams):
             json.dumps(data['speakers']),  # JSON column
             data['conversation_duration'],
             datetime.fromisoformat(data['analyzed_at'].replace('Z', '+00:00'))
-        ))
+        )
 
-        connection.commit()
-        # print(f"Successfully inserted {len(data)} rows into {table_name}")
+        # Waits until the batch holding this row is committed, and raises if this row failed
+        await audio_table_writer.write(params)
 
         log.info("write_to_audio_table function completed")        
         return "Successfully wrote analysis to database"
         
-    except (Exception, Error) as error:
+    except Exception as error:
         log.info("Error writing to table", error=str(error))
-        connection.rollback()  # Roll back in case of error
         log.error("write_to_audio_table function failed", error=error)
         raise error
-    
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-            log.info("PostgreSQL connection is closed")
             
 @function.defn()
-async def read_from_audio_table():
+async def read_from_audio_table(input: QueryInputParams | None = None):
     try:
-        log.info("read_from_table function started")
+        log.info("read_from_table function started", input=input)
 
-        log.info("Before connecting to PostgreSQL database")
-        connection = connect_to_postgres()
-        cursor = connection.cursor()
-        log.info("After connecting to PostgreSQL database")
-        
-        query = f"SELECT * FROM conversation_analysis"
+        page = await query_audio_rows(input or QueryInputParams())
 
-        cursor.execute(query)
+        log.info("read_from_table function completed", rows=len(page["rows"]), next_cursor=page["next_cursor"])
+        return page
         
-        results = cursor.fetchall()
-        
-        column_names = [desc[0] for desc in cursor.description]
-        print(f"Retrieved {len(results)} rows from conversation_analysis table")
-        print(f"Columns: {column_names}")
-        print("Results from DB:\n", results)
-
-        formatted_results = []
-        for row in results:
-            formatted_row = list(row)
-            for i, value in enumerate(formatted_row):
-                if isinstance(value, datetime):
-                    formatted_row[i] = value.isoformat()
-            formatted_results.append(tuple(formatted_row))
-            
-        return formatted_results
-        
-    except (Exception, Error) as error:
+    except Exception as error:
         print(f"Error reading from table: {error}")
-        return []
-
-    finally:
-        if cursor:
-            cursor.close()
+        return {"rows": [], "next_cursor": None}
@@ -0,0 +1,103 @@
+from restack_ai.function import function, log
+from dataclasses import dataclass
+import asyncio
+import os
+import tempfile
+from dotenv import load_dotenv
+from src.audio.io import ANALYSIS_SAMPLE_RATE, probe_duration
+from src.audio.normalize import NORMALIZED_EXTENSION, normalize_file
+from src.utils.blob_store import blob_store
+from src.utils.disk_cache import CACHE_DIR, DiskCache, make_cache_key
+from src.utils.events import step_events
+from src.utils.heartbeat import heartbeating
+from src.utils.metrics import metered, register_cache
+
+load_dotenv()
+
+NORMALIZE_BITRATE = os.getenv("AUDIO_NORMALIZE_BITRATE", "24k")
+# Non-speech is shortened to this many seconds of silence; leave unset in the env as "off" to keep it all
+VAD_KEPT_SILENCE = os.getenv("AUDIO_VAD_KEPT_SILENCE_SECONDS", "0.3")
+VAD_KEPT_SILENCE_SECONDS = None if VAD_KEPT_SILENCE == "off" else float(VAD_KEPT_SILENCE)
+
+# Maps a source digest to its normalized blob digest and VAD results, so a recording is only processed once
+normalized_audio_cache = DiskCache(
+    os.getenv("NORMALIZED_AUDIO_CACHE_PATH", os.path.join(CACHE_DIR, "normalized_audio.sqlite3")),
+)
+register_cache("normalized_audio", normalized_audio_cache)
+
+@dataclass
+class FunctionInputParams:
+    # (filename, sha256 digest) pointing into the audio blob store
+    file_ref: tuple[str, str]
+
+def normalize_blob(digest: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        target_path = os.path.join(tmp_dir, f"normalized{NORMALIZED_EXTENSION}")
+        normalized = normalize_file(
+            blob_store.path(digest), target_path, NORMALIZE_BITRATE,
+            kept_silence_seconds=VAD_KEPT_SILENCE_SECONDS,
+        )
+        with open(target_path, "rb") as f:
+            normalized["digest"] = blob_store.put_bytes(f.read())
+    return normalized
+
+@function.defn()
+@step_events
+@metered
+async def normalize_audio(input: FunctionInputParams):
+    """
+    Re-encode a stored recording as 16 kHz mono speech Opus with long silences
+    cut out. Returns the normalized file_ref and its duration, the speech ratio
+    and the time map for putting utterance timestamps back on the original timeline. Falls back
+    to the original file when it is already smaller and nothing was trimmed.
+    """
+    try:
+        log.info("normalize_audio function started", input=input)
+        filename, digest = input.file_ref
+        normalized_filename = os.path.splitext(filename)[0] + NORMALIZED_EXTENSION
+
+        cache_key = make_cache_key(
+            "normalize_audio",
+            digest,
+            {
+                "sample_rate": ANALYSIS_SAMPLE_RATE,
+                "bitrate": NORMALIZE_BITRATE,
+                "kept_silence_seconds": VAD_KEPT_SILENCE_SECONDS,
+            },
+        )
+        normalized = await normalized_audio_cache.aget(cache_key)
+        if normalized is None or not blob_store.exists(normalized["digest"]):
+            # The duration is unknown until the audio is decoded, so the workflow gives this
+            # step a generous timeout and relies on heartbeats to notice a lost worker
+            async with heartbeating():
+                normalized = await asyncio.to_thread(normalize_blob, digest)
+            await normalized_audio_cache.aset(cache_key, normalized)
+
+        source_size = os.path.getsize(blob_store.path(digest))
+        normalized_size = os.path.getsize(blob_store.path(normalized["digest"]))
+        if normalized_size >= source_size and not normalized["time_map"]:
+            log.info("normalize_audio kept original", filename=filename, size=source_size)
+            file_ref = [filename, digest]
+        else:
+            file_ref = [normalized_filename, normalized["digest"]]
+        # Lets the workflow size the identify_speakers timeout to the audio it is sent
+        duration_seconds = await asyncio.to_thread(probe_duration, blob_store.path(file_ref[1]))
+
+        log.info(
+            "normalize_audio function completed",
+            filename=filename,
+            source_size=source_size,
+            normalized_size=normalized_size,
+            speech_ratio=normalized["speech_ratio"],
+            duration_seconds=duration_seconds,
+        )
+        return {
+            "file_ref": file_ref,
+            "speech_ratio": normalized["speech_ratio"],
+            "time_map": normalized["time_map"],
+            "duration_seconds": duration_seconds,
+        }
+
+    except Exception as e:
+        log.error("normalize_audio function failed", error=e)
+        raise e
@@ -1,51 +1,193 @@
 from restack_ai.function import function, log
 from dataclasses import dataclass
-from groq import Groq
+import asyncio
 import os
 import base64
+import tempfile
 from dotenv import load_dotenv
-import assemblyai as aai
+from src.audio.diarize import diarize
+from src.audio.io import ANALYSIS_SAMPLE_RATE, decode_audio, encode_audio, probe_duration
+from src.audio.segment import split_on_silence
+from src.audio.stitch import stitch_chunk_utterances
+from src.audio.vad import detect_speech, remap_utterances
+from src.transcription.backends import TRANSCRIPTION_BACKEND, transcribe_segments
+from src.utils.blob_store import blob_store
+from src.utils.clients import clients
+from src.utils.disk_cache import CACHE_DIR, DiskCache, make_cache_key
+from src.utils.events import step_events
+from src.utils.heartbeat import heartbeating
+from src.utils.metrics import metered, provider_call, register_cache
+from src.utils.util import (
+    DIARIZATION_ENGINE_ASSEMBLYAI, DIARIZATION_ENGINE_LOCAL, DIARIZATION_ENGINES, check_option,
+)
 
 load_dotenv()
 
+LANGUAGE_CODE = "ru"
+SPEAKER_LABELS = True
+
+# Recordings longer than 1.5x this are split at pauses and diarized chunk by chunk
+DIARIZATION_CHUNK_SECONDS = float(os.getenv("DIARIZATION_CHUNK_SECONDS", 600))
+DIARIZATION_MAX_PARALLEL_CHUNKS = int(os.getenv("DIARIZATION_MAX_PARALLEL_CHUNKS", 4))
+DIARIZATION_CHUNK_RETRIES = int(os.getenv("DIARIZATION_CHUNK_RETRIES", 2))
+
+# Upper bound on speakers for the local engine; unset lets the clustering threshold decide
+LOCAL_DIARIZATION_MAX_SPEAKERS = int(os.getenv("LOCAL_DIARIZATION_MAX_SPEAKERS", 0)) or None
+
+# Re-submitted recordings skip AssemblyAI entirely when their transcript is cached
+transcript_cache = DiskCache(
+    os.getenv("TRANSCRIPT_CACHE_PATH", os.path.join(CACHE_DIR, "transcripts.sqlite3")),
+    max_bytes=int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+    max_age_seconds=float(os.getenv("TRANSCRIPT_CACHE_MAX_AGE_SECONDS", 30 * 24 * 3600)),
+)
+register_cache("transcripts", transcript_cache)
+
 @dataclass
 class FunctionInputParams:
-    file_data: tuple[str, str]
+    # (filename, sha256 digest) pointing into the audio blob store
+    file_ref: tuple[str, str]
+    # [trimmed_ms, original_ms] pairs from normalize_audio when silence was cut out
+    time_map: list[list[int]] | None = None
+    # "assemblyai" (speaker_labels) or "local" (on-worker clustering plus a transcription backend)
+    diarization_engine: str = DIARIZATION_ENGINE_ASSEMBLYAI
+
+def format_utterances(transcript) -> list[dict]:
+    if transcript.error:
+        raise RuntimeError(f"AssemblyAI transcription failed: {transcript.error}")
+    return [
+        {
+            'speaker': utterance.speaker,
+            'text': utterance.text,
+            # Optionally include other metadata if needed later
+            'start': utterance.start,
+            'end': utterance.end,
+            'confidence': utterance.confidence
+        }
+        for utterance in transcript.utterances or []
+    ]
+
+async def diarize_file(transcriber, path: str, retries: int = 0) -> list[dict]:
+    # transcribe() uploads and then polls until done, so keep it off the event loop
+    for attempt in range(retries + 1):
+        try:
+            with provider_call("assemblyai", "diarize"):
+                transcript = await asyncio.to_thread(transcriber.transcribe, path)
+                return format_utterances(transcript)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            log.info("Retrying diarization", path=path, attempt=attempt + 1, error=str(e))
+
+async def diarize_in_chunks(transcriber, path: str) -> list[dict]:
+    """
+    Split a long recording at pauses, diarize the chunks concurrently and stitch
+    the utterances back onto the original timeline with consistent speaker labels.
+    A failed chunk is retried on its own instead of redoing the whole file.
+    """
+    samples = await asyncio.to_thread(decode_audio, path)
+    bounds = split_on_silence(samples, ANALYSIS_SAMPLE_RATE, DIARIZATION_CHUNK_SECONDS)
+    log.info("Diarizing in chunks", path=path, chunks=len(bounds))
+
+    semaphore = asyncio.Semaphore(DIARIZATION_MAX_PARALLEL_CHUNKS)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        async def diarize_chunk(index: int, start: int, end: int) -> list[dict]:
+            async with semaphore:
+                chunk_path = os.path.join(tmp_dir, f"chunk-{index}.flac")
+                await asyncio.to_thread(encode_audio, samples[start:end], ANALYSIS_SAMPLE_RATE, chunk_path)
+                return await diarize_file(transcriber, chunk_path, retries=DIARIZATION_CHUNK_RETRIES)
+
+        chunk_utterances = await asyncio.gather(
+            *(diarize_chunk(index, start, end) for index, (start, end) in enumerate(bounds))
+        )
+
+    chunk_offsets_ms = [start * 1000 // ANALYSIS_SAMPLE_RATE for start, _ in bounds]
+    return stitch_chunk_utterances(chunk_utterances, chunk_offsets_ms, samples, ANALYSIS_SAMPLE_RATE)
+
+async def diarize_locally(path: str) -> list[dict]:
+    """
+    Diarize on the worker by clustering spectral embeddings of speech windows,
+    then transcribe every speaker turn in one batch with the configured
+    transcription backend. Returns the same utterance dicts as AssemblyAI.
+    """
+    samples = await asyncio.to_thread(decode_audio, path)
+    regions = await asyncio.to_thread(detect_speech, samples, ANALYSIS_SAMPLE_RATE)
+    turns = await asyncio.to_thread(
+        diarize, samples, ANALYSIS_SAMPLE_RATE, regions, max_speakers=LOCAL_DIARIZATION_MAX_SPEAKERS,
+    )
+    backend, texts = await transcribe_segments(
+        [samples[turn["start"]:turn["end"]] for turn in turns], ANALYSIS_SAMPLE_RATE,
+    )
+    log.info("Local diarization completed", path=path, turns=len(turns), transcription_backend=backend)
+
+    return [
+        {
+            'speaker': turn["speaker"],
+            'text': text,
+            'start': turn["start"] * 1000 // ANALYSIS_SAMPLE_RATE,
+            'end': turn["end"] * 1000 // ANALYSIS_SAMPLE_RATE,
+            # Similarity of the turn to its speaker's centroid, not a transcription confidence
+            'confidence': turn["confidence"],
+        }
+        for turn, text in zip(turns, texts)
+        if text
+    ]
 
 @function.defn()
+@step_events
+@metered
 async def identify_speakers(input: FunctionInputParams):
     try:
         log.info("speaker identification function started", input=input)
-        client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
 
-        aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
+        filename, digest = input.file_ref
+        engine = check_option("diarization engine", input.diarization_engine, DIARIZATION_ENGINES)
+
+        if engine == DIARIZATION_ENGINE_LOCAL:
+            engine_config = {
+                "transcription_backend": TRANSCRIPTION_BACKEND,
+                "max_speakers": LOCAL_DIARIZATION_MAX_SPEAKERS,
+            }
+        else:
+            engine_config = {
+                "language_code": LANGUAGE_CODE,
+                "speaker_labels": SPEAKER_LABELS,
+                "chunk_seconds": DIARIZATION_CHUNK_SECONDS,
+            }
+        cache_key = make_cache_key("identify_speakers", digest, engine, engine_config)
+        cached_transcript = await transcript_cache.aget(cache_key)
+        if cached_transcript is not None:
+            log.info("speaker identification cache hit", filename=filename, cache=await transcript_cache.astats())
+            return {'utterances': remap_utterances(cached_transcript['utterances'], input.time_map)}
+        log.info("speaker identification cache miss", filename=filename, cache=await transcript_cache.astats())
 
-        config = aai.TranscriptionConfig(
-            speaker_labels=True,
-            language_code="ru"
-        )
-
-        transcriber = aai.Transcriber(config=config)
-
-        filename, base64_content = input.file_data
         print("Filename: ", filename)
 
         # FILE_URL = "https://assembly.ai/wildfires.mp3"
 
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        FILE_URL = os.path.join(project_root, 'synthetic_audio', filename)
+        # The bytes are only resolved here; AssemblyAI streams the local file up itself
+        FILE_URL = blob_store.path(digest)
 
         print("FILE_URL: ", FILE_URL)
 
-        transcript = transcriber.transcribe(FILE_URL)
-
-        # extract all utterances from the response
-        utterances = transcript.utterances
+        async with heartbeating():
+            if engine == DIARIZATION_ENGINE_LOCAL:
+                utterances = await diarize_locally(FILE_URL)
+            else:
+                transcriber = clients.assemblyai_transcriber(
+                    language_code=LANGUAGE_CODE,
+                    speaker_labels=SPEAKER_LABELS,
+                )
+                duration = await asyncio.to_thread(probe_duration, FILE_URL)
+                if duration > DIARIZATION_CHUNK_SECONDS * 1.5:
+                    utterances = await diarize_in_chunks(transcriber, FILE_URL)
+                else:
+                    utterances = await diarize_file(transcriber, FILE_URL)
 
         # For each utterance, print its speaker and what was said
         for utterance in utterances:
-          speaker = utterance.speaker
-          text = utterance.text
+          speaker = utterance['speaker']
+          text = utterance['text']
           print(f"Speaker {speaker}: {text}")
 
         # filename, base64_content = input.file_data
@@ -63,22 +205,15 @@ async def identify_speakers(input: FunctionInputParams):
         log.info("speaker identification function completed", transcription=utterances)
 
         formatted_transcript = {
-            'utterances': [
-                {
-                    'speaker': utterance.speaker,
-                    'text': utterance.text,
-                    # Optionally include other metadata if needed later
-                    'start': utterance.start,
-                    'end': utterance.end,
-                    'confidence': utterance.confidence
-                }
-                for utterance in transcript.utterances
-            ]
+            'utterances': utterances
         }
         
         log.info("speaker identification transcription formatting completed", transcription=utterances)
-        
-        return formatted_transcript
+
+        # Cached on the trimmed timeline, since that is what the digest identifies
+        await transcript_cache.aset(cache_key, formatted_transcript)
+
+        return {'utterances': remap_utterances(utterances, input.time_map)}
         # return utterances
         
 
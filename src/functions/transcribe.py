@@ -1,30 +1,25 @@
 from restack_ai.function import function, log
 from dataclasses import dataclass
-from groq import Groq
-import os
-import base64
+from src.transcription.backends import transcribe_file
+from src.utils.blob_store import blob_store
+from src.utils.events import step_events
+from src.utils.metrics import metered
 @dataclass
 class FunctionInputParams:
-    file_data: tuple[str, str]
+    # (filename, sha256 digest) pointing into the audio blob store
+    file_ref: tuple[str, str]
 
 @function.defn()
+@step_events
+@metered
 async def transcribe(input: FunctionInputParams):
     try:
         log.info("transcribe function started", input=input)
-        client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
 
-
-        filename, base64_content = input.file_data
-        file_bytes = base64.b64decode(base64_content)
-        transcription = client.audio.transcriptions.create(
-            file=(filename, file_bytes), # Required audio file
-            model="whisper-large-v3-turbo", # Required model to use for transcription
-            # Best practice is to write the prompt in the language of the audio, use translate.google.com if needed
-            prompt=f"Опиши о чем речь в аудио",  # Translation: Describe what the audio is about
-            language="ru", # Original language of the audio
-            response_format="json",  # Optional
-            temperature=0.0  # Optional
-        )
+        filename, digest = input.file_ref
+        # TRANSCRIPTION_BACKEND picks Groq or the local CPU Whisper model
+        backend, text = await transcribe_file(blob_store.path(digest), filename)
+        transcription = {"text": text, "backend": backend}
 
         log.info("transcribe function completed", transcription=transcription)
         return transcription
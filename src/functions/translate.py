@@ -1,7 +1,14 @@
 from restack_ai.function import function, log
-from openai import OpenAI
 from dataclasses import dataclass
 import os
+import time
+from src.utils.clients import clients
+from src.utils.events import TextStreamRelay, publish, publish_text, step_events
+from src.utils.llm_cache import llm_cache
+from src.utils.metrics import metered, provider_call, record_usage
+
+TRANSLATION_MODEL = "gpt-4o"
+TRANSLATION_TEMPERATURE = 0.0
 
 
 @dataclass
@@ -9,45 +16,109 @@ class FunctionInputParams:
     user_prompt: str
 
 
-@function.defn()
-async def translate(input: FunctionInputParams):
-    try:
-        log.info("translate function started", input=input)
+@dataclass
+class ChunkFunctionInputParams:
+    # Position of the chunk in the transcript, echoed back for reassembly
+    index: int
+    user_prompt: str
 
-        # Verify environment variable exists
-        api_url = os.environ.get("OPENBABYLON_API_URL")
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_url:
-            raise ValueError("OPENBABYLON_API_URL environment variable is not set")
-
-        # Add timeout and better client configuration
-        client = OpenAI(
-            api_key=api_key,
-            # base_url=api_url,
-            timeout=30.0,  # Add timeout in seconds
-        )
 
-        messages = []
-        if input.user_prompt:
-            messages.append({"role": "user", "content": input.user_prompt})
+async def complete_translation(user_prompt: str, chunk_index: int = 0) -> tuple[dict, bool]:
+    """
+    (message, cache_hit) for a translation prompt. The completion is streamed
+    and relayed as translation.delta events while it is generated, so clients
+    of /api/jobs/{job_id}/events see text long before the step finishes.
+    """
+    messages = []
+    if user_prompt:
+        messages.append({"role": "user", "content": user_prompt})
+
+    cache_key = llm_cache.key(TRANSLATION_MODEL, messages, TRANSLATION_TEMPERATURE)
+    cached_message = await llm_cache.aget(cache_key)
+    if cached_message is not None:
+        log.info("translate function cache hit")
+        await publish_text("translation.delta", cached_message["content"] or "", chunk_index=chunk_index)
+        await publish("translation.completed", chunk_index=chunk_index, cache_hit=True)
+        return cached_message, True
+
+    # Verify environment variable exists
+    api_url = os.environ.get("OPENBABYLON_API_URL")
+    if not api_url:
+        raise ValueError("OPENBABYLON_API_URL environment variable is not set")
+
+    # Shared client with a pooled keep-alive connection (see src/utils/clients.py)
+    client = clients.openai()
 
-        response = client.chat.completions.create(
+    relay = TextStreamRelay("translation.delta", chunk_index=chunk_index)
+    parts = []
+    with provider_call("openai", "translate"):
+        stream = await client.chat.completions.create(
             # model="orpo-mistral-v0.3-ua-tokV2-focus-10B-low-lr-1epoch-aux-merged-1ep",
-            model="gpt-4o",
+            model=TRANSLATION_MODEL,
             messages=messages,
-            temperature=0.0,
+            temperature=TRANSLATION_TEMPERATURE,
+            stream=True,
+            # The last chunk then carries the token usage for the whole completion
+            stream_options={"include_usage": True},
         )
-        log.info("translate function completed", response=response)
-        return response.choices[0].message
-    except ValueError as ve:
-        log.error("Configuration error", error=str(ve))
+
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                await relay.add(chunk.choices[0].delta.content)
+            if chunk.usage:
+                record_usage(TRANSLATION_MODEL, "translate", chunk.usage)
+    await relay.flush()
+    await publish("translation.completed", chunk_index=chunk_index, cache_hit=False)
+
+    message = {"role": "assistant", "content": "".join(parts)}
+    log.info("translate function completed", response=message)
+
+    await llm_cache.aset(cache_key, message)
+    return message, False
+
+
+def log_failure(e: Exception):
+    if isinstance(e, ValueError):
+        log.error("Configuration error", error=str(e))
+        return
+    # Add more context to the error logging
+    log.error(
+        "translate function failed",
+        error=str(e),
+        error_type=type(e).__name__,
+        api_url=os.environ.get("OPENBABYLON_API_URL"),
+    )
+
+
+@function.defn()
+@step_events
+@metered
+async def translate(input: FunctionInputParams):
+    try:
+        log.info("translate function started", input=input)
+        message, _ = await complete_translation(input.user_prompt)
+        return message
+    except Exception as e:
+        log_failure(e)
         raise
+
+
+@function.defn()
+@step_events
+@metered
+async def translate_chunk(input: ChunkFunctionInputParams):
+    """Translate one chunk of a long transcript and report how long it took."""
+    try:
+        log.info("translate_chunk function started", index=input.index)
+        started = time.perf_counter()
+        message, cache_hit = await complete_translation(input.user_prompt, chunk_index=input.index)
+        return {
+            "index": input.index,
+            "content": message["content"],
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "cache_hit": cache_hit,
+        }
     except Exception as e:
-        # Add more context to the error logging
-        log.error(
-            "translate function failed",
-            error=str(e),
-            error_type=type(e).__name__,
-            api_url=os.environ.get("OPENBABYLON_API_URL"),
-        )
+        log_failure(e)
         raise
@@ -0,0 +1,227 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.utils.metrics import JOB_DURATION
+from src.utils.util import child_workflow_id
+
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+FILE_PENDING = "pending"
+FILE_COMPLETED = "completed"
+FILE_FAILED = "failed"
+
+# How often a child watcher retries while its child workflow has not finished yet
+CHILD_POLL_INITIAL_DELAY = 1.0
+CHILD_POLL_MAX_DELAY = 10.0
+
+
+@dataclass
+class FileProgress:
+    filename: str
+    workflow_id: str
+    status: str = FILE_PENDING
+    error: str | None = None
+    completed_at: float | None = None
+
+
+@dataclass
+class Job:
+    job_id: str
+    run_id: str
+    files: list[FileProgress]
+    status: str = JOB_RUNNING
+    result: Any = None
+    error: str | None = None
+    submitted_at: float = field(default_factory=time.time)
+    completed_at: float | None = None
+
+    def summary(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "run_id": self.run_id,
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "completed_at": self.completed_at,
+            "files_total": len(self.files),
+            "files_completed": sum(1 for f in self.files if f.status == FILE_COMPLETED),
+            "files_failed": sum(1 for f in self.files if f.status == FILE_FAILED),
+            "files": [
+                {
+                    "filename": f.filename,
+                    "workflow_id": f.workflow_id,
+                    "status": f.status,
+                    "error": f.error,
+                    "completed_at": f.completed_at,
+                }
+                for f in self.files
+            ],
+        }
+
+
+class JobRegistry:
+    """
+    Tracks ParentWorkflow runs scheduled by the API so HTTP requests can return
+    immediately. Results are collected by background tasks in this process, one
+    per parent workflow and one per child workflow for per-file progress.
+    Workflows without per-file children (BulkAnalysisWorkflow) are submitted with
+    watch_files=False and report every file's outcome when they finish.
+    Jobs scheduled by another API process, or before a restart, are looked up
+    in the engine by workflow id (see find).
+    """
+
+    def __init__(self, restack_client, max_jobs: int = 1000):
+        self._client = restack_client
+        self._max_jobs = max_jobs
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    async def find(self, job_id: str) -> Job | None:
+        """
+        The job tracked by this process or, failing that, one rebuilt from the
+        engine's record of workflow job_id and watched from here on. Its files
+        are not known until it finishes, since they are only in the input.
+        None when the engine has no such workflow either.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            handle = await self._client.get_workflow_handle(workflow_id=job_id, run_id=None)
+            description = await handle.describe()
+        except Exception:
+            return None
+
+        # Another request may have rebuilt it while this one waited on the engine
+        if job_id in self._jobs:
+            return self._jobs[job_id]
+        job = Job(
+            job_id=job_id,
+            run_id=description.run_id,
+            files=[],
+            submitted_at=description.start_time.timestamp(),
+        )
+        self._jobs[job_id] = job
+        self._evict()
+        # The process that scheduled it records its duration
+        self._spawn(self._watch_job(job, description.workflow_type, watch_files=False, record_duration=False))
+        return job
+
+    async def submit(
+        self,
+        filenames: list[str],
+        workflow_input: dict,
+        workflow_name: str = "ParentWorkflow",
+        job_id_suffix: str = "parent_workflow",
+        watch_files: bool = True,
+    ) -> Job:
+        job_id = f"{int(time.time() * 1000)}-{job_id_suffix}"
+
+        run_id = await self._client.schedule_workflow(
+            workflow_name=workflow_name,
+            workflow_id=job_id,
+            input=workflow_input,
+        )
+
+        job = Job(
+            job_id=job_id,
+            run_id=run_id,
+            files=[
+                FileProgress(
+                    filename=filename,
+                    workflow_id=child_workflow_id(job_id, index, filename) if watch_files else job_id,
+                )
+                for index, filename in enumerate(filenames)
+            ],
+        )
+        self._jobs[job_id] = job
+        self._evict()
+
+        self._spawn(self._watch_job(job, workflow_name, watch_files))
+        if watch_files:
+            for progress in job.files:
+                self._spawn(self._watch_file(job, progress))
+
+        return job
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _evict(self):
+        # Drop the oldest finished jobs once the registry grows past max_jobs
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self._max_jobs:
+                break
+            if self._jobs[job_id].status != JOB_RUNNING:
+                del self._jobs[job_id]
+
+    async def _watch_job(self, job: Job, workflow_name: str, watch_files: bool = True, record_duration: bool = True):
+        try:
+            job.result = await self._client.get_workflow_result(
+                workflow_id=job.job_id,
+                run_id=job.run_id,
+            )
+            job.status = JOB_COMPLETED
+            if not job.files:
+                # A job rebuilt by find(); the result names every file in input order
+                job.files = [
+                    FileProgress(
+                        filename=child_result["filename"],
+                        workflow_id=(
+                            child_workflow_id(job.job_id, index, child_result["filename"])
+                            if workflow_name == "ParentWorkflow" else job.job_id
+                        ),
+                    )
+                    for index, child_result in enumerate(job.result or [])
+                ]
+            # The parent reports each child's outcome in input order
+            for progress, child_result in zip(job.files, job.result or []):
+                progress.status = child_result.get("status", FILE_COMPLETED)
+                progress.error = child_result.get("error")
+        except Exception as e:
+            job.status = JOB_FAILED
+            job.error = str(e)
+        finally:
+            job.completed_at = time.time()
+            if record_duration:
+                JOB_DURATION.labels(workflow_name, job.status).observe(job.completed_at - job.submitted_at)
+            if not watch_files:
+                # No per-file watchers; the job's outcome is every file's outcome
+                for progress in job.files:
+                    if progress.status == FILE_PENDING:
+                        progress.status = FILE_FAILED
+                        progress.error = job.error
+                    progress.completed_at = job.completed_at
+
+    async def _watch_file(self, job: Job, progress: FileProgress):
+        delay = CHILD_POLL_INITIAL_DELAY
+        while True:
+            try:
+                await self._client.get_workflow_result(
+                    workflow_id=progress.workflow_id,
+                    run_id=None,
+                )
+                if progress.status == FILE_PENDING:
+                    progress.status = FILE_COMPLETED
+                break
+            except Exception as e:
+                # The child may not have been started yet, or it failed. Keep waiting
+                # until the parent has finished, which records each child's outcome.
+                if job.status != JOB_RUNNING:
+                    if progress.status == FILE_PENDING:
+                        progress.status = FILE_FAILED
+                        progress.error = str(e)
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, CHILD_POLL_MAX_DELAY)
+        progress.completed_at = time.time()
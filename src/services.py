@@ -1,20 +1,40 @@
 import asyncio
 from src.client import client
 from src.functions.transcribe import transcribe
-from src.functions.translate import translate
+from src.functions.translate import translate, translate_chunk
 from src.functions.speaker_identification import identify_speakers
+from src.functions.normalize_audio import normalize_audio
 from src.workflows.child import ChildWorkflow
 from src.workflows.parent import ParentWorkflow
-from src.functions.agents.extract_info import extract_info
-from src.functions.db_audio_analysis import read_from_audio_table, write_to_audio_table
+from src.workflows.bulk_analysis import BulkAnalysisWorkflow
+from src.functions.agents.extract_info import extract_info, translate_and_extract_info
+from src.functions.agents.batch_analysis import store_analysis_request, submit_analysis_batch, poll_analysis_batch, collect_analysis_batch
+from src.functions.db_audio_analysis import read_from_audio_table, write_to_audio_table, audio_table_writer
+from src.utils.clients import clients
+from src.utils.db import db
+from src.utils.events import publisher
+from src.utils.metrics import start_worker_metrics_server
+
+# Everything this worker runs; also used by the pipeline benchmark's in-process worker
+WORKFLOWS = [ParentWorkflow, ChildWorkflow, BulkAnalysisWorkflow]
+FUNCTIONS = [normalize_audio, transcribe, translate, translate_chunk, identify_speakers, extract_info, translate_and_extract_info, store_analysis_request, submit_analysis_batch, poll_analysis_batch, collect_analysis_batch, write_to_audio_table, read_from_audio_table]
 
 async def main():
-    await asyncio.gather(
-        client.start_service(
-            workflows=[ParentWorkflow, ChildWorkflow],
-            functions=[transcribe, translate, identify_speakers, extract_info, write_to_audio_table, read_from_audio_table]
+    # Prometheus scrapes the worker's function, provider and cache metrics here
+    start_worker_metrics_server()
+    try:
+        await asyncio.gather(
+            client.start_service(
+                workflows=WORKFLOWS,
+                functions=FUNCTIONS,
+            )
         )
-    )
+    finally:
+        # Provider clients and the DB pool are shared by every function in this worker
+        await clients.aclose()
+        await audio_table_writer.aclose()
+        await publisher.aclose()
+        await db.aclose()
 
 def run_services():
     asyncio.run(main())
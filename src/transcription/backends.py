@@ -0,0 +1,102 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+from restack_ai.function import log
+
+from src.audio.io import probe_duration
+from src.transcription.base import TranscriptionBackend
+from src.transcription.groq_backend import GroqBackend
+from src.transcription.local_whisper import LocalWhisperBackend
+
+load_dotenv()
+
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "groq")  # groq | local
+TRANSCRIPTION_FALLBACK_BACKEND = os.getenv("TRANSCRIPTION_FALLBACK_BACKEND", "local")  # groq | local | none
+# Give up on the primary backend and use the fallback instead after this long, plus
+# TRANSCRIPTION_TIMEOUT_PER_AUDIO_SECOND for every second of audio in the call
+TRANSCRIPTION_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIPTION_TIMEOUT_SECONDS", 60.0))
+TRANSCRIPTION_TIMEOUT_PER_AUDIO_SECOND = float(os.getenv("TRANSCRIPTION_TIMEOUT_PER_AUDIO_SECOND", 0.5))
+# The fallback runs inside the same workflow step, so the primary is also cut off
+# once it has used this share of the time the step has left
+TRANSCRIPTION_PRIMARY_BUDGET_SHARE = float(os.getenv("TRANSCRIPTION_PRIMARY_BUDGET_SHARE", 0.5))
+
+_backends: dict[str, TranscriptionBackend] = {}
+
+
+def get_backend(name: str) -> TranscriptionBackend:
+    """Backends are created once per worker so a loaded local model is reused across calls."""
+    if name not in _backends:
+        if name == "groq":
+            _backends[name] = GroqBackend()
+        elif name == "local":
+            _backends[name] = LocalWhisperBackend()
+        else:
+            raise ValueError(f"Unknown transcription backend: {name}")
+    return _backends[name]
+
+
+def step_seconds_left() -> float | None:
+    """Seconds until the running function's start_to_close_timeout, or None outside a function."""
+    from temporalio import activity
+
+    if not activity.in_activity():
+        return None
+    info = activity.info()
+    if info.start_to_close_timeout is None:
+        return None
+    deadline = info.started_time + info.start_to_close_timeout
+    return (deadline - datetime.now(timezone.utc)).total_seconds()
+
+
+def primary_timeout(audio_seconds: float | None) -> float:
+    """Seconds the primary backend gets for a call covering audio_seconds of audio (None if unknown)."""
+    return TRANSCRIPTION_TIMEOUT_SECONDS + (audio_seconds or 0.0) * TRANSCRIPTION_TIMEOUT_PER_AUDIO_SECOND
+
+
+async def _with_fallback(operation: str, call, audio_seconds: float | None):
+    primary = get_backend(TRANSCRIPTION_BACKEND)
+    has_fallback = TRANSCRIPTION_FALLBACK_BACKEND not in ("none", primary.name)
+
+    timeout = primary_timeout(audio_seconds)
+    seconds_left = step_seconds_left()
+    if has_fallback and seconds_left is not None:
+        timeout = min(timeout, max(seconds_left, 0) * TRANSCRIPTION_PRIMARY_BUDGET_SHARE)
+    try:
+        return primary.name, await asyncio.wait_for(call(primary), timeout)
+    except Exception as e:
+        if not has_fallback:
+            raise
+        log.info(
+            f"{operation} failed on primary backend, falling back",
+            backend=primary.name,
+            fallback=TRANSCRIPTION_FALLBACK_BACKEND,
+            timeout_seconds=round(timeout, 1),
+            audio_seconds=audio_seconds,
+            error=repr(e),
+        )
+        fallback = get_backend(TRANSCRIPTION_FALLBACK_BACKEND)
+        return fallback.name, await call(fallback)
+
+
+async def transcribe_file(path: str, filename: str) -> tuple[str, str]:
+    """(backend name, text) for a whole file, falling back if the primary is slow or fails."""
+    try:
+        audio_seconds = await asyncio.to_thread(probe_duration, path)
+    except Exception as e:
+        # Not worth failing the call over; the primary just gets the base timeout
+        log.info("Could not probe audio duration", filename=filename, error=repr(e))
+        audio_seconds = None
+    return await _with_fallback(
+        "transcribe_file", lambda backend: backend.transcribe_file(path, filename), audio_seconds
+    )
+
+
+async def transcribe_segments(segments: list[np.ndarray], sample_rate: int) -> tuple[str, list[str]]:
+    """(backend name, texts) for a batch of segments, with the same fallback as transcribe_file."""
+    audio_seconds = sum(len(segment) for segment in segments) / sample_rate
+    return await _with_fallback(
+        "transcribe_segments", lambda backend: backend.transcribe_segments(segments, sample_rate), audio_seconds
+    )
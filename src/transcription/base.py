@@ -0,0 +1,19 @@
+from typing import Protocol
+
+import numpy as np
+
+LANGUAGE = "ru"
+# Best practice is to write the prompt in the language of the audio, use translate.google.com if needed
+PROMPT = "Опиши о чем речь в аудио"  # Translation: Describe what the audio is about
+
+
+class TranscriptionBackend(Protocol):
+    name: str
+
+    async def transcribe_file(self, path: str, filename: str) -> str:
+        """Transcribe a whole audio file and return its text."""
+        ...
+
+    async def transcribe_segments(self, segments: list[np.ndarray], sample_rate: int) -> list[str]:
+        """Transcribe mono float32 segments, returning one text per segment in order."""
+        ...
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import tempfile
+
+import numpy as np
+
+from src.audio.io import encode_audio
+from src.transcription.base import LANGUAGE, PROMPT
+from src.utils.clients import clients
+from src.utils.metrics import provider_call
+
+GROQ_TRANSCRIPTION_MODEL = "whisper-large-v3-turbo"
+# Requests in flight per worker, across all calls, to stay under Groq's rate limits
+GROQ_MAX_CONCURRENT_REQUESTS = int(os.getenv("GROQ_MAX_CONCURRENT_REQUESTS", 8))
+
+
+class GroqBackend:
+    """Hosted Whisper on Groq, through the worker's shared client."""
+
+    name = "groq"
+
+    def __init__(self, max_concurrent_requests: int = GROQ_MAX_CONCURRENT_REQUESTS):
+        # The backend is shared by the whole worker, so this bounds every caller together
+        self._requests = asyncio.Semaphore(max_concurrent_requests)
+
+    async def transcribe_file(self, path: str, filename: str) -> str:
+        async with self._requests:
+            with open(path, "rb") as audio_file, provider_call("groq", "transcribe"):
+                transcription = await clients.groq().audio.transcriptions.create(
+                    file=(filename, audio_file),
+                    model=GROQ_TRANSCRIPTION_MODEL,
+                    prompt=PROMPT,
+                    language=LANGUAGE,
+                    response_format="json",
+                    temperature=0.0,
+                )
+        return transcription.text
+
+    async def transcribe_segments(self, segments: list[np.ndarray], sample_rate: int) -> list[str]:
+        # One request per segment; they share the keep-alive pool and run concurrently,
+        # at most GROQ_MAX_CONCURRENT_REQUESTS at a time
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            async def transcribe_segment(index: int, segment: np.ndarray) -> str:
+                path = os.path.join(tmp_dir, f"segment-{index}.flac")
+                await asyncio.to_thread(encode_audio, segment, sample_rate, path)
+                return await self.transcribe_file(path, os.path.basename(path))
+
+            return list(await asyncio.gather(
+                *(transcribe_segment(index, segment) for index, segment in enumerate(segments))
+            ))
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.audio.io import ANALYSIS_SAMPLE_RATE, decode_audio
+from src.audio.normalize import resample
+from src.transcription.base import LANGUAGE
+
+load_dotenv()
+
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "openai/whisper-small")
+LOCAL_WHISPER_THREADS = int(os.getenv("LOCAL_WHISPER_THREADS", os.cpu_count() or 1))
+LOCAL_WHISPER_BATCH_SIZE = int(os.getenv("LOCAL_WHISPER_BATCH_SIZE", 8))
+# Whisper's receptive field; longer files are cut into windows of this length and batched
+LOCAL_WHISPER_CHUNK_SECONDS = 30
+
+
+class LocalWhisperBackend:
+    """
+    Whisper on the worker's CPU via a transformers pipeline. The model is loaded
+    on first use and kept for the life of the worker, and several segments (or
+    30 s windows of one file) go through each forward pass.
+    """
+
+    name = "local"
+
+    def __init__(self, model: str = LOCAL_WHISPER_MODEL, threads: int = LOCAL_WHISPER_THREADS,
+                 batch_size: int = LOCAL_WHISPER_BATCH_SIZE):
+        self.model = model
+        self.threads = threads
+        self.batch_size = batch_size
+        self._pipeline = None
+        # The pipeline already uses every intra-op thread, so calls run one at a time
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._pipeline is None:
+            import torch
+            from transformers import pipeline
+
+            torch.set_num_threads(self.threads)
+            self._pipeline = pipeline(
+                "automatic-speech-recognition",
+                model=self.model,
+                device="cpu",
+                torch_dtype=torch.float32,
+            )
+        return self._pipeline
+
+    def _run(self, inputs: list[dict], cancelled: threading.Event, **kwargs) -> list[dict]:
+        results = []
+        with self._lock:
+            asr = self._load()
+            # A batch at a time, so a call its caller gave up on (e.g. the fallback
+            # timeout) stops at the next batch and frees the model for other calls
+            for start in range(0, len(inputs), self.batch_size):
+                if cancelled.is_set():
+                    break
+                results.extend(asr(
+                    inputs[start:start + self.batch_size],
+                    batch_size=self.batch_size,
+                    generate_kwargs={"language": LANGUAGE, "task": "transcribe"},
+                    **kwargs,
+                ))
+        return results
+
+    async def _run_in_thread(self, inputs: list[dict], **kwargs) -> list[dict]:
+        # The thread cannot be interrupted, so cancellation is passed on as a flag
+        cancelled = threading.Event()
+        try:
+            return await asyncio.to_thread(self._run, inputs, cancelled, **kwargs)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def transcribe_file(self, path: str, filename: str) -> str:
+        samples = await asyncio.to_thread(decode_audio, path, ANALYSIS_SAMPLE_RATE)
+        # A single file is one batch, so a cancelled call still finishes it before freeing the model
+        results = await self._run_in_thread(
+            [{"raw": samples, "sampling_rate": ANALYSIS_SAMPLE_RATE}],
+            chunk_length_s=LOCAL_WHISPER_CHUNK_SECONDS,
+        )
+        return results[0]["text"].strip()
+
+    async def transcribe_segments(self, segments: list[np.ndarray], sample_rate: int) -> list[str]:
+        if not segments:
+            return []
+        inputs = [
+            {"raw": resample(segment, sample_rate, ANALYSIS_SAMPLE_RATE), "sampling_rate": ANALYSIS_SAMPLE_RATE}
+            for segment in segments
+        ]
+        # Speaker turns can run past Whisper's 30 s window, so long ones are chunked too
+        results = await self._run_in_thread(inputs, chunk_length_s=LOCAL_WHISPER_CHUNK_SECONDS)
+        return [result["text"].strip() for result in results]
@@ -0,0 +1,104 @@
+import hashlib
+import mmap
+import os
+import re
+import uuid
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be on a filesystem shared by the API and the worker (they share a container in the Dockerfile)
+BLOB_STORE_DIR = os.getenv("AUDIO_BLOB_DIR", os.path.join(project_root, "blobs"))
+BLOB_STORE_MMAP = os.getenv("AUDIO_BLOB_MMAP", "false").lower() == "true"
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobWriter:
+    """Writes a blob to a temp file while hashing it, then moves it into place by digest."""
+
+    def __init__(self, store: "BlobStore"):
+        self._store = store
+        self._hash = hashlib.sha256()
+        os.makedirs(store.tmp_dir, exist_ok=True)
+        self._tmp_path = os.path.join(store.tmp_dir, uuid.uuid4().hex)
+        self._file = open(self._tmp_path, "wb")
+
+    def write(self, chunk: bytes):
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> str:
+        self._file.close()
+        digest = self._hash.hexdigest()
+        path = self._store.path(digest)
+        if os.path.exists(path):
+            # Identical content is already stored, keep the existing blob
+            os.remove(self._tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._tmp_path, path)
+        return digest
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class BlobStore:
+    """
+    Local content-addressed store for audio. Blobs are keyed by their SHA-256
+    digest so workflows only need to carry the digest, and identical uploads
+    are stored once. Directories are created by the first write.
+    """
+
+    def __init__(self, root: str, use_mmap: bool = False):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.use_mmap = use_mmap
+
+    def path(self, digest: str) -> str:
+        if not _DIGEST_RE.match(digest):
+            raise ValueError(f"Invalid blob digest: {digest}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def put_bytes(self, data: bytes) -> str:
+        writer = self.writer()
+        try:
+            writer.write(data)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    @contextmanager
+    def open(self, digest: str, use_mmap: bool | None = None):
+        """
+        Open a blob for reading. With mmap the pages are mapped straight from the
+        page cache instead of being copied into the process.
+        """
+        use_mmap = self.use_mmap if use_mmap is None else use_mmap
+        with open(self.path(digest), "rb") as f:
+            if not use_mmap or os.fstat(f.fileno()).st_size == 0:
+                yield f
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def read_bytes(self, digest: str) -> bytes:
+        with self.open(digest) as f:
+            return f.read()
+
+
+blob_store = BlobStore(BLOB_STORE_DIR, use_mmap=BLOB_STORE_MMAP)
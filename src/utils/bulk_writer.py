@@ -0,0 +1,112 @@
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_BULK_MAX_BATCH_SIZE = int(os.getenv("DB_BULK_MAX_BATCH_SIZE", 100))
+DB_BULK_MAX_DELAY_SECONDS = float(os.getenv("DB_BULK_MAX_DELAY_SECONDS", 0.05))
+
+
+class BulkWriter:
+    """
+    Buffers single-row inserts from concurrent workflows and flushes them as one
+    multi-row INSERT in a single transaction, once max_batch_size rows are queued
+    or max_delay_seconds after the first one, whichever comes first.
+
+    Every caller still gets its own outcome: if the batch fails, the rows are
+    retried one by one inside savepoints so only the bad rows raise.
+    """
+
+    def __init__(self, database, table: str, columns: tuple[str, ...],
+                 max_batch_size: int = DB_BULK_MAX_BATCH_SIZE,
+                 max_delay_seconds: float = DB_BULK_MAX_DELAY_SECONDS):
+        self._database = database
+        self._table = table
+        self._columns = columns
+        # Postgres caps a statement at 65535 parameters
+        self.max_batch_size = max(1, min(max_batch_size, 65535 // len(columns)))
+        self.max_delay_seconds = max_delay_seconds
+        self._pending: list[tuple[tuple, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def insert_query(self, rows: int) -> str:
+        placeholders = "(" + ", ".join(["%s"] * len(self._columns)) + ")"
+        return (
+            f"INSERT INTO {self._table} ({', '.join(self._columns)}) "
+            f"VALUES {', '.join([placeholders] * rows)}"
+        )
+
+    async def write(self, row: tuple):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay_seconds, self._start_flush)
+
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[tuple, asyncio.Future]]):
+        try:
+            async with self._database.connection() as connection:
+                # Prepared once per batch size and connection; psycopg keeps the
+                # most recent prepared_max (100) statements, about one per size
+                await connection.execute(
+                    self.insert_query(len(batch)),
+                    [value for row, _ in batch for value in row],
+                    prepare=True,
+                )
+        except Exception:
+            await self._flush_rows(batch)
+            return
+
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def _flush_rows(self, batch: list[tuple[tuple, asyncio.Future]]):
+        outcomes: list[Exception | None] = []
+        try:
+            async with self._database.connection() as connection:
+                async with connection.transaction():
+                    for row, _ in batch:
+                        try:
+                            async with connection.transaction():
+                                await connection.execute(self.insert_query(1), row, prepare=True)
+                            outcomes.append(None)
+                        except Exception as e:
+                            outcomes.append(e)
+        except Exception as e:
+            # The connection or the commit itself failed, so nothing was written
+            outcomes = [e] * len(batch)
+
+        for (_, future), outcome in zip(batch, outcomes):
+            if future.done():
+                continue
+            if outcome is None:
+                future.set_result(None)
+            else:
+                future.set_exception(outcome)
+
+    async def aclose(self):
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
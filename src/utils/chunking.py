@@ -0,0 +1,52 @@
+import math
+import re
+
+# Rough tokens-per-character for Cyrillic and Latin text with the GPT-4o tokenizer,
+# erring high so a chunk never overruns its budget
+CHARS_PER_TOKEN = 2.5
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def format_utterance(utterance: dict) -> str:
+    return f"Speaker {utterance['speaker']}: {utterance['text']}"
+
+
+def split_long_utterance(utterance: dict, max_tokens: int) -> list[dict]:
+    """Split one utterance that is over budget at sentence ends, keeping its speaker."""
+    pieces, current = [], ""
+    for sentence in _SENTENCE_END_RE.split(utterance["text"]):
+        candidate = f"{current} {sentence}".strip()
+        if current and estimate_tokens(format_utterance({**utterance, "text": candidate})) > max_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return [{**utterance, "text": piece} for piece in pieces]
+
+
+def chunk_utterances(utterances: list[dict], max_tokens: int) -> list[list[dict]]:
+    """
+    Group consecutive utterances into chunks of at most max_tokens estimated
+    tokens, only ever cutting between utterances so a speaker's line is never
+    split across chunks (unless that single line is itself over budget).
+    """
+    chunks, current, current_tokens = [], [], 0
+    for utterance in utterances:
+        # One token is reserved for the newline that joins utterances
+        for piece in split_long_utterance(utterance, max_tokens - 1):
+            tokens = estimate_tokens(format_utterance(piece)) + 1
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
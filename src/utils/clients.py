@@ -0,0 +1,129 @@
+import os
+from typing import TYPE_CHECKING
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    import assemblyai as aai
+    import httpx
+    from groq import AsyncGroq
+    from openai import AsyncOpenAI
+
+load_dotenv()
+
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", 30.0))
+PROVIDER_MAX_CONNECTIONS = int(os.getenv("PROVIDER_MAX_CONNECTIONS", 100))
+PROVIDER_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PROVIDER_MAX_KEEPALIVE_CONNECTIONS", 20))
+PROVIDER_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY_SECONDS", 30.0))
+# Lets bulk analysis run against the local stand-in (benchmarks/stubs/openai_batch_server.py)
+OPENAI_BATCH_BASE_URL = os.getenv("OPENAI_BATCH_BASE_URL")
+# OpenAI and Groq read OPENAI_BASE_URL and GROQ_BASE_URL themselves; AssemblyAI
+# is pointed elsewhere (e.g. the benchmark's stand-in providers) with these
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL")
+ASSEMBLYAI_POLLING_INTERVAL_SECONDS = float(os.getenv("ASSEMBLYAI_POLLING_INTERVAL_SECONDS", 3.0))
+
+
+class ClientRegistry:
+    """
+    Process-wide provider clients for the worker. Each client is created on
+    first use and then shared, so every function call reuses the same
+    keep-alive connection pool instead of paying for a new TLS handshake.
+    The provider SDKs are imported on first use as well, which keeps them out
+    of worker and API startup.
+    """
+
+    def __init__(self):
+        self._openai: "AsyncOpenAI | None" = None
+        self._openai_batch: "AsyncOpenAI | None" = None
+        self._groq: "AsyncGroq | None" = None
+        self._transcribers: dict[tuple, "aai.Transcriber"] = {}
+        self._assemblyai_configured = False
+
+    def _http_client(self) -> "httpx.AsyncClient":
+        import httpx
+
+        return httpx.AsyncClient(
+            timeout=PROVIDER_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=PROVIDER_MAX_CONNECTIONS,
+                max_keepalive_connections=PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=PROVIDER_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+
+    def openai(self) -> "AsyncOpenAI":
+        if self._openai is None:
+            from openai import AsyncOpenAI
+
+            self._openai = AsyncOpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                # base_url=os.environ.get("OPENBABYLON_API_URL"),
+                timeout=PROVIDER_TIMEOUT_SECONDS,
+                http_client=self._http_client(),
+            )
+        return self._openai
+
+    def openai_batch(self) -> "AsyncOpenAI":
+        # Separate from openai() so the Batch API can point at a stand-in server
+        # while interactive calls keep going to OpenAI
+        if OPENAI_BATCH_BASE_URL is None:
+            return self.openai()
+        if self._openai_batch is None:
+            from openai import AsyncOpenAI
+
+            self._openai_batch = AsyncOpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY") or "stub",
+                base_url=OPENAI_BATCH_BASE_URL,
+                timeout=PROVIDER_TIMEOUT_SECONDS,
+                http_client=self._http_client(),
+            )
+        return self._openai_batch
+
+    def groq(self) -> "AsyncGroq":
+        if self._groq is None:
+            from groq import AsyncGroq
+
+            self._groq = AsyncGroq(
+                api_key=os.environ.get("GROQ_API_KEY"),
+                timeout=PROVIDER_TIMEOUT_SECONDS,
+                http_client=self._http_client(),
+            )
+        return self._groq
+
+    def assemblyai_transcriber(self, language_code: str, speaker_labels: bool) -> "aai.Transcriber":
+        import assemblyai as aai
+
+        # aai keeps a module-level HTTP client, so settings are applied once and
+        # transcribers are reused per config rather than rebuilt on every call
+        if not self._assemblyai_configured:
+            aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
+            aai.settings.http_timeout = PROVIDER_TIMEOUT_SECONDS
+            aai.settings.polling_interval = ASSEMBLYAI_POLLING_INTERVAL_SECONDS
+            if ASSEMBLYAI_BASE_URL:
+                aai.settings.base_url = ASSEMBLYAI_BASE_URL
+            self._assemblyai_configured = True
+
+        key = (language_code, speaker_labels)
+        if key not in self._transcribers:
+            self._transcribers[key] = aai.Transcriber(
+                config=aai.TranscriptionConfig(
+                    speaker_labels=speaker_labels,
+                    language_code=language_code,
+                )
+            )
+        return self._transcribers[key]
+
+    async def aclose(self):
+        if self._openai is not None:
+            await self._openai.close()
+            self._openai = None
+        if self._openai_batch is not None:
+            await self._openai_batch.close()
+            self._openai_batch = None
+        if self._groq is not None:
+            await self._groq.close()
+            self._groq = None
+        self._transcribers.clear()
+
+
+clients = ClientRegistry()
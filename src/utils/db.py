@@ -0,0 +1,96 @@
+import asyncio
+import os
+from typing import TYPE_CHECKING
+
+from dotenv import load_dotenv
+
+# psycopg is imported when the first connection is made, keeping it out of startup
+if TYPE_CHECKING:
+    from psycopg_pool import AsyncConnectionPool
+
+load_dotenv()
+
+postgres_host = os.getenv("POSTGRES_HOST")
+postgres_database = os.getenv("POSTGRES_DATABASE")
+postgres_user = os.getenv("POSTGRES_USER")
+postgres_password = os.getenv("POSTGRES_PASSWORD")
+
+
+def db_conninfo() -> str:
+    from psycopg.conninfo import make_conninfo
+
+    return make_conninfo(
+        host=postgres_host,
+        dbname=postgres_database,
+        user=postgres_user,
+        password=postgres_password,
+    )
+
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", 300))
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", 3600))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+
+
+class Database:
+    """
+    Worker-wide async connection pool. Connections are checked with a cheap
+    round-trip before being handed out, so a dropped connection is replaced
+    instead of failing the function that borrowed it.
+    """
+
+    def __init__(self):
+        self._pool: "AsyncConnectionPool | None" = None
+        self._lock = asyncio.Lock()
+
+    async def pool(self) -> "AsyncConnectionPool":
+        if self._pool is not None:
+            return self._pool
+        async with self._lock:
+            if self._pool is None:
+                from psycopg_pool import AsyncConnectionPool
+
+                pool = AsyncConnectionPool(
+                    db_conninfo(),
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    max_idle=DB_POOL_MAX_IDLE_SECONDS,
+                    max_lifetime=DB_POOL_MAX_LIFETIME_SECONDS,
+                    timeout=DB_POOL_TIMEOUT_SECONDS,
+                    check=AsyncConnectionPool.check_connection,
+                    open=False,
+                )
+                await pool.open()
+                self._pool = pool
+        return self._pool
+
+    def connection(self, timeout: float | None = None):
+        """Borrow a connection, waiting at most timeout seconds (DB_POOL_TIMEOUT_SECONDS by default)."""
+        return _PooledConnection(self, timeout)
+
+    async def aclose(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+class _PooledConnection:
+    """`async with db.connection() as conn:` borrows a connection, committing on success."""
+
+    def __init__(self, database: Database, timeout: float | None = None):
+        self._database = database
+        self._timeout = timeout
+        self._context = None
+
+    async def __aenter__(self):
+        pool = await self._database.pool()
+        self._context = pool.connection(timeout=self._timeout)
+        return await self._context.__aenter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self._context.__aexit__(exc_type, exc, tb)
+
+
+db = Database()
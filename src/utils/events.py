@@ -0,0 +1,322 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable
+
+from dotenv import load_dotenv
+
+from src.utils.db import db, db_conninfo
+from src.utils.util import parent_workflow_id
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel shared by the worker (publisher) and the API (listener)
+EVENTS_CHANNEL = "pipeline_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more; text events are split
+# so that each encoded event, envelope included, stays under this
+EVENT_MAX_PAYLOAD_BYTES = 7900
+EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", 5000))
+EVENTS_MAX_JOBS = int(os.getenv("EVENTS_MAX_JOBS", 200))
+EVENTS_HEARTBEAT_SECONDS = 5.0
+EVENTS_RECONNECT_MAX_DELAY = 30.0
+# Events the worker holds while the database is slow; newer ones are dropped beyond this
+EVENTS_PUBLISH_QUEUE_SIZE = int(os.getenv("EVENTS_PUBLISH_QUEUE_SIZE", 1000))
+# Short on purpose: the publisher gives up and drops events rather than wait out DB_POOL_TIMEOUT_SECONDS
+EVENTS_PUBLISH_TIMEOUT_SECONDS = float(os.getenv("EVENTS_PUBLISH_TIMEOUT_SECONDS", 1.0))
+# NOTIFYs sent per borrowed connection
+EVENTS_PUBLISH_BATCH_SIZE = 100
+# Events held for one SSE client; a client that falls this far behind loses the oldest
+EVENTS_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENTS_SUBSCRIBER_QUEUE_SIZE", 1000))
+ALL_JOBS = "*"
+
+
+def encode_event(event: dict) -> str:
+    # Not ASCII-escaped: \uXXXX would triple the size of Cyrillic text
+    return json.dumps(event, ensure_ascii=False)
+
+
+def encoded_size(text: str) -> int:
+    """UTF-8 bytes text takes up inside an encoded event, escapes included."""
+    return len(encode_event(text).encode("utf-8")) - 2
+
+
+def split_text(text: str, max_bytes: int) -> list[str]:
+    """Split text into pieces of at most max_bytes once JSON-encoded, never inside a character."""
+    pieces, start, size = [], 0, 0
+    for index, char in enumerate(text):
+        char_size = encoded_size(char) if char in '"\\' or char < " " else len(char.encode("utf-8"))
+        if size + char_size > max_bytes and index > start:
+            pieces.append(text[start:index])
+            start, size = index, 0
+        size += char_size
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def current_workflow_id() -> str | None:
+    """Id of the workflow that scheduled the running function, or None outside a function."""
+    from temporalio import activity
+
+    return activity.info().workflow_id if activity.in_activity() else None
+
+
+class EventPublisher:
+    """
+    Runs in the worker. send() only queues the event; one background task
+    NOTIFYs queued events in order, borrowing a pooled connection for at most
+    acquire_timeout seconds. A slow or unavailable database therefore drops
+    events (they are best effort) instead of holding up the function.
+    """
+
+    def __init__(self, database, max_queued: int = EVENTS_PUBLISH_QUEUE_SIZE,
+                 acquire_timeout: float = EVENTS_PUBLISH_TIMEOUT_SECONDS):
+        self._database = database
+        self.max_queued = max_queued
+        self.acquire_timeout = acquire_timeout
+        self.dropped = 0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    def send(self, event: dict):
+        if self._task is None:
+            self._queue = asyncio.Queue(self.max_queued)
+            self._task = asyncio.create_task(self._run())
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._drop(1, "queue full")
+
+    def _drop(self, count: int, reason: str):
+        # Logged on the first drop and then every 100th, so an outage does not flood the log
+        if self.dropped % 100 == 0:
+            logger.warning("Dropping pipeline events (%s); %d dropped so far", reason, self.dropped + count)
+        self.dropped += count
+
+    async def _run(self):
+        while True:
+            events = [await self._queue.get()]
+            while len(events) < EVENTS_PUBLISH_BATCH_SIZE and not self._queue.empty():
+                events.append(self._queue.get_nowait())
+            try:
+                async with self._database.connection(timeout=self.acquire_timeout) as connection:
+                    for event in events:
+                        # A savepoint per event, so one rejected NOTIFY does not take the batch with it
+                        try:
+                            async with connection.transaction():
+                                await connection.execute(
+                                    "SELECT pg_notify(%s, %s)", (EVENTS_CHANNEL, encode_event(event))
+                                )
+                        except Exception as e:
+                            self._drop(1, f"notify failed: {e}")
+            except Exception as e:
+                self._drop(len(events), f"publish failed: {e}")
+            finally:
+                for _ in events:
+                    self._queue.task_done()
+
+    async def aclose(self, timeout: float = 5.0):
+        """Send what is still queued, waiting at most timeout seconds, then stop."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+publisher = EventPublisher(db)
+
+
+def make_event(event_type: str, **data) -> dict | None:
+    """An event for the current workflow, or None outside a function."""
+    workflow_id = current_workflow_id()
+    if workflow_id is None:
+        return None
+    return {
+        "type": event_type,
+        "job_id": parent_workflow_id(workflow_id),
+        "workflow_id": workflow_id,
+        "ts": time.time(),
+        **data,
+    }
+
+
+async def publish(event_type: str, **data):
+    """
+    Queue an event for the current workflow for API listeners. Events are best
+    effort: publishing never waits on the database and never fails the function.
+    """
+    event = make_event(event_type, **data)
+    if event is not None:
+        publisher.send(event)
+
+
+async def publish_text(event_type: str, text: str, **data):
+    """Publish text as one or more events, each small enough for a single NOTIFY."""
+    event = make_event(event_type, text="", **data)
+    if event is None:
+        return
+    envelope_bytes = len(encode_event(event).encode("utf-8"))
+    for piece in split_text(text, EVENT_MAX_PAYLOAD_BYTES - envelope_bytes):
+        publisher.send({**event, "text": piece})
+
+
+def step_events(fn):
+    """
+    Publish step.started, then step.completed or step.failed with the duration,
+    around a workflow function. Goes under @function.defn() so the function
+    keeps its name and signature.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        step = fn.__name__
+        started = time.perf_counter()
+        await publish("step.started", step=step)
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            await publish(
+                "step.failed",
+                step=step,
+                duration_seconds=round(time.perf_counter() - started, 3),
+                error=str(e)[:500],
+            )
+            raise
+        await publish("step.completed", step=step, duration_seconds=round(time.perf_counter() - started, 3))
+        return result
+
+    return wrapper
+
+
+class TextStreamRelay:
+    """
+    Batches streamed tokens into delta events, so a completion produces a few
+    events per second rather than one NOTIFY per token.
+    """
+
+    def __init__(self, event_type: str, min_chars: int = 80, max_delay_seconds: float = 0.25, **data):
+        self.event_type = event_type
+        self.min_chars = min_chars
+        self.max_delay_seconds = max_delay_seconds
+        self.data = data
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+
+    async def add(self, text: str):
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if self._pending_chars >= self.min_chars or time.monotonic() - self._last_flush >= self.max_delay_seconds:
+            await self.flush()
+
+    async def flush(self):
+        if self._pending:
+            text = "".join(self._pending)
+            self._pending, self._pending_chars = [], 0
+            await publish_text(self.event_type, text, **self.data)
+        self._last_flush = time.monotonic()
+
+
+class EventHub:
+    """
+    Runs in the API process. Listens on EVENTS_CHANNEL and fans events out to
+    subscribers by job id, keeping a bounded replay buffer per job so a client
+    that connects late still sees what it missed. Subscribing to ALL_JOBS gets
+    every job's events live, without replay.
+    """
+
+    def __init__(self, replay_size: int = EVENTS_REPLAY_SIZE, max_jobs: int = EVENTS_MAX_JOBS,
+                 subscriber_queue_size: int = EVENTS_SUBSCRIBER_QUEUE_SIZE):
+        self.replay_size = replay_size
+        self.max_jobs = max_jobs
+        self.subscriber_queue_size = subscriber_queue_size
+        self.dropped = 0
+        self._buffers: OrderedDict[str, deque] = OrderedDict()
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self):
+        import psycopg
+
+        delay = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(db_conninfo(), autocommit=True) as connection:
+                    await connection.execute(f"LISTEN {EVENTS_CHANNEL}")
+                    delay = 1.0
+                    async for notify in connection.notifies():
+                        self.dispatch(json.loads(notify.payload))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Event listener disconnected, retrying in %.0fs: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, EVENTS_RECONNECT_MAX_DELAY)
+
+    def dispatch(self, event: dict):
+        job_id = event["job_id"]
+        buffer = self._buffers.get(job_id)
+        if buffer is None:
+            buffer = self._buffers[job_id] = deque(maxlen=self.replay_size)
+            while len(self._buffers) > self.max_jobs:
+                self._buffers.popitem(last=False)
+        buffer.append(event)
+        for queue in (*self._subscribers.get(job_id, ()), *self._subscribers.get(ALL_JOBS, ())):
+            if queue.full():
+                # A stalled client must not grow the API's memory; it loses its oldest event
+                queue.get_nowait()
+                if self.dropped % 100 == 0:
+                    logger.warning("Subscriber is behind, dropping events; %d dropped so far", self.dropped + 1)
+                self.dropped += 1
+            queue.put_nowait(event)
+
+    async def subscribe(self, job_id: str, finished: Callable[[], bool]) -> AsyncIterator[dict | None]:
+        """
+        Replayed and then live events for job_id. Yields None as a heartbeat
+        when nothing arrived for EVENTS_HEARTBEAT_SECONDS, and stops once
+        finished() is true and every queued event has been delivered.
+        """
+        queue: asyncio.Queue = asyncio.Queue(self.subscriber_queue_size)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            for event in list(self._buffers.get(job_id, ())):
+                yield event
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if finished():
+                        return
+                    yield None
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
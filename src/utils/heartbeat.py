@@ -0,0 +1,30 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from temporalio import activity
+
+# Well under the heartbeat_timeout the workflows give long-running functions
+HEARTBEAT_INTERVAL_SECONDS = 20
+
+
+@asynccontextmanager
+async def heartbeating(interval: float = HEARTBEAT_INTERVAL_SECONDS):
+    """
+    Heartbeat the running activity every interval seconds while the block runs,
+    so a lost worker is noticed after the heartbeat timeout rather than only
+    when the (generous) start-to-close timeout runs out.
+    """
+    if not activity.in_activity():
+        yield
+        return
+
+    async def beat():
+        while True:
+            activity.heartbeat()
+            await asyncio.sleep(interval)
+
+    task = asyncio.create_task(beat())
+    try:
+        yield
+    finally:
+        task.cancel()
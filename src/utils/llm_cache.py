@@ -0,0 +1,122 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from dotenv import load_dotenv
+
+from src.utils.disk_cache import CACHE_DIR, DiskCache, make_cache_key
+from src.utils.metrics import register_cache
+
+load_dotenv()
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "disk")  # disk | memory | none
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_responses.sqlite3"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000))
+
+
+class CacheBackend(Protocol):
+    hits: int
+    misses: int
+
+    def get(self, key: str) -> Any | None: ...
+
+    def set(self, key: str, value: Any): ...
+
+    async def aget(self, key: str) -> Any | None: ...
+
+    async def aset(self, key: str, value: Any): ...
+
+
+class MemoryCache:
+    """In-process LRU cache with a TTL, for workers without a writable disk."""
+
+    def __init__(self, max_entries: int, max_age_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None or (
+            self.max_age_seconds is not None and time.time() - entry[0] > self.max_age_seconds
+        ):
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # Nothing blocks here, so the async variants are the plain calls
+    async def aget(self, key: str) -> Any | None:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any):
+        self.set(key, value)
+
+
+class NullCache:
+    hits = 0
+    misses = 0
+
+    def get(self, key: str) -> Any | None:
+        return None
+
+    def set(self, key: str, value: Any):
+        pass
+
+    async def aget(self, key: str) -> Any | None:
+        return None
+
+    async def aset(self, key: str, value: Any):
+        pass
+
+
+class LLMResponseCache:
+    """
+    Caches deterministic (temperature 0) completions. The key covers everything
+    that can change the output: model, messages, temperature and response schema.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    def key(self, model: str, messages: list[dict], temperature: float, response_schema: dict | None = None) -> str:
+        return make_cache_key("llm", model, messages, temperature, response_schema)
+
+    def get(self, key: str) -> Any | None:
+        return self.backend.get(key)
+
+    def set(self, key: str, value: Any):
+        self.backend.set(key, value)
+
+    async def aget(self, key: str) -> Any | None:
+        return await self.backend.aget(key)
+
+    async def aset(self, key: str, value: Any):
+        await self.backend.aset(key, value)
+
+
+def _create_backend(name: str) -> CacheBackend:
+    if name == "disk":
+        return DiskCache(LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, max_age_seconds=LLM_CACHE_TTL_SECONDS)
+    if name == "memory":
+        return MemoryCache(LLM_CACHE_MAX_ENTRIES, max_age_seconds=LLM_CACHE_TTL_SECONDS)
+    if name == "none":
+        return NullCache()
+    raise ValueError(f"Unknown LLM_CACHE_BACKEND: {name}")
+
+
+llm_cache = LLMResponseCache(_create_backend(LLM_CACHE_BACKEND))
+register_cache("llm_responses", llm_cache.backend)
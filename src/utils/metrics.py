@@ -0,0 +1,147 @@
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, is_dataclass
+from typing import Any
+
+from dotenv import load_dotenv
+from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client.core import CounterMetricFamily, REGISTRY
+
+load_dotenv()
+
+# Port of the worker's /metrics endpoint (0 turns it off); the API serves its own at /metrics
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 9100))
+
+# Functions run from well under a second (DB writes) to many minutes (long recordings)
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+PAYLOAD_BUCKETS = tuple(256 * 4 ** power for power in range(10))  # 256 B to 64 MiB
+
+FUNCTION_DURATION = Histogram(
+    "pipeline_function_duration_seconds",
+    "Wall time of a worker function call",
+    ["function", "status"],
+    buckets=DURATION_BUCKETS,
+)
+FUNCTION_RETRIES = Counter(
+    "pipeline_function_retries_total",
+    "Function calls that were a retry of an earlier failed attempt",
+    ["function"],
+)
+FUNCTION_PAYLOAD_BYTES = Histogram(
+    "pipeline_function_payload_bytes",
+    "JSON size of a worker function's input and output",
+    ["function", "direction"],
+    buckets=PAYLOAD_BUCKETS,
+)
+PROVIDER_REQUEST_DURATION = Histogram(
+    "pipeline_provider_request_duration_seconds",
+    "Wall time of a call to an external provider",
+    ["provider", "operation", "status"],
+    buckets=DURATION_BUCKETS,
+)
+PROVIDER_ERRORS = Counter(
+    "pipeline_provider_errors_total",
+    "Failed calls to an external provider",
+    ["provider", "operation", "error_type"],
+)
+JOB_DURATION = Histogram(
+    "pipeline_job_duration_seconds",
+    "Time from scheduling a job in the API to its workflow finishing",
+    ["workflow", "status"],
+    buckets=DURATION_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "pipeline_llm_tokens_total",
+    "Tokens reported in OpenAI usage",
+    ["model", "operation", "kind"],
+)
+
+
+def payload_size(value: Any) -> int:
+    if is_dataclass(value) and not isinstance(value, type):
+        value = asdict(value)
+    elif hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json())
+    return len(json.dumps(value, default=str))
+
+
+def metered(fn):
+    """
+    Record duration, retries and input/output size of a worker function.
+    Goes under @step_events and, like it, keeps the function's name and signature.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        from temporalio import activity
+
+        name = fn.__name__
+        if activity.in_activity() and activity.info().attempt > 1:
+            FUNCTION_RETRIES.labels(name).inc()
+        FUNCTION_PAYLOAD_BYTES.labels(name, "input").observe(sum(payload_size(arg) for arg in (*args, *kwargs.values())))
+
+        started = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            FUNCTION_DURATION.labels(name, "failed").observe(time.perf_counter() - started)
+            raise
+        FUNCTION_DURATION.labels(name, "completed").observe(time.perf_counter() - started)
+        FUNCTION_PAYLOAD_BYTES.labels(name, "output").observe(payload_size(result))
+        return result
+
+    return wrapper
+
+
+@contextmanager
+def provider_call(provider: str, operation: str):
+    """Time a call to OpenAI, Groq or AssemblyAI and count it if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        PROVIDER_REQUEST_DURATION.labels(provider, operation, "failed").observe(time.perf_counter() - started)
+        PROVIDER_ERRORS.labels(provider, operation, type(e).__name__).inc()
+        raise
+    PROVIDER_REQUEST_DURATION.labels(provider, operation, "completed").observe(time.perf_counter() - started)
+
+
+def record_usage(model: str, operation: str, usage: Any):
+    """Add an OpenAI usage object (or its dict form) to the token counters."""
+    if usage is None:
+        return
+    if not isinstance(usage, dict):
+        usage = usage.model_dump()
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(model, operation, kind.removesuffix("_tokens")).inc(usage[kind])
+
+
+class CacheCollector:
+    """Exposes the hit and miss counts the caches already keep, without a second set of counters."""
+
+    def __init__(self):
+        self.caches: dict[str, Any] = {}
+
+    def collect(self):
+        lookups = CounterMetricFamily("pipeline_cache_lookups", "Cache lookups by result", labels=["cache", "result"])
+        for name, cache in self.caches.items():
+            lookups.add_metric([name, "hit"], cache.hits)
+            lookups.add_metric([name, "miss"], cache.misses)
+        yield lookups
+
+
+cache_collector = CacheCollector()
+REGISTRY.register(cache_collector)
+
+
+def register_cache(name: str, cache: Any):
+    """Report a cache with hits and misses attributes as pipeline_cache_lookups_total{cache=name}."""
+    cache_collector.caches[name] = cache
+
+
+def start_worker_metrics_server(port: int = WORKER_METRICS_PORT):
+    if port:
+        start_http_server(port)
@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+from src.utils.db import db
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATIONS_DIR = os.path.join(project_root, "migrations")
+
+
+async def apply_migrations(migrations_dir: str = MIGRATIONS_DIR) -> list[str]:
+    """
+    Apply the numbered .sql files in migrations_dir that have not run yet, in
+    filename order, each in its own transaction. Returns the applied filenames.
+    """
+    applied = []
+    async with db.connection() as connection:
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+        await connection.commit()
+
+        cursor = await connection.execute("SELECT name FROM schema_migrations")
+        done = {row[0] for row in await cursor.fetchall()}
+        await connection.commit()
+
+        for name in sorted(os.listdir(migrations_dir)):
+            if not name.endswith(".sql") or name in done:
+                continue
+            with open(os.path.join(migrations_dir, name)) as f:
+                statements = f.read()
+            async with connection.transaction():
+                await connection.execute(statements)
+                await connection.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            applied.append(name)
+            print(f"Applied migration {name}")
+
+    return applied
+
+
+async def main():
+    try:
+        await apply_migrations()
+    finally:
+        await db.aclose()
+
+
+def run_migrations():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -0,0 +1,32 @@
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+from src.utils.blob_store import blob_store
+
+load_dotenv()
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("AUDIO_UPLOAD_CHUNK_SIZE", 1024 * 1024))
+
+
+async def spool_upload(upload) -> tuple[str, str]:
+    """
+    Copy an uploaded file into the blob store one chunk at a time and return a
+    (filename, digest) reference the workflows can pass around instead of the bytes.
+    The blocking file writes run in a thread so other requests are not held up.
+    """
+    filename = os.path.basename(upload.filename or "upload")
+
+    writer = await asyncio.to_thread(blob_store.writer)
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            await asyncio.to_thread(writer.write, chunk)
+        digest = await asyncio.to_thread(writer.commit)
+    except BaseException:
+        await asyncio.to_thread(writer.abort)
+        raise
+    finally:
+        await upload.close()
+
+    return filename, digest
@@ -8,3 +8,47 @@ def format_translated_conversation(chat_completion_response):
     formatted_output = '\n'.join(formatted_lines)
     
     return formatted_output
+
+
+def child_workflow_id(parent_workflow_id: str, index: int, filename: str) -> str:
+    # Shared by ParentWorkflow and the API job tracker so both agree on child ids.
+    # The index keeps ids unique when a batch contains the same filename twice.
+    return f"{parent_workflow_id}-child-execute-{index}-{filename}"
+
+
+def parent_workflow_id(workflow_id: str) -> str:
+    # Inverse of child_workflow_id; a parent id maps to itself
+    return workflow_id.split("-child-execute-", 1)[0]
+
+
+# Per-request choice of speaker diarization engine, see identify_speakers
+DIARIZATION_ENGINE_ASSEMBLYAI = "assemblyai"
+DIARIZATION_ENGINE_LOCAL = "local"
+DIARIZATION_ENGINES = (DIARIZATION_ENGINE_ASSEMBLYAI, DIARIZATION_ENGINE_LOCAL)
+
+
+def check_option(name: str, value: str, allowed: tuple[str, ...]) -> str:
+    if value not in allowed:
+        raise ValueError(f"Unknown {name} {value!r}, expected one of {', '.join(allowed)}")
+    return value
+
+
+# Per-request translation strategy, see ChildWorkflow
+TRANSLATION_MODE_SINGLE = "single"
+TRANSLATION_MODE_CHUNKED = "chunked"
+TRANSLATION_MODES = (TRANSLATION_MODE_SINGLE, TRANSLATION_MODE_CHUNKED)
+
+
+# Per-request choice between translate + extract_info and one combined call, see ChildWorkflow
+ANALYSIS_MODE_SEPARATE = "separate"
+ANALYSIS_MODE_COMBINED = "combined"
+ANALYSIS_MODES = (ANALYSIS_MODE_SEPARATE, ANALYSIS_MODE_COMBINED)
+
+
+def check_modes(translation_mode: str, analysis_mode: str):
+    # The combined call translates the whole transcript in one go, so it cannot be chunked
+    if analysis_mode == ANALYSIS_MODE_COMBINED and translation_mode == TRANSLATION_MODE_CHUNKED:
+        raise ValueError(
+            f"translation_mode {TRANSLATION_MODE_CHUNKED!r} cannot be used with analysis_mode "
+            f"{ANALYSIS_MODE_COMBINED!r}; use translation_mode {TRANSLATION_MODE_SINGLE!r}"
+        )
@@ -0,0 +1,160 @@
+import asyncio
+from datetime import timedelta
+from dataclasses import dataclass
+from restack_ai.workflow import workflow, import_functions, log
+from src.utils.chunking import format_utterance
+from src.utils.util import DIARIZATION_ENGINE_ASSEMBLYAI
+from .child import (
+    IDENTIFY_SPEAKERS_HEARTBEAT_TIMEOUT, IDENTIFY_SPEAKERS_RETRY_POLICY, NORMALIZE_AUDIO_HEARTBEAT_TIMEOUT,
+    NORMALIZE_AUDIO_TIMEOUT, extract_info_prompt, identify_speakers_timeout,
+)
+from .parent import CHILD_COMPLETED, CHILD_FAILED, ChildWorkflowResult
+
+with import_functions():
+    from src.functions.normalize_audio import (
+        normalize_audio,
+        FunctionInputParams as NormalizeAudioFunctionInputParams,
+    )
+    from src.functions.speaker_identification import (
+        identify_speakers,
+        FunctionInputParams as IdentifySpeakerFunctionInputParams,
+    )
+    from src.functions.agents.batch_analysis import (
+        store_analysis_request, submit_analysis_batch, poll_analysis_batch, collect_analysis_batch,
+        BatchRequest, SubmitBatchInputParams, BatchInputParams,
+    )
+    from src.functions.db_audio_analysis import (
+        write_to_audio_table,
+        FunctionInputParams as WriteDataFunctionInputParams,
+    )
+
+
+@dataclass
+class WorkflowInputParams:
+    # (filename, sha256 digest) pairs pointing into the audio blob store
+    file_refs: list[tuple[str, str]]
+    diarization_engine: str = DIARIZATION_ENGINE_ASSEMBLYAI
+    # Files transcribed at the same time before the batch is submitted
+    max_concurrent_files: int = 4
+    # First wait between batch polls; it doubles after every poll up to max_poll_interval_seconds
+    poll_interval_seconds: float = 60.0
+    max_poll_interval_seconds: float = 1800.0
+    # Files per OpenAI batch. Larger backfills are split into several batches that
+    # run side by side, which keeps every step's list of digests small.
+    max_batch_requests: int = 1000
+
+@workflow.defn()
+class BulkAnalysisWorkflow:
+    """
+    Backfill path: transcribe every file, send the extraction requests to the
+    OpenAI Batch API as JSONL jobs instead of one interactive call per file,
+    wait for them, then write each analysis to the database. Prompts and
+    analyses go through the blob store, so steps only pass digests. Returns one
+    ChildWorkflowResult per file, like ParentWorkflow.
+    """
+
+    @workflow.run
+    async def run(self, input: WorkflowInputParams):
+        log.info("BulkAnalysisWorkflow started", files=len(input.file_refs))
+
+        results = [ChildWorkflowResult(filename=filename, status=CHILD_FAILED) for filename, _ in input.file_refs]
+        semaphore = asyncio.Semaphore(max(1, input.max_concurrent_files))
+
+        async def transcribe_file(index: int, file_ref: tuple[str, str]) -> str | None:
+            """Digest of the file's JSONL request line, or None if it could not be transcribed."""
+            async with semaphore:
+                try:
+                    normalized_audio = await workflow.step(
+                        normalize_audio,
+                        NormalizeAudioFunctionInputParams(file_ref=file_ref),
+                        start_to_close_timeout=NORMALIZE_AUDIO_TIMEOUT,
+                        heartbeat_timeout=NORMALIZE_AUDIO_HEARTBEAT_TIMEOUT,
+                    )
+                    transcript = await workflow.step(
+                        identify_speakers,
+                        IdentifySpeakerFunctionInputParams(
+                            file_ref=tuple(normalized_audio["file_ref"]),
+                            time_map=normalized_audio["time_map"],
+                            diarization_engine=input.diarization_engine,
+                        ),
+                        start_to_close_timeout=identify_speakers_timeout(normalized_audio["duration_seconds"]),
+                        heartbeat_timeout=IDENTIFY_SPEAKERS_HEARTBEAT_TIMEOUT,
+                        retry_policy=IDENTIFY_SPEAKERS_RETRY_POLICY,
+                    )
+                    formatted_transcript = "\n".join(format_utterance(utterance) for utterance in transcript["utterances"])
+                    stored = await workflow.step(
+                        store_analysis_request,
+                        BatchRequest(custom_id=str(index), user_prompt=extract_info_prompt(formatted_transcript)),
+                        start_to_close_timeout=timedelta(seconds=60),
+                    )
+                    return stored["request_ref"]
+                except Exception as e:
+                    log.error("Transcription failed", filename=file_ref[0], error=str(e))
+                    results[index].error = str(e)
+                    return None
+
+        request_refs = await asyncio.gather(
+            *(transcribe_file(index, file_ref) for index, file_ref in enumerate(input.file_refs))
+        )
+        pending = [(index, request_ref) for index, request_ref in enumerate(request_refs) if request_ref is not None]
+        if not pending:
+            return results
+
+        async def write_result(index: int, analysis: dict | None, batch_id: str, status: str):
+            result = results[index]
+            if analysis is None:
+                result.error = f"Batch {batch_id} ended with status {status}"
+                return
+            if "error" in analysis:
+                result.error = analysis["error"]
+                return
+            try:
+                # Writes are coalesced by the worker's bulk writer
+                result.result = await workflow.step(
+                    write_to_audio_table,
+                    WriteDataFunctionInputParams(conversation_analysis_ref=analysis["analysis_ref"]),
+                    start_to_close_timeout=timedelta(seconds=120),
+                )
+                result.status = CHILD_COMPLETED
+            except Exception as e:
+                result.error = str(e)
+
+        async def run_batch(shard: list[tuple[int, str]]) -> str:
+            submitted = await workflow.step(
+                submit_analysis_batch,
+                SubmitBatchInputParams(request_refs=[request_ref for _, request_ref in shard]),
+                start_to_close_timeout=timedelta(seconds=120),
+            )
+            batch = BatchInputParams(batch_id=submitted["batch_id"])
+
+            # Durable timer between polls. Small batches finish in minutes but large ones
+            # can take up to 24h, so back off rather than polling (and growing the
+            # workflow history) at a fixed rate.
+            poll_interval = input.poll_interval_seconds
+            while True:
+                status = await workflow.step(
+                    poll_analysis_batch, batch, start_to_close_timeout=timedelta(seconds=60),
+                )
+                if status["final"]:
+                    break
+                await asyncio.sleep(poll_interval)
+                poll_interval = min(poll_interval * 2, input.max_poll_interval_seconds)
+            log.info("Analysis batch finished", batch_id=batch.batch_id, status=status)
+
+            analyses = {}
+            if status["status"] == "completed":
+                analyses = await workflow.step(
+                    collect_analysis_batch, batch, start_to_close_timeout=timedelta(seconds=300),
+                )
+            await asyncio.gather(
+                *(write_result(index, analyses.get(str(index)), batch.batch_id, status["status"]) for index, _ in shard)
+            )
+            return batch.batch_id
+
+        batch_size = max(1, input.max_batch_requests)
+        batch_ids = await asyncio.gather(
+            *(run_batch(pending[start:start + batch_size]) for start in range(0, len(pending), batch_size))
+        )
+
+        log.info("BulkAnalysisWorkflow completed", batch_ids=batch_ids)
+        return results
@@ -1,17 +1,29 @@
+import asyncio
 from datetime import timedelta
 from dataclasses import dataclass
-from restack_ai.workflow import workflow, import_functions, log
+from restack_ai.workflow import workflow, import_functions, log, RetryPolicy
 from typing import Any
+from src.utils.chunking import chunk_utterances, estimate_tokens, format_utterance
+from src.utils.util import (
+    ANALYSIS_MODE_COMBINED, ANALYSIS_MODE_SEPARATE, DIARIZATION_ENGINE_ASSEMBLYAI,
+    TRANSLATION_MODE_CHUNKED, TRANSLATION_MODE_SINGLE,
+)
 # from ..utils.util import format_translated_conversation
 
 with import_functions():
+    from src.functions.normalize_audio import (
+        normalize_audio,
+        FunctionInputParams as NormalizeAudioFunctionInputParams,
+    )
     from src.functions.transcribe import (
         transcribe,
         FunctionInputParams as TranscribeFunctionInputParams,
     )
     from src.functions.translate import (
         translate,
+        translate_chunk,
         FunctionInputParams as TranslationFunctionInputParams,
+        ChunkFunctionInputParams as TranslateChunkFunctionInputParams,
     )
     from src.functions.speaker_identification import (
         identify_speakers,
@@ -19,6 +31,7 @@ with import_functions():
     )
     from src.functions.agents.extract_info import (
         extract_info,
+        translate_and_extract_info,
         FunctionInputParams as ExtractInfoFunctionInputParams,
     )
     from src.functions.db_audio_analysis import (
@@ -29,7 +42,63 @@ with import_functions():
 
 @dataclass
 class WorkflowInputParams:
-    file_data: tuple[str, str]
+    # (filename, sha256 digest) pointing into the audio blob store
+    file_ref: tuple[str, str]
+    diarization_engine: str = DIARIZATION_ENGINE_ASSEMBLYAI
+    translation_mode: str = TRANSLATION_MODE_SINGLE
+    # "combined" replaces translate + extract_info with one call; translation_mode is then ignored
+    analysis_mode: str = ANALYSIS_MODE_SEPARATE
+
+# Estimated prompt tokens per chunk in chunked translation mode
+TRANSLATION_CHUNK_TOKENS = 1500
+TRANSLATION_MAX_PARALLEL_CHUNKS = 8
+
+# normalize_audio runs before the duration is known, so it gets a bound that covers
+# very long recordings and heartbeats so a lost worker is still noticed quickly
+NORMALIZE_AUDIO_TIMEOUT = timedelta(hours=1)
+NORMALIZE_AUDIO_HEARTBEAT_TIMEOUT = timedelta(seconds=90)
+# identify_speakers runs for a fraction of the recording's length (AssemblyAI, or
+# local clustering plus transcription), so its timeout grows with the audio
+IDENTIFY_SPEAKERS_BASE_TIMEOUT_SECONDS = 120
+IDENTIFY_SPEAKERS_TIMEOUT_PER_AUDIO_SECOND = 1.0
+# The function heartbeats while it waits, so a lost worker shows up quickly
+IDENTIFY_SPEAKERS_HEARTBEAT_TIMEOUT = timedelta(seconds=90)
+# A retry repeats the whole provider call, so keep them few and spaced out
+IDENTIFY_SPEAKERS_RETRY_POLICY = RetryPolicy(
+    initial_interval=timedelta(seconds=10),
+    backoff_coefficient=2.0,
+    maximum_interval=timedelta(minutes=2),
+    maximum_attempts=3,
+    non_retryable_error_types=["ValueError"],
+)
+
+def identify_speakers_timeout(duration_seconds: float) -> timedelta:
+    return timedelta(
+        seconds=IDENTIFY_SPEAKERS_BASE_TIMEOUT_SECONDS + duration_seconds * IDENTIFY_SPEAKERS_TIMEOUT_PER_AUDIO_SECOND
+    )
+
+# translate_and_extract_info's output includes the full translation, so its step timeout
+# grows with the prompt. It stays above the function's own HTTP timeout
+# (PROVIDER_TIMEOUT_SECONDS plus COMBINED_ANALYSIS_SECONDS_PER_TOKEN per token).
+COMBINED_ANALYSIS_BASE_TIMEOUT_SECONDS = 120
+COMBINED_ANALYSIS_TIMEOUT_PER_TOKEN = 0.1
+
+def combined_analysis_timeout(user_prompt: str) -> timedelta:
+    return timedelta(
+        seconds=COMBINED_ANALYSIS_BASE_TIMEOUT_SECONDS + estimate_tokens(user_prompt) * COMBINED_ANALYSIS_TIMEOUT_PER_TOKEN
+    )
+
+def translation_prompt(content: str) -> str:
+    return f"""
+        Instructions: Translate the following content to English. Output only the translated content.
+        Content: {content}
+        """
+
+def extract_info_prompt(content: str) -> str:
+    return f"""
+        Instructions: Analyze the following content that is a military conversation transcript. Output only analyzed content as per format.
+        Content: {content}
+        """
 
 @dataclass
 class WorkflowOutputParams:
@@ -38,6 +107,10 @@ class WorkflowOutputParams:
     translation_2: str
     conversation_analysis: str
     db_write_audio: Any
+    # Fraction of the recording the VAD classified as speech
+    speech_ratio: float
+    # Per-chunk size and timing when translation_mode is "chunked"
+    translation_chunks: list[dict] | None = None
     # db_read_audio: str
 
 @dataclass
@@ -50,9 +123,18 @@ class ChildWorkflow:
     async def run(self, input: WorkflowInputParams):
         log.info("ChildWorkflow started", input=input)
 
+        # Providers get a 16 kHz mono speech encoding with long silences cut out
+        normalized_audio = await workflow.step(
+            normalize_audio,
+            NormalizeAudioFunctionInputParams(file_ref=input.file_ref),
+            start_to_close_timeout=NORMALIZE_AUDIO_TIMEOUT,
+            heartbeat_timeout=NORMALIZE_AUDIO_HEARTBEAT_TIMEOUT,
+        )
+        normalized_file_ref = tuple(normalized_audio["file_ref"])
+
         # transcription = await workflow.step(
         #     transcribe,
-        #     TranscribeFunctionInputParams(file_data=input.file_data),
+        #     TranscribeFunctionInputParams(file_ref=normalized_file_ref),
         #     start_to_close_timeout=timedelta(seconds=120),
         # )
 
@@ -70,62 +152,132 @@ class ChildWorkflow:
         log.info("Before fetching speaker_identification_transcript()")
         speaker_identification_transcript = await workflow.step(
             identify_speakers,
-            IdentifySpeakerFunctionInputParams(file_data=input.file_data),
-            start_to_close_timeout=timedelta(seconds=120),
+            IdentifySpeakerFunctionInputParams(
+                file_ref=normalized_file_ref,
+                time_map=normalized_audio["time_map"],
+                diarization_engine=input.diarization_engine,
+            ),
+            start_to_close_timeout=identify_speakers_timeout(normalized_audio["duration_seconds"]),
+            heartbeat_timeout=IDENTIFY_SPEAKERS_HEARTBEAT_TIMEOUT,
+            retry_policy=IDENTIFY_SPEAKERS_RETRY_POLICY,
         )
         log.info("After fetching speaker_identification_transcript()")
 
         # print("Speaker Identification: \n", speaker_identification_transcript)
 
-        combined_text = "\n".join(
-            f"Speaker {utterance['speaker']}: {utterance['text']}"
-            for utterance in speaker_identification_transcript['utterances']
-        )
+        utterances = speaker_identification_transcript['utterances']
+        combined_text = "\n".join(format_utterance(utterance) for utterance in utterances)
 
         # Create translation prompt
-        translation_prompt_2 = f"""
-        Instructions: Translate the following content to English. Output only the translated content.
-        Content: {combined_text}
-        """
+        translation_prompt_2 = translation_prompt(combined_text)
 
-        log.info("Running translation_2....")
+        analysis_prompt = extract_info_prompt(combined_text)
 
-        # Pass to translation function
-        translation_2 = await workflow.step(
-            translate,
-            TranslationFunctionInputParams(user_prompt=translation_prompt_2),
-            start_to_close_timeout=timedelta(seconds=120),
-        )
+        # Translation and extraction only depend on combined_text, so they run
+        # concurrently. The DB write only depends on extraction.
+        #
+        #   combined_text --> translate
+        #                 \-> extract_info --> write_to_audio_table
+        #
+        # In combined analysis mode both come from a single translate_and_extract_info step.
+        translation_chunks = None
+        combined_task = None
 
-        log.info("Completed translation_2....")
+        async def run_combined():
+            log.info("Running translate_and_extract_info....")
+            combined = await workflow.step(
+                translate_and_extract_info,
+                ExtractInfoFunctionInputParams(user_prompt=analysis_prompt),
+                start_to_close_timeout=combined_analysis_timeout(analysis_prompt),
+            )
+            log.info("Completed translate_and_extract_info....")
+            return combined
 
-        extract_info_prompt = f"""
-        Instructions: Analyze the following content that is a military conversation transcript. Output only analyzed content as per format.
-        Content: {combined_text}
-        """
+        if input.analysis_mode == ANALYSIS_MODE_COMBINED:
+            if input.translation_mode == TRANSLATION_MODE_CHUNKED:
+                # The API rejects this pair; a workflow started some other way gets the single combined call
+                log.info("translation_mode chunked is ignored in combined analysis mode")
+            combined_task = asyncio.create_task(run_combined())
 
-        log.info("Running extract_info....")
+        async def run_translation():
+            log.info("Running translation_2....")
+            if combined_task is not None:
+                translation = {"content": (await combined_task)["translation"]}
+            elif input.translation_mode == TRANSLATION_MODE_CHUNKED:
+                translation = await run_chunked_translation()
+            else:
+                translation = await workflow.step(
+                    translate,
+                    TranslationFunctionInputParams(user_prompt=translation_prompt_2),
+                    start_to_close_timeout=timedelta(seconds=120),
+                )
+            log.info("Completed translation_2....")
+            return translation
 
-        # Pass to translation function
-        extraction_json_data = await workflow.step(
-            extract_info,
-            ExtractInfoFunctionInputParams(user_prompt=extract_info_prompt),
-            start_to_close_timeout=timedelta(seconds=120),
-        )
-        
-        log.info("Extracted JSON data:")
-        log.info(extraction_json_data)
+        async def run_chunked_translation():
+            # Chunks are cut on speaker boundaries, translated concurrently and
+            # joined back in transcript order
+            nonlocal translation_chunks
+            chunks = chunk_utterances(utterances, TRANSLATION_CHUNK_TOKENS)
+            semaphore = asyncio.Semaphore(TRANSLATION_MAX_PARALLEL_CHUNKS)
+
+            async def run_chunk(index, chunk_text):
+                async with semaphore:
+                    return await workflow.step(
+                        translate_chunk,
+                        TranslateChunkFunctionInputParams(index=index, user_prompt=translation_prompt(chunk_text)),
+                        start_to_close_timeout=timedelta(seconds=120),
+                    )
 
-        log.info("Completed extract_info....")
+            chunk_texts = ["\n".join(format_utterance(utterance) for utterance in chunk) for chunk in chunks]
+            chunk_results = await asyncio.gather(
+                *(run_chunk(index, chunk_text) for index, chunk_text in enumerate(chunk_texts))
+            )
+            translation_chunks = [
+                {
+                    "index": result["index"],
+                    "utterances": len(chunk),
+                    "estimated_tokens": estimate_tokens(chunk_text),
+                    "duration_seconds": result["duration_seconds"],
+                    "cache_hit": result["cache_hit"],
+                }
+                for result, chunk, chunk_text in zip(chunk_results, chunks, chunk_texts)
+            ]
+            log.info("Chunked translation timings", chunks=translation_chunks)
+            return {"content": "\n".join(result["content"] for result in chunk_results)}
 
+        async def run_extraction():
+            if combined_task is not None:
+                return (await combined_task)["conversation_analysis"]
+            log.info("Running extract_info....")
+            extraction = await workflow.step(
+                extract_info,
+                ExtractInfoFunctionInputParams(user_prompt=analysis_prompt),
+                start_to_close_timeout=timedelta(seconds=120),
+            )
+            log.info("Extracted JSON data:")
+            log.info(extraction)
+            log.info("Completed extract_info....")
+            return extraction
 
-        log.info("Before writing to DB in child workflow")
-        db_write_audio = await workflow.step(
-              write_to_audio_table,
-              WriteDataFunctionInputParams(conversation_analysis=extraction_json_data),
-              start_to_close_timeout=timedelta(seconds=120),
-          )
-        log.info("After writing to DB in child workflow")
+        extraction_task = asyncio.create_task(run_extraction())
+
+        async def run_db_write():
+            extraction = await extraction_task
+            log.info("Before writing to DB in child workflow")
+            db_write = await workflow.step(
+                write_to_audio_table,
+                WriteDataFunctionInputParams(conversation_analysis=extraction),
+                start_to_close_timeout=timedelta(seconds=120),
+            )
+            log.info("After writing to DB in child workflow")
+            return db_write
+
+        translation_2, extraction_json_data, db_write_audio = await asyncio.gather(
+            run_translation(),
+            extraction_task,
+            run_db_write(),
+        )
 
         # log.info("Before reading from DB in child workflow")
         # db_read_audio = await workflow.step(
@@ -141,6 +293,8 @@ class ChildWorkflow:
             translation_2=translation_2["content"],
             conversation_analysis=extraction_json_data,
             db_write_audio=db_write_audio,
+            speech_ratio=normalized_audio["speech_ratio"],
+            translation_chunks=translation_chunks,
             # db_read_audio=db_read_audio
         )
 
@@ -150,6 +304,8 @@ class ChildWorkflow:
             translation_2=translation_2["content"],
             conversation_analysis=extraction_json_data,
             db_write_audio=db_write_audio,
+            speech_ratio=normalized_audio["speech_ratio"],
+            translation_chunks=translation_chunks,
             # db_read_audio=db_read_audio
         )
 
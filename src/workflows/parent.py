@@ -1,10 +1,32 @@
+import asyncio
 from restack_ai.workflow import workflow, log, workflow_info
 from dataclasses import dataclass
-from .child import ChildWorkflow
+from typing import Any
+from .child import ChildWorkflow, WorkflowInputParams as ChildWorkflowInputParams
+from src.utils.util import (
+    ANALYSIS_MODE_SEPARATE, DIARIZATION_ENGINE_ASSEMBLYAI, TRANSLATION_MODE_SINGLE, child_workflow_id,
+)
+
+CHILD_COMPLETED = "completed"
+CHILD_FAILED = "failed"
 
 @dataclass
 class WorkflowInputParams:
-    file_data: list[tuple[str, str]]
+    # (filename, sha256 digest) pairs pointing into the audio blob store
+    file_refs: list[tuple[str, str]]
+    # Maximum number of child workflows running at the same time
+    max_concurrent_children: int = 4
+    # Applied to every file in the batch
+    diarization_engine: str = DIARIZATION_ENGINE_ASSEMBLYAI
+    translation_mode: str = TRANSLATION_MODE_SINGLE
+    analysis_mode: str = ANALYSIS_MODE_SEPARATE
+
+@dataclass
+class ChildWorkflowResult:
+    filename: str
+    status: str
+    result: Any = None
+    error: str | None = None
 
 @workflow.defn()
 class ParentWorkflow:
@@ -14,13 +36,33 @@ class ParentWorkflow:
 
         log.info("ParentWorkflow started", input=input)
 
-        child_workflow_results = []
-        for file_data in input.file_data:
-            result = await workflow.child_execute(ChildWorkflow, workflow_id=f"{parent_workflow_id}-child-execute-{file_data[0]}", input=WorkflowInputParams(file_data=file_data))
-            child_workflow_results.append(result)
+        semaphore = asyncio.Semaphore(max(1, input.max_concurrent_children))
 
-        log.info("ParentWorkflow completed", results=child_workflow_results)
+        async def run_child(index: int, file_ref: tuple[str, str]) -> ChildWorkflowResult:
+            filename = file_ref[0]
+            async with semaphore:
+                try:
+                    result = await workflow.child_execute(
+                        ChildWorkflow,
+                        workflow_id=child_workflow_id(parent_workflow_id, index, filename),
+                        input=ChildWorkflowInputParams(
+                            file_ref=file_ref,
+                            diarization_engine=input.diarization_engine,
+                            translation_mode=input.translation_mode,
+                            analysis_mode=input.analysis_mode,
+                        ),
+                    )
+                    return ChildWorkflowResult(filename=filename, status=CHILD_COMPLETED, result=result)
+                except Exception as e:
+                    # Record the failure and let the rest of the batch carry on
+                    log.error("ChildWorkflow failed", filename=filename, error=str(e))
+                    return ChildWorkflowResult(filename=filename, status=CHILD_FAILED, error=str(e))
 
-        return child_workflow_results
+        # gather returns results in input order regardless of completion order
+        child_workflow_results = await asyncio.gather(
+            *(run_child(index, file_ref) for index, file_ref in enumerate(input.file_refs))
+        )
 
+        log.info("ParentWorkflow completed", results=child_workflow_results)
 
+        return list(child_workflow_results)
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+
+# Exercises the real SDKs against the local stand-in, so skip where they are not installed
+for module in ("fastapi", "httpx", "openai", "psycopg", "pydantic", "restack_ai"):
+    pytest.importorskip(module)
+
+import httpx
+from openai import AsyncOpenAI
+
+from benchmarks.stubs import openai_batch_server
+from src.functions.agents import batch_analysis
+from src.functions.agents.batch_analysis import (
+    BATCH_ENDPOINT, BatchInputParams, BatchRequest, SubmitBatchInputParams, batch_line, parse_batch_output,
+)
+from src.functions.agents.custom_types import ConversationAnalysis
+from src.utils.blob_store import BlobStore
+
+# Temporal rejects payloads over 2 MB; stay well below it
+MAX_STEP_PAYLOAD_BYTES = 256 * 1024
+
+
+def stub_line(request: BatchRequest, index: int = 0) -> dict:
+    # What the stand-in writes to the output (or error) file for one input line
+    return openai_batch_server.complete_request(index, json.loads(json.dumps(batch_line(request))))
+
+
+def test_batch_line_matches_the_interactive_request():
+    line = batch_line(BatchRequest(custom_id="7", user_prompt="Content: hello"))
+
+    assert line["custom_id"] == "7"
+    assert line["method"] == "POST"
+    assert line["url"] == BATCH_ENDPOINT
+    assert line["body"]["messages"][-1]["content"] == "Content: hello"
+    assert line["body"]["temperature"] == 0
+    schema = line["body"]["response_format"]["json_schema"]
+    assert schema["name"] == "ConversationAnalysis"
+    assert set(schema["schema"]["properties"]) == set(ConversationAnalysis.model_fields)
+
+
+def test_parse_batch_output_returns_a_validated_analysis():
+    result = parse_batch_output(stub_line(BatchRequest(custom_id="0", user_prompt="x")))
+
+    analysis = ConversationAnalysis.model_validate_json(result["conversation_analysis"])
+    assert analysis.priority_level == "Low"
+
+
+def test_parse_batch_output_reports_failed_requests(monkeypatch):
+    monkeypatch.setattr(openai_batch_server, "BATCH_STUB_FAIL_EVERY", 1)
+
+    result = parse_batch_output(stub_line(BatchRequest(custom_id="0", user_prompt="x")))
+
+    assert "Simulated failure" in result["error"]
+
+
+def test_parse_batch_output_reports_unparseable_content():
+    line = stub_line(BatchRequest(custom_id="0", user_prompt="x"))
+    line["response"]["body"]["choices"][0]["message"]["content"] = '{"priority_level": "Low"}'
+
+    assert parse_batch_output(line)["error"].startswith("Unparseable batch output")
+
+
+@pytest.fixture
+def stub_batch_api(monkeypatch, tmp_path):
+    monkeypatch.setattr(openai_batch_server, "BATCH_STUB_DELAY_SECONDS", 0)
+    monkeypatch.setattr(batch_analysis, "blob_store", BlobStore(str(tmp_path / "blobs")))
+    client = AsyncOpenAI(
+        api_key="stub",
+        base_url="http://batch-stub/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=openai_batch_server.app)),
+    )
+    monkeypatch.setattr(batch_analysis.clients, "openai_batch", lambda: client)
+    return batch_analysis.blob_store
+
+
+async def run_batch(requests: list[BatchRequest]) -> list[dict]:
+    """Drives the batch functions the way BulkAnalysisWorkflow does; returns every step's input and output."""
+    stored = [await batch_analysis.store_analysis_request(request) for request in requests]
+    submit_input = SubmitBatchInputParams(request_refs=[item["request_ref"] for item in stored])
+    submitted = await batch_analysis.submit_analysis_batch(submit_input)
+    batch = BatchInputParams(batch_id=submitted["batch_id"])
+    status = await batch_analysis.poll_analysis_batch(batch)
+    results = await batch_analysis.collect_analysis_batch(batch)
+    return [stored, submit_input, submitted, status, results]
+
+
+def test_submit_poll_and_collect_against_the_stub(monkeypatch, stub_batch_api):
+    monkeypatch.setattr(openai_batch_server, "BATCH_STUB_FAIL_EVERY", 3)
+    requests = [BatchRequest(custom_id=str(index), user_prompt=f"Content: {index}") for index in range(5)]
+
+    _, _, _, status, results = asyncio.run(run_batch(requests))
+
+    assert status["final"] and status["status"] == "completed"
+    assert status["request_counts"] == {"total": 5, "completed": 4, "failed": 1}
+    assert sorted(results) == [request.custom_id for request in requests]
+    # Every third request fails in the stand-in; the rest carry a valid analysis
+    assert "error" in results["2"]
+    for custom_id in ("0", "1", "3", "4"):
+        analysis = stub_batch_api.read_bytes(results[custom_id]["analysis_ref"])
+        ConversationAnalysis.model_validate_json(analysis)
+
+
+def test_large_batch_keeps_step_payloads_small(stub_batch_api):
+    # ~8 MB of prompts, far more than workflow history could carry inline
+    transcript = "Speaker A: " + "слово " * 700
+    requests = [BatchRequest(custom_id=str(index), user_prompt=f"Content: {transcript}") for index in range(1000)]
+
+    steps = asyncio.run(run_batch(requests))
+
+    for payload in steps:
+        payload = payload.__dict__ if isinstance(payload, SubmitBatchInputParams) else payload
+        assert len(json.dumps(payload).encode("utf-8")) < MAX_STEP_PAYLOAD_BYTES
+    results = steps[-1]
+    assert len(results) == len(requests)
+    assert all("analysis_ref" in result for result in results.values())
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.utils.bulk_writer import BulkWriter
+
+COLUMNS = ("name", "value")
+
+
+class FakeTransaction:
+    """Rolls the connection's uncommitted rows back to where it started if the block raises."""
+
+    def __init__(self, connection: "FakeConnection"):
+        self._connection = connection
+
+    async def __aenter__(self):
+        self._mark = len(self._connection.pending)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            del self._connection.pending[self._mark:]
+        return False
+
+
+class FakeConnection:
+    def __init__(self, database: "FakeDatabase"):
+        self._database = database
+        self.pending: list[tuple] = []
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def execute(self, query: str, params, prepare: bool = False):
+        params = list(params)
+        rows = [tuple(params[start:start + len(COLUMNS)]) for start in range(0, len(params), len(COLUMNS))]
+        self._database.statements.append(len(rows))
+        # Like Postgres, one bad row fails the whole statement
+        if any(name == "bad" for name, _ in rows):
+            raise ValueError("invalid input syntax")
+        self.pending.extend(rows)
+
+
+class FakeConnectionContext:
+    def __init__(self, database: "FakeDatabase"):
+        self._connection = FakeConnection(database)
+        self._database = database
+
+    async def __aenter__(self):
+        return self._connection
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Commits on success, like db.connection()
+        if exc_type is None:
+            self._database.committed.extend(self._connection.pending)
+        return False
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.committed: list[tuple] = []
+        self.statements: list[int] = []
+
+    def connection(self, timeout=None):
+        return FakeConnectionContext(self)
+
+
+def test_flushes_as_soon_as_the_batch_is_full():
+    database = FakeDatabase()
+    writer = BulkWriter(database, "things", COLUMNS, max_batch_size=3, max_delay_seconds=60)
+    rows = [("a", 1), ("b", 2), ("c", 3)]
+
+    async def run():
+        # Would hang on the 60 s timer if the size limit did not trigger the flush
+        await asyncio.wait_for(asyncio.gather(*(writer.write(row) for row in rows)), 1)
+
+    asyncio.run(run())
+
+    assert database.statements == [3]
+    assert database.committed == rows
+
+
+def test_flushes_after_the_delay():
+    database = FakeDatabase()
+    writer = BulkWriter(database, "things", COLUMNS, max_batch_size=100, max_delay_seconds=0.01)
+
+    async def run():
+        await asyncio.wait_for(asyncio.gather(writer.write(("a", 1)), writer.write(("b", 2))), 1)
+
+    asyncio.run(run())
+
+    assert database.statements == [2]
+    assert database.committed == [("a", 1), ("b", 2)]
+
+
+def test_failed_batch_keeps_the_good_rows_and_reports_the_bad_one():
+    database = FakeDatabase()
+    writer = BulkWriter(database, "things", COLUMNS, max_batch_size=3, max_delay_seconds=60)
+
+    async def run():
+        return await asyncio.gather(
+            writer.write(("a", 1)), writer.write(("bad", 2)), writer.write(("c", 3)), return_exceptions=True,
+        )
+
+    outcomes = asyncio.run(run())
+
+    assert outcomes[0] is None and outcomes[2] is None
+    assert isinstance(outcomes[1], ValueError)
+    assert database.committed == [("a", 1), ("c", 3)]
+    # The multi-row INSERT failed, then each row was retried on its own
+    assert database.statements == [3, 1, 1, 1]
+
+
+def test_close_flushes_rows_still_waiting_for_the_timer():
+    database = FakeDatabase()
+    writer = BulkWriter(database, "things", COLUMNS, max_batch_size=100, max_delay_seconds=60)
+
+    async def run():
+        writes = [asyncio.create_task(writer.write(row)) for row in [("a", 1), ("b", 2)]]
+        await asyncio.sleep(0)
+        await asyncio.wait_for(writer.aclose(), 1)
+        return all(write.done() for write in writes)
+
+    assert asyncio.run(run())
+    assert database.committed == [("a", 1), ("b", 2)]
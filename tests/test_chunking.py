@@ -0,0 +1,59 @@
+from src.utils.chunking import chunk_utterances, estimate_tokens, format_utterance
+
+
+def utterances(count: int, words: int = 12) -> list[dict]:
+    return [
+        {"speaker": "AB"[index % 2], "text": " ".join(f"слово{index}_{word}" for word in range(words)) + "."}
+        for index in range(count)
+    ]
+
+
+def chunk_text(chunk: list[dict]) -> str:
+    return "\n".join(format_utterance(utterance) for utterance in chunk)
+
+
+def test_chunks_stay_within_budget():
+    chunks = chunk_utterances(utterances(40), max_tokens=200)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert estimate_tokens(chunk_text(chunk)) <= 200
+
+
+def test_cuts_fall_only_between_utterances():
+    lines = utterances(40)
+
+    chunks = chunk_utterances(lines, max_tokens=200)
+
+    # Every utterance comes through whole and unchanged, in exactly one chunk
+    assert [utterance for chunk in chunks for utterance in chunk] == lines
+
+
+def test_joined_chunks_preserve_transcript_order():
+    lines = utterances(40)
+
+    chunks = chunk_utterances(lines, max_tokens=200)
+
+    assert "\n".join(chunk_text(chunk) for chunk in chunks) == chunk_text(lines)
+
+
+def test_utterance_over_budget_is_split_at_sentence_ends():
+    sentences = [f"Предложение номер {index} довольно длинное." for index in range(30)]
+    long_line = {"speaker": "B", "text": " ".join(sentences), "start": 0, "end": 60000}
+    lines = utterances(2) + [long_line] + utterances(2)
+
+    chunks = chunk_utterances(lines, max_tokens=120)
+
+    flattened = [utterance for chunk in chunks for utterance in chunk]
+    assert flattened[:2] == lines[:2] and flattened[-2:] == lines[-2:]
+    pieces = flattened[2:-2]
+    assert len(pieces) > 1
+    # Pieces keep the speaker and timing, and rejoin into the original line
+    assert all(piece["speaker"] == "B" and piece["start"] == 0 for piece in pieces)
+    assert " ".join(piece["text"] for piece in pieces) == long_line["text"]
+    for chunk in chunks:
+        assert estimate_tokens(chunk_text(chunk)) <= 120
+
+
+def test_empty_transcript_has_no_chunks():
+    assert chunk_utterances([], max_tokens=200) == []
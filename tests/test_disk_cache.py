@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.utils.disk_cache import DiskCache
+from src.utils.llm_cache import LLMResponseCache
+
+
+def test_async_access_round_trips_through_the_disk(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"))
+
+    async def run():
+        await cache.aset("key", {"content": "привет"})
+        return await cache.aget("key"), await cache.aget("missing"), await cache.astats()
+
+    value, missing, stats = asyncio.run(run())
+
+    assert value == {"content": "привет"}
+    assert missing is None
+    assert stats["entries"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_llm_cache_uses_the_backend_async_methods(tmp_path):
+    cache = LLMResponseCache(DiskCache(str(tmp_path / "llm.sqlite")))
+    key = cache.key("model", [{"role": "user", "content": "hi"}], 0)
+
+    async def run():
+        await cache.aset(key, {"role": "assistant", "content": "hello"})
+        return await cache.aget(key)
+
+    assert asyncio.run(run()) == {"role": "assistant", "content": "hello"}
+    # The sync path reads the same entry
+    assert cache.get(key) == {"role": "assistant", "content": "hello"}
@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.utils import events
+from src.utils.events import EVENT_MAX_PAYLOAD_BYTES, EventHub, EventPublisher, encode_event, split_text
+
+
+def test_cyrillic_text_is_split_by_encoded_bytes(monkeypatch):
+    monkeypatch.setattr(events, "current_workflow_id", lambda: "job-1-child-0")
+    sent = []
+    monkeypatch.setattr(events.publisher, "send", sent.append)
+    text = 'Привет, "мир"\n' * 2000
+
+    asyncio.run(events.publish_text("translation.delta", text, chunk_index=3))
+
+    assert len(sent) > 1
+    assert "".join(event["text"] for event in sent) == text
+    for event in sent:
+        assert len(encode_event(event).encode("utf-8")) <= EVENT_MAX_PAYLOAD_BYTES
+        assert event["chunk_index"] == 3
+
+
+def test_split_text_keeps_short_text_whole():
+    assert split_text("hello", 100) == ["hello"]
+    assert split_text("", 100) == []
+
+
+class FakeConnection:
+    def __init__(self, sent: list):
+        self.sent = sent
+
+    def transaction(self):
+        return FakeContext()
+
+    async def execute(self, query, params):
+        payload = json.loads(params[1])
+        if payload.get("bad"):
+            raise ValueError("payload string too long")
+        self.sent.append(payload)
+
+
+class FakeContext:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.sent = []
+
+    def connection(self, timeout=None):
+        return FakeContext(FakeConnection(self.sent))
+
+
+def test_one_rejected_notify_does_not_drop_the_batch():
+    database = FakeDatabase()
+    publisher = EventPublisher(database)
+
+    async def run():
+        for index in range(5):
+            publisher.send({"index": index, "bad": index == 2})
+        await publisher.aclose()
+
+    asyncio.run(run())
+
+    assert [event["index"] for event in database.sent] == [0, 1, 3, 4]
+    assert publisher.dropped == 1
+
+
+def test_slow_subscriber_keeps_only_the_newest_events():
+    hub = EventHub(subscriber_queue_size=3)
+
+    async def run():
+        stream = hub.subscribe("job", finished=lambda: False)
+        # Subscribed, but not reading while the events arrive
+        waiting = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        for index in range(10):
+            hub.dispatch({"job_id": "job", "index": index})
+        received = [(await waiting)["index"]]
+        for _ in range(2):
+            received.append((await stream.__anext__())["index"])
+        await stream.aclose()
+        return received
+
+    assert asyncio.run(run()) == [7, 8, 9]
+    assert hub.dropped == 7
@@ -0,0 +1,95 @@
+import numpy as np
+
+from src.audio.stitch import speaker_label, stitch_chunk_utterances
+
+SAMPLE_RATE = 16000
+# (f0, [(formant_hz, bandwidth_hz), ...]) for clearly different synthetic voices
+VOICE_A = (120, [(700, 150), (1200, 200), (2600, 300)])
+VOICE_B = (210, [(400, 120), (2000, 250), (3000, 300)])
+TURN_SECONDS = 3.0
+
+
+def synthetic_voice(seconds: float, f0: float, formants: list[tuple[float, float]]) -> np.ndarray:
+    """Harmonics shaped by formant peaks, with a syllable-rate envelope."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = np.zeros_like(t)
+    for harmonic in range(1, 30):
+        frequency = harmonic * f0
+        if frequency > SAMPLE_RATE / 2 - 200:
+            break
+        amplitude = sum(np.exp(-((frequency - center) / width) ** 2) for center, width in formants) + 0.02
+        signal += amplitude * np.sin(2 * np.pi * frequency * t)
+    envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3 * t))
+    return (0.3 * signal * envelope / np.max(np.abs(signal))).astype(np.float32)
+
+
+def chunk(voices: list[tuple], local_labels: list[str], chunk_index: int):
+    """One chunk of alternating turns; returns its samples and utterances on the chunk's own timeline."""
+    parts, utterances = [], []
+    for turn, (voice, label) in enumerate(zip(voices, local_labels)):
+        parts.append(synthetic_voice(TURN_SECONDS, *voice))
+        start_ms = int(turn * TURN_SECONDS * 1000)
+        utterances.append({
+            "speaker": label,
+            "text": f"chunk {chunk_index} turn {turn}",
+            "start": start_ms,
+            "end": start_ms + int(TURN_SECONDS * 1000),
+        })
+    return np.concatenate(parts), utterances
+
+
+def stitch(chunks):
+    samples = np.concatenate([chunk_samples for chunk_samples, _ in chunks])
+    offsets_ms, position = [], 0
+    for chunk_samples, _ in chunks:
+        offsets_ms.append(position * 1000 // SAMPLE_RATE)
+        position += len(chunk_samples)
+    return stitch_chunk_utterances([utterances for _, utterances in chunks], offsets_ms, samples, SAMPLE_RATE), offsets_ms
+
+
+def test_speakers_are_reconciled_across_chunks():
+    # Each chunk's diarization labels its first speaker "A", whoever that is
+    chunks = [
+        chunk([VOICE_A, VOICE_B, VOICE_A], ["A", "B", "A"], 0),
+        chunk([VOICE_B, VOICE_A, VOICE_B], ["A", "B", "A"], 1),
+    ]
+
+    stitched, _ = stitch(chunks)
+
+    assert [u["speaker"] for u in stitched] == ["A", "B", "A", "B", "A", "B"]
+
+
+def test_new_voice_in_a_later_chunk_gets_a_new_label():
+    voice_c = (300, [(300, 100), (2400, 250), (3400, 300)])
+    chunks = [
+        chunk([VOICE_A, VOICE_A], ["A", "A"], 0),
+        chunk([VOICE_A, voice_c], ["A", "B"], 1),
+    ]
+
+    stitched, _ = stitch(chunks)
+
+    assert [u["speaker"] for u in stitched] == ["A", "A", "A", "B"]
+
+
+def test_utterances_keep_their_order_on_the_original_timeline():
+    chunks = [
+        chunk([VOICE_A, VOICE_B], ["A", "B"], 0),
+        chunk([VOICE_B, VOICE_A], ["A", "B"], 1),
+        chunk([VOICE_A, VOICE_B], ["B", "A"], 2),
+    ]
+
+    stitched, offsets_ms = stitch(chunks)
+
+    expected = [
+        (u["text"], u["start"] + offset_ms, u["end"] + offset_ms)
+        for (_, utterances), offset_ms in zip(chunks, offsets_ms)
+        for u in utterances
+    ]
+    assert [(u["text"], u["start"], u["end"]) for u in stitched] == expected
+    assert [u["start"] for u in stitched] == sorted(u["start"] for u in stitched)
+
+
+def test_speaker_labels_follow_assemblyai():
+    assert [speaker_label(index) for index in (0, 1, 25, 26, 27, 701, 702)] == [
+        "A", "B", "Z", "AA", "AB", "ZZ", "AAA",
+    ]
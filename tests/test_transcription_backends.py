@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+# backends.py logs through the restack SDK
+for module in ("dotenv", "restack_ai"):
+    pytest.importorskip(module)
+
+import numpy as np
+
+from src.transcription import backends
+
+SAMPLE_RATE = 16000
+
+
+class FakeBackend:
+    def __init__(self, name: str, seconds_per_audio_second: float = 0.0):
+        self.name = name
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.calls = 0
+
+    async def transcribe_segments(self, segments: list[np.ndarray], sample_rate: int) -> list[str]:
+        self.calls += 1
+        audio_seconds = sum(len(segment) for segment in segments) / sample_rate
+        await asyncio.sleep(audio_seconds * self.seconds_per_audio_second)
+        return [f"{self.name} {index}" for index in range(len(segments))]
+
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    primary, fallback = FakeBackend("groq", seconds_per_audio_second=0.01), FakeBackend("local")
+    monkeypatch.setattr(backends, "_backends", {"groq": primary, "local": fallback})
+    monkeypatch.setattr(backends, "TRANSCRIPTION_BACKEND", "groq")
+    monkeypatch.setattr(backends, "TRANSCRIPTION_FALLBACK_BACKEND", "local")
+    monkeypatch.setattr(backends, "TRANSCRIPTION_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(backends, "step_seconds_left", lambda: None)
+    return primary, fallback
+
+
+def segments(count: int, seconds: float) -> list[np.ndarray]:
+    return [np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32) for _ in range(count)]
+
+
+def test_slow_primary_falls_back(monkeypatch, fake_backends):
+    primary, fallback = fake_backends
+    monkeypatch.setattr(backends, "TRANSCRIPTION_TIMEOUT_PER_AUDIO_SECOND", 0.0)
+
+    backend, texts = asyncio.run(backends.transcribe_segments(segments(2, 10), SAMPLE_RATE))
+
+    assert backend == "local"
+    assert texts == ["local 0", "local 1"]
+    assert (primary.calls, fallback.calls) == (1, 1)
+
+
+def test_timeout_scales_with_the_audio_in_the_batch(monkeypatch, fake_backends):
+    primary, fallback = fake_backends
+    # The primary needs 0.2 s for 20 s of audio, over the flat 0.05 s but within 0.05 + 20 * 0.02
+    monkeypatch.setattr(backends, "TRANSCRIPTION_TIMEOUT_PER_AUDIO_SECOND", 0.02)
+
+    backend, texts = asyncio.run(backends.transcribe_segments(segments(2, 10), SAMPLE_RATE))
+
+    assert backend == "groq"
+    assert texts == ["groq 0", "groq 1"]
+    assert fallback.calls == 0
+
+
+def test_step_budget_still_caps_the_primary(monkeypatch, fake_backends):
+    monkeypatch.setattr(backends, "TRANSCRIPTION_TIMEOUT_PER_AUDIO_SECOND", 0.02)
+    # Only 0.1 s left in the step, so the primary gets half of it whatever the audio length
+    monkeypatch.setattr(backends, "step_seconds_left", lambda: 0.1)
+
+    backend, _ = asyncio.run(backends.transcribe_segments(segments(2, 10), SAMPLE_RATE))
+
+    assert backend == "local"
+
+
+def test_slow_primary_without_fallback_raises(monkeypatch, fake_backends):
+    monkeypatch.setattr(backends, "TRANSCRIPTION_TIMEOUT_PER_AUDIO_SECOND", 0.0)
+    monkeypatch.setattr(backends, "TRANSCRIPTION_FALLBACK_BACKEND", "none")
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(backends.transcribe_segments(segments(1, 10), SAMPLE_RATE))
@@ -0,0 +1,111 @@
+import numpy as np
+
+from src.audio.vad import (
+    VAD_PAD_SECONDS, compress_silence, detect_speech, remap_utterances, translate_timestamp,
+)
+
+SAMPLE_RATE = 16000
+
+
+def voiced(seconds: float, f0: float = 150.0) -> np.ndarray:
+    """A few harmonics with a syllable-rate envelope; loud and low in zero crossings, like voiced speech."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = sum(np.sin(2 * np.pi * harmonic * f0 * t) / harmonic for harmonic in range(1, 6))
+    envelope = 0.6 + 0.4 * np.abs(np.sin(2 * np.pi * 3 * t))
+    return (0.3 * signal * envelope / np.max(np.abs(signal))).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def recording(*parts: tuple[str, float], seed: int = 0):
+    """Concatenate ("speech" | "silence", seconds) parts over a faint noise floor; returns samples and speech spans."""
+    pieces, spans, position = [], [], 0
+    for kind, seconds in parts:
+        piece = voiced(seconds) if kind == "speech" else silence(seconds)
+        if kind == "speech":
+            spans.append((position, position + len(piece)))
+        pieces.append(piece)
+        position += len(piece)
+    samples = np.concatenate(pieces)
+    noise = 0.0005 * np.random.default_rng(seed).standard_normal(len(samples))
+    return samples + noise.astype(np.float32), spans
+
+
+def assert_covers(region: tuple[int, int], span: tuple[int, int]):
+    # A region holds its speech span, padded by at most VAD_PAD_SECONDS plus a frame on either side
+    slack = int((VAD_PAD_SECONDS + 0.05) * SAMPLE_RATE)
+    assert abs(region[0] - span[0]) <= slack
+    assert abs(region[1] - span[1]) <= slack
+
+
+def test_speech_regions_match_the_speech():
+    samples, spans = recording(("silence", 1.0), ("speech", 2.0), ("silence", 2.0), ("speech", 3.0), ("silence", 1.0))
+
+    regions = detect_speech(samples, SAMPLE_RATE)
+
+    assert len(regions) == 2
+    for region, span in zip(regions, spans):
+        assert_covers(region, span)
+
+
+def test_short_pauses_are_joined_and_long_ones_split():
+    samples, spans = recording(
+        ("silence", 1.0), ("speech", 1.5), ("silence", 0.3), ("speech", 1.5), ("silence", 1.5), ("speech", 1.5),
+        ("silence", 1.0),
+    )
+
+    regions = detect_speech(samples, SAMPLE_RATE)
+
+    # The 0.3 s pause is under VAD_MIN_SILENCE_SECONDS, so the first two spans are one region
+    assert len(regions) == 2
+    assert_covers(regions[0], (spans[0][0], spans[1][1]))
+    assert_covers(regions[1], spans[2])
+
+
+def test_isolated_blips_are_dropped():
+    samples, spans = recording(("silence", 1.0), ("speech", 0.1), ("silence", 1.0), ("speech", 2.0), ("silence", 1.0))
+
+    regions = detect_speech(samples, SAMPLE_RATE)
+
+    assert len(regions) == 1
+    assert_covers(regions[0], spans[1])
+
+
+def test_no_speech_gives_no_regions():
+    samples, _ = recording(("silence", 3.0))
+
+    assert detect_speech(samples, SAMPLE_RATE) == []
+    assert detect_speech(samples[:0], SAMPLE_RATE) == []
+
+
+def test_timestamps_round_trip_through_compressed_audio():
+    samples, _ = recording(("silence", 2.0), ("speech", 2.0), ("silence", 5.0), ("speech", 2.0), ("silence", 3.0))
+    regions = detect_speech(samples, SAMPLE_RATE)
+
+    trimmed, time_map = compress_silence(samples, SAMPLE_RATE, regions, kept_silence_seconds=0.3)
+
+    assert len(trimmed) < len(samples)
+    assert len(time_map) == len(regions)
+    for (trimmed_start, original_start), (start, end) in zip(time_map, regions):
+        assert original_start == start * 1000 // SAMPLE_RATE
+        # Every offset inside a region maps back to where it was in the recording
+        for offset_ms in range(0, (end - start) * 1000 // SAMPLE_RATE, 250):
+            assert translate_timestamp(trimmed_start + offset_ms, time_map) == original_start + offset_ms
+
+
+def test_remapped_utterances_land_on_the_original_timeline():
+    time_map = [[0, 2000], [2300, 9000]]
+    utterances = [
+        {"speaker": "A", "text": "first", "start": 100, "end": 1900},
+        # Ends inside the inserted 0.3 s gap, which is clamped to the next region's start
+        {"speaker": "A", "text": "trailing", "start": 1950, "end": 2200},
+        {"speaker": "B", "text": "second", "start": 2400, "end": 3000},
+    ]
+
+    remapped = remap_utterances(utterances, time_map)
+
+    assert [(u["start"], u["end"]) for u in remapped] == [(2100, 3900), (3950, 4200), (9100, 9700)]
+    assert [u["text"] for u in remapped] == ["first", "trailing", "second"]
+    assert remap_utterances(utterances, []) is utterances